@@ -1,14 +1,74 @@
-from fastapi import FastAPI
+import threading
+import time
+import uuid
+from fastapi import FastAPI, Request
 from app.src.api.chat_router import router as chat_router
 from app.src.api.health_router import router as health_router
 from app.src.api.ingest_router import router as ingest_router
+from app.src.api.metrics_router import router as metrics_router
+from app.src.api.search_router import router as search_router
+from app.src.config import get_settings
+from app.src.services.ingest.scheduler import get_ingest_scheduler
+from app.src.services.store.registry import get_collection_registry
+from app.src.utils.logs import logger, request_id_var
 import uvicorn
 
 app = FastAPI()
 
+@app.on_event("startup")
+def sync_embedding_model():
+    try:
+        get_collection_registry().sync_active_models()
+    except Exception as e:
+        logger.error(f"Error resolving the live embedding model: {e}")
+
+def _sync_active_model_loop(interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            get_collection_registry().sync_active_models()
+        except Exception as e:
+            logger.error(f"Error resyncing the live embedding model: {e}")
+
+@app.on_event("startup")
+def start_active_model_sync():
+    interval = get_settings().active_model_sync_seconds
+    if interval > 0:
+        threading.Thread(target=_sync_active_model_loop, args=(interval,), name="active-model-sync", daemon=True).start()
+
+def _migrate_payload_indexes():
+    try:
+        get_collection_registry().migrate_payload_indexes()
+    except Exception as e:
+        logger.error(f"Error migrating payload indexes: {e}")
+
+@app.on_event("startup")
+def start_payload_migration():
+    # Backfilling scans whole collections, so it runs beside the server rather than in a request.
+    if get_settings().payload_migration_on_startup:
+        threading.Thread(target=_migrate_payload_indexes, name="payload-migration", daemon=True).start()
+
+@app.on_event("startup")
+def start_ingest_scheduler():
+    if get_settings().ingest_scheduler_enabled:
+        get_ingest_scheduler().start()
+
+@app.middleware("http")
+async def request_context(request: Request, call_next):
+    request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+    token = request_id_var.set(request_id)
+    try:
+        response = await call_next(request)
+    finally:
+        request_id_var.reset(token)
+    response.headers["X-Request-ID"] = request_id
+    return response
+
 app.include_router(chat_router)
 app.include_router(health_router)
 app.include_router(ingest_router)
+app.include_router(metrics_router)
+app.include_router(search_router)
 
 if __name__ == '__main__':
     uvicorn.run("app.main:app", host="0.0.0.0", port=9999, reload=False)
@@ -0,0 +1,139 @@
+import argparse
+import gc
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from typing import List
+import uvicorn
+
+APP = "app.main:app"
+
+def _bind(host: str, port: int) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+    return sock
+
+def _limit_torch_threads(workers: int):
+    try:
+        import torch
+    except ImportError:
+        return
+    torch.set_num_threads(max(1, (os.cpu_count() or 1) // workers))
+
+def _prepare_metrics_dir():
+    # Each worker keeps its own Prometheus registry, so a scrape would only show the worker
+    # that answers it. In multiprocess mode every worker writes its samples to files in this
+    # directory, which /metrics aggregates. It must be set before prometheus_client is imported.
+    path = os.environ.get("PROMETHEUS_MULTIPROC_DIR") or tempfile.mkdtemp(prefix="rag-metrics-")
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith(".db"):
+            os.remove(os.path.join(path, name))
+    os.environ["PROMETHEUS_MULTIPROC_DIR"] = path
+
+def serve_local(host: str, port: int, workers: int):
+    uvicorn.run(APP, host=host, port=port, workers=workers)
+
+def serve_preloaded(host: str, port: int, workers: int):
+    from app.src.config import get_settings
+    from app.src.services.embedder.embedder import Embedder
+    from app.src.utils.logs import logger
+
+    get_settings().embedding_sidecar_socket = ""
+    get_settings().active_model_sync_seconds = float(os.environ.get("ACTIVE_MODEL_SYNC_SECONDS", "0"))
+    Embedder(remote=False).preload()
+    # Move everything loaded so far out of the collector's generations so that
+    # collections in the workers do not touch, and thereby copy, the shared pages.
+    gc.collect()
+    gc.freeze()
+    sock = _bind(host, port)
+    logger.info(f"Preloaded the embedding model, forking {workers} workers on {host}:{port}")
+
+    children: List[int] = []
+    for _ in range(workers):
+        pid = os.fork()
+        if pid == 0:
+            _limit_torch_threads(workers)
+            uvicorn.Server(uvicorn.Config(APP, host=host, port=port)).run(sockets=[sock])
+            os._exit(0)
+        children.append(pid)
+
+    def forward(signum, frame):
+        for pid in children:
+            try:
+                os.kill(pid, signum)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, forward)
+    signal.signal(signal.SIGINT, forward)
+    from prometheus_client import multiprocess
+    for pid in children:
+        os.waitpid(pid, 0)
+        multiprocess.mark_process_dead(pid)
+    sock.close()
+
+def _wait_for_socket(path: str, process: subprocess.Popen, timeout: float):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"Embedding sidecar exited with status {process.returncode}")
+        try:
+            with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+                probe.connect(path)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"Embedding sidecar did not start listening on {path} within {timeout}s")
+
+def serve_with_sidecar(host: str, port: int, workers: int, socket_path: str, timeout: float):
+    os.environ["EMBEDDING_SIDECAR_SOCKET"] = socket_path
+    sidecar = subprocess.Popen([sys.executable, "-m", "app.src.services.embedder.sidecar", "--socket", socket_path])
+    try:
+        _wait_for_socket(socket_path, sidecar, timeout)
+        uvicorn.run(APP, host=host, port=port, workers=workers)
+    finally:
+        sidecar.terminate()
+        sidecar.wait()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the API with several workers sharing one copy of the embedding model")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=9999)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument(
+        "--embedding",
+        choices=["local", "preload", "sidecar"],
+        default="preload",
+        help="local: one model per worker, preload: load once and fork, sidecar: workers call a shared embedding process"
+    )
+    parser.add_argument("--socket", default="./resources/embedder.sock", help="Unix socket of the embedding sidecar")
+    parser.add_argument("--sidecar-timeout", type=float, default=300.0, help="Seconds to wait for the sidecar to load its model")
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        # Each worker tracks the live embedding model itself, so a promotion
+        # made through one of them must be picked up by the others.
+        os.environ.setdefault("ACTIVE_MODEL_SYNC_SECONDS", "30")
+        _prepare_metrics_dir()
+        from app.src.utils.logs import logger
+        logger.warning(
+            f"Serving {args.workers} workers: chat sessions, ingestion jobs and request coalescing are kept per worker, "
+            "so a client must stay on one worker (sticky routing) to reuse a session_id or poll a job_id"
+        )
+    if args.embedding == "preload":
+        serve_preloaded(args.host, args.port, args.workers)
+    elif args.embedding == "sidecar":
+        serve_with_sidecar(args.host, args.port, args.workers, os.path.abspath(args.socket), args.sidecar_timeout)
+    else:
+        serve_local(args.host, args.port, args.workers)
+
+if __name__ == "__main__":
+    main()
@@ -1,10 +1,53 @@
-from fastapi import APIRouter
-from app.src.domain.chat import ChatRequest, ChatResponse
+import asyncio
+from fastapi import APIRouter, HTTPException
+from fastapi.responses import StreamingResponse
+from app.src.config import get_settings
+from app.src.domain.chat import ChatRequest, ChatResponse, ChatBatchRequest, ChatSessionResponse
 from app.src.services.chat.service import ChatService
+from app.src.services.store.corpora import UnknownCorpus, select_corpora
+from app.src.utils.query_log import get_query_log
 router = APIRouter(prefix="/chat", tags=["chat"])
 service = ChatService()
 
+def _validate_corpora(corpora, exclude_corpora):
+    try:
+        select_corpora(corpora, exclude_corpora)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @router.post("", response_model=ChatResponse)
-async def chat(req: ChatRequest):
+def chat(req: ChatRequest):
+    _validate_corpora(req.corpora, req.exclude_corpora)
+    get_query_log().record("chat", req.query, k=req.k, m=req.mode, s=1 if req.session_id else None, h=len(req.chat_history) or None)
     return service.chat(req)
 
+@router.post("/batch")
+async def chat_batch(req: ChatBatchRequest):
+    max_queries = get_settings().chat_batch_max_queries
+    if len(req.queries) > max_queries:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_queries} queries")
+    _validate_corpora(req.corpora, req.exclude_corpora)
+    await asyncio.to_thread(get_query_log().record_many, "chat", req.queries, k=req.k, b=1)
+
+    async def stream():
+        async for result in service.chat_batch(req):
+            yield result.model_dump_json() + "\n"
+    return StreamingResponse(stream(), media_type="application/x-ndjson")
+
+@router.post("/sessions", response_model=ChatSessionResponse)
+async def create_session():
+    session = service.session_store.get_or_create()
+    return ChatSessionResponse(session_id=session.id)
+
+@router.get("/sessions/{session_id}", response_model=ChatSessionResponse)
+async def get_session(session_id: str):
+    session = service.session_store.get(session_id)
+    if session is None:
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return ChatSessionResponse(session_id=session.id, summary=session.summary, messages=list(session.messages))
+
+@router.delete("/sessions/{session_id}")
+async def delete_session(session_id: str):
+    if not service.session_store.delete(session_id):
+        raise HTTPException(status_code=404, detail="Session not found or expired")
+    return {"status": "deleted"}
@@ -1,25 +1,83 @@
-from fastapi import APIRouter, BackgroundTasks
-from app.src.services.ingest.pipeline import IngestionPipeline
-from app.src.services.store.store import VectorStore
+from typing import Any, Dict, List, Literal, Optional
+from fastapi import APIRouter, HTTPException, Query
+from app.src.config import get_settings
+from app.src.domain.ingest import IngestJobStatus
+from app.src.services.ingest.jobs import CollectionLock, IngestJobConflict, get_ingest_job_manager
+from app.src.services.store.corpora import UnknownCorpus, get_corpora, get_corpus
+from app.src.services.store.registry import get_collection_registry
 from app.src.utils.logs import logger
 router = APIRouter(prefix="/ingest", tags=["ingest"])
 
-@router.post("")
-async def ingest(background_tasks: BackgroundTasks):
-    pipeline = IngestionPipeline()
-    def run():
-        try:
-            pipeline.run_sync()
-            logger.info("ingestion success")
-        except Exception as e:
-            logger.error(f"ingestion error err={e}")
-    background_tasks.add_task(run)
-    return {"status": "ingestion started"}
+@router.post("", response_model=IngestJobStatus, status_code=202)
+async def ingest(
+    resume: bool = False,
+    rebuild: bool = False,
+    mode: Optional[Literal["thread", "process"]] = None,
+    workers: Optional[int] = Query(None, ge=1, le=64),
+    source: Literal["crawl", "archive"] = "crawl",
+    corpus: Optional[str] = None
+):
+    try:
+        job = get_ingest_job_manager().start(resume, mode, rebuild, workers, source, corpus)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IngestJobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
+@router.post("/reembed", response_model=IngestJobStatus, status_code=202)
+async def reembed(model: Optional[str] = None, resume: bool = False, corpus: Optional[str] = None):
+    try:
+        job = get_ingest_job_manager().start_reembed(model or get_settings().embedding_model_name, resume, corpus)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=404, detail=str(e))
+    except IngestJobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return job.to_dict()
+
+@router.get("", response_model=List[IngestJobStatus])
+async def list_ingest_jobs():
+    return [job.to_dict() for job in get_ingest_job_manager().list()]
+
+def _resolve_corpus(name: Optional[str]):
+    try:
+        return get_corpus(name)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+@router.get("/corpora")
+def list_corpora() -> List[Dict[str, Any]]:
+    return [corpus._asdict() for corpus in get_corpora().values()]
+
+@router.get("/collections")
+def list_collection_versions(corpus: Optional[str] = None) -> Dict[str, Any]:
+    return get_collection_registry().describe(_resolve_corpus(corpus).collection)
+
+@router.get("/{job_id}", response_model=IngestJobStatus)
+async def get_ingest_job(job_id: str):
+    job = get_ingest_job_manager().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
+
+@router.post("/{job_id}/cancel", response_model=IngestJobStatus)
+async def cancel_ingest_job(job_id: str):
+    job = get_ingest_job_manager().cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Ingestion job not found")
+    return job.to_dict()
 
 @router.delete("")
-async def ingest_reset():
-    vs = VectorStore()
-    vs.clear()
-    logger.info("ingestion reset")
+async def ingest_reset(corpus: Optional[str] = None):
+    collection = _resolve_corpus(corpus).collection
+    lock = CollectionLock(collection)
+    try:
+        lock.acquire("reset")
+    except IngestJobConflict as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    try:
+        get_collection_registry().reset(collection)
+    finally:
+        lock.release()
+    logger.info(f"ingestion reset collection={collection}")
     return {"status":"reset"}
-
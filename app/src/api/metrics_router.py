@@ -0,0 +1,14 @@
+import os
+from fastapi import APIRouter, Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, REGISTRY, generate_latest, multiprocess
+router = APIRouter(tags=["metrics"])
+
+@router.get("/metrics")
+def metrics():
+    # Under several workers (app.serve), every process writes its samples to PROMETHEUS_MULTIPROC_DIR
+    # and a scrape aggregates all of them, whichever worker answers it.
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    return Response(content=generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
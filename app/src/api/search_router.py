@@ -0,0 +1,67 @@
+from typing import List, Optional
+from fastapi import APIRouter, HTTPException
+from app.src.config import get_settings
+from app.src.domain.chunks import ScoredChunk, ScoredGroup
+from app.src.domain.search import SearchRequest, SearchBatchRequest, SearchResponse, SearchGroup, SearchResults, SEARCH_FIELDS
+from app.src.services.search.service import SearchService
+from app.src.services.store.corpora import UnknownCorpus
+from app.src.utils.query_log import get_query_log
+router = APIRouter(prefix="/search", tags=["search"])
+service = SearchService()
+
+def _validate_fields(fields: Optional[List[str]]):
+    if fields is None:
+        return
+    unknown = [field for field in fields if field not in SEARCH_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields {unknown}, allowed: {SEARCH_FIELDS}")
+
+def _to_response(result: ScoredChunk, fields: Optional[List[str]]) -> SearchResponse:
+    selected = {field: getattr(result, field) for field in (SEARCH_FIELDS if fields is None else fields)}
+    return SearchResponse(id=result.id, corpus=result.corpus or None, similarity=result.similarity, rank=result.rank, **selected)
+
+def _to_results(query: str, results: List[ScoredChunk], fields: Optional[List[str]]) -> SearchResults:
+    return SearchResults(query=query, results=[_to_response(result, fields) for result in results])
+
+def _to_grouped_results(query: str, groups: List[ScoredGroup], fields: Optional[List[str]]) -> SearchResults:
+    return SearchResults(
+        query=query,
+        groups=[
+            SearchGroup(
+                url=group.url,
+                similarity=group.similarity,
+                rank=group.rank,
+                hits=[_to_response(hit, fields) for hit in group.hits]
+            )
+            for group in groups
+        ]
+    )
+
+@router.post("", response_model=SearchResults, response_model_exclude_none=True)
+def search(req: SearchRequest):
+    _validate_fields(req.fields)
+    get_query_log().record("search", req.query, k=req.k, g=1 if req.group_by_url else None, d=req.diversity)
+    try:
+        if req.group_by_url:
+            groups = service.search_groups(req.query, req.k, req.group_size, req.fields, req.corpora, req.exclude_corpora, req.filter)
+            return _to_grouped_results(req.query, groups, req.fields)
+        results = service.search(req.query, req.k, req.fields, corpora=req.corpora, exclude_corpora=req.exclude_corpora, search_filter=req.filter, diversity=req.diversity)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return _to_results(req.query, results, req.fields)
+
+@router.post("/batch", response_model=List[SearchResults], response_model_exclude_none=True)
+def search_batch(req: SearchBatchRequest):
+    _validate_fields(req.fields)
+    max_queries = get_settings().search_batch_max_queries
+    if len(req.queries) > max_queries:
+        raise HTTPException(status_code=413, detail=f"Batch exceeds {max_queries} queries")
+    get_query_log().record_many("search", req.queries, k=req.k, g=1 if req.group_by_url else None, d=req.diversity, b=1)
+    try:
+        if req.group_by_url:
+            batch_groups = service.search_groups_batch(req.queries, req.k, req.group_size, req.fields, req.corpora, req.exclude_corpora, req.filter)
+            return [_to_grouped_results(query, groups, req.fields) for query, groups in zip(req.queries, batch_groups)]
+        batch_results = service.search_batch(req.queries, req.k, req.fields, req.corpora, req.exclude_corpora, req.filter, req.diversity)
+    except UnknownCorpus as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return [_to_results(query, results, req.fields) for query, results in zip(req.queries, batch_results)]
@@ -21,20 +21,125 @@ class Settings:
     crawl_max_depth: int = 3
 
     collection_name: str = "gitlab_docs"
+    collection_registry_path: str = os.getenv("COLLECTION_REGISTRY_PATH", "./resources/collections.json")
+    collection_keep_versions: int = 1
+    collection_building_max_age_seconds: float = 7 * 24 * 3600
+    payload_backfill_batch_size: int = 1024
+    payload_migration_on_startup: bool = os.getenv("PAYLOAD_MIGRATION_ON_STARTUP", "true").lower() == "true"
+
+    corpora_path: str = os.getenv("CORPORA_PATH", "")
+    default_corpus: str = os.getenv("DEFAULT_CORPUS", "")
+    search_fanout_workers: int = 8
 
     chunk_size: int = 800
     chunk_overlap: int = 200
 
+    ingest_journal_dir: str = os.getenv("INGEST_JOURNAL_DIR", "./resources/ingest")
+    ingest_journal_flush_records: int = 50
+    ingest_journal_flush_seconds: float = 5.0
+    ingest_worker_mode: str = os.getenv("INGEST_WORKER_MODE", "thread")
+    ingest_job_history: int = 50
+    ingest_scheduler_enabled: bool = os.getenv("INGEST_SCHEDULER_ENABLED", "false").lower() == "true"
+    ingest_scheduler_poll_seconds: float = 60.0
+    ingest_schedule_hours: float = 0.0
+    ingest_workers: int = int(os.getenv("INGEST_WORKERS", "1"))
+    ingest_frontier_lease_seconds: float = 300.0
+    crawl_shard_poll_seconds: float = 0.5
+
+    page_archive_enabled: bool = os.getenv("PAGE_ARCHIVE_ENABLED", "true").lower() == "true"
+    page_archive_dir: str = os.getenv("PAGE_ARCHIVE_DIR", "./resources/archive")
+    page_archive_compress_level: int = 6
+    page_archive_keep_fetches: int = int(os.getenv("PAGE_ARCHIVE_KEEP_FETCHES", "1"))
+
+    dedup_enabled: bool = True
+    dedup_num_perm: int = 128
+    dedup_bands: int = 16
+    dedup_threshold: float = 0.85
+    dedup_shingle_size: int = 5
+    dedup_seed: int = 1
+
     embedding_model_name: str = "BAAI/bge-m3"
     embedding_batch_size: int = 32
+    embedding_batching_enabled: bool = os.getenv("EMBEDDING_BATCHING_ENABLED", "false").lower() == "true"
+    embedding_batch_window_ms: float = float(os.getenv("EMBEDDING_BATCH_WINDOW_MS", "5"))
+    embedding_batch_max_size: int = int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", "32"))
+    embedding_sidecar_socket: str = os.getenv("EMBEDDING_SIDECAR_SOCKET", "")
+    embedding_sidecar_timeout_seconds: float = 60.0
+    active_model_sync_seconds: float = float(os.getenv("ACTIVE_MODEL_SYNC_SECONDS", "0"))
+    reembed_scroll_size: int = 512
+    reembed_batch_size: int = 128
 
     gemini_api_key: str = os.getenv("GEMINI_API_KEY")
     gemini_model: str = "gemini-1.5-flash"
 
     answer_max_tokens: int = 4000
 
+    chat_batch_max_queries: int = 5000
+    chat_batch_concurrency: int = 4
+    search_batch_max_queries: int = 1000
+    search_diversity: str = os.getenv("SEARCH_DIVERSITY", "none")
+    search_mmr_lambda: float = 0.7
+    search_mmr_pool_factor: int = 3
+    search_adaptive_k: bool = os.getenv("SEARCH_ADAPTIVE_K", "true").lower() == "true"
+    search_adaptive_candidates: int = int(os.getenv("SEARCH_ADAPTIVE_CANDIDATES", "30"))
+    search_adaptive_min_k: int = int(os.getenv("SEARCH_ADAPTIVE_MIN_K", "3"))
+    search_adaptive_max_k: int = int(os.getenv("SEARCH_ADAPTIVE_MAX_K", "12"))
+    search_adaptive_min_similarity: float = float(os.getenv("SEARCH_ADAPTIVE_MIN_SIMILARITY", "0.0"))
+    search_adaptive_relative_similarity: float = 0.75
+    search_adaptive_score_gap: float = 0.08
+    search_adaptive_token_budget: int = int(os.getenv("SEARCH_ADAPTIVE_TOKEN_BUDGET", "3000"))
+
+    session_max_sessions: int = 10000
+    session_ttl_seconds: int = 3600
+    session_max_recent_messages: int = 6
+    session_history_token_budget: int = 1200
+    session_summary_token_budget: int = 300
+    session_summary_line_chars: int = 200
+    session_context_max_chunks: int = 40
+    session_reuse_similarity: float = 0.8
+    session_reuse_top_hits: int = 3
+    session_reuse_url_overlap: float = 0.67
+
+    chat_coalescing_enabled: bool = True
+
+    chat_latency_budget_ms: int = int(os.getenv("CHAT_LATENCY_BUDGET_MS", "20000"))
+    chat_citation_min_remaining_ms: int = 8000
+    chat_expansion_min_remaining_ms: int = 5000
+    chat_shrink_context_below_ms: int = 6000
+    chat_answer_min_remaining_ms: int = 2000
+    chat_retrieval_min_remaining_ms: int = 250
+    chat_degraded_context_chars: int = 6000
+
+    extractive_max_results: int = 5
+    extractive_max_sentences: int = 4
+    extractive_max_sentences_per_result: int = 20
+    extractive_min_sentence_chars: int = 30
+
+    llm_timeout_ms: int = 30000
+    llm_citation_timeout_ms: int = 5000
+    llm_max_workers: int = 16
+    llm_hedging_enabled: bool = os.getenv("LLM_HEDGING_ENABLED", "false").lower() == "true"
+    llm_hedge_percentile: float = 95
+    llm_hedge_window: int = 200
+    llm_hedge_min_samples: int = 20
+    llm_circuit_failure_threshold: int = 5
+    llm_circuit_reset_seconds: float = 30.0
+    llm_stub_enabled: bool = os.getenv("LLM_STUB_ENABLED", "false").lower() == "true"
+    llm_stub_latency_ms: float = float(os.getenv("LLM_STUB_LATENCY_MS", "800"))
+    llm_stub_jitter_ms: float = float(os.getenv("LLM_STUB_JITTER_MS", "400"))
+    llm_stub_distribution: str = os.getenv("LLM_STUB_DISTRIBUTION", "lognormal")
+
+    query_log_enabled: bool = os.getenv("QUERY_LOG_ENABLED", "false").lower() == "true"
+    query_log_path: str = os.getenv("QUERY_LOG_PATH", "./resources/query_log.jsonl")
+    query_log_sample_rate: float = float(os.getenv("QUERY_LOG_SAMPLE_RATE", "1.0"))
+    query_log_max_chars: int = 500
+    query_log_max_bytes: int = 50_000_000
+
     qdrant_host: str = os.getenv("QDRANT_HOST")
-    qdrant_port: int = int(os.getenv("QDRANT_PORT"))
+    qdrant_port: int = int(os.getenv("QDRANT_PORT", "6333"))
+    qdrant_location: str = os.getenv("QDRANT_LOCATION")
+
+    tracing_enabled: bool = os.getenv("TRACING_ENABLED", "false").lower() == "true"
 
 
 @lru_cache
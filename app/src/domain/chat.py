@@ -1,5 +1,6 @@
-from pydantic import BaseModel
-from typing import List, Optional
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+from app.src.domain.search import MAX_K, SearchFilter
 
 class ChatMessage(BaseModel):
     role: str
@@ -7,8 +8,15 @@ class ChatMessage(BaseModel):
 
 class ChatRequest(BaseModel):
     query: str
-    k: int = None
+    k: Optional[int] = Field(None, ge=1, le=MAX_K)
     chat_history: List[ChatMessage] = []
+    session_id: Optional[str] = None
+    latency_budget_ms: Optional[int] = None
+    mode: Literal["generative", "extractive"] = "generative"
+    corpora: Optional[List[str]] = None
+    exclude_corpora: Optional[List[str]] = None
+    filter: Optional[SearchFilter] = None
+    diversity: Optional[Literal["none", "pages", "mmr"]] = None
 
 class Citation(BaseModel):
     id: str
@@ -22,3 +30,25 @@ class ChatResponse(BaseModel):
     answer: str
     citations: List[Citation]
     rewritten_query: str
+    session_id: Optional[str] = None
+    degraded: List[str] = []
+
+class ChatSessionResponse(BaseModel):
+    session_id: str
+    summary: str = ""
+    messages: List[ChatMessage] = []
+
+
+class ChatBatchRequest(BaseModel):
+    queries: List[str]
+    k: Optional[int] = Field(None, ge=1, le=MAX_K)
+    concurrency: Optional[int] = None
+    corpora: Optional[List[str]] = None
+    exclude_corpora: Optional[List[str]] = None
+    filter: Optional[SearchFilter] = None
+    diversity: Optional[Literal["none", "pages", "mmr"]] = None
+
+class ChatBatchResult(BaseModel):
+    position: int
+    query: str
+    response: ChatResponse
@@ -1,11 +1,28 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import List, NamedTuple, Optional, Union
 
-class Chunk(BaseModel):
+class Chunk(NamedTuple):
     id: str
-    url: HttpUrl
+    url: str
     title: Optional[str]
-    content: str
+    content: Optional[str]
     index: int
     total: int
 
+class ScoredChunk(NamedTuple):
+    id: str
+    url: str
+    title: str
+    content: Optional[str]
+    index: int
+    total: int
+    similarity: float
+    rank: int = 0
+    corpus: str = ""
+
+class ScoredGroup(NamedTuple):
+    url: str
+    similarity: float
+    rank: int
+    hits: List[ScoredChunk]
+
+AnyChunk = Union[Chunk, ScoredChunk]
@@ -0,0 +1,9 @@
+from typing import List, NamedTuple
+
+class Corpus(NamedTuple):
+    name: str
+    collection: str
+    base_urls: List[str]
+    crawl_max_pages: int
+    crawl_max_depth: int
+    schedule_hours: float = 0.0
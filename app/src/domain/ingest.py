@@ -0,0 +1,22 @@
+from pydantic import BaseModel
+from typing import Any, Dict, Optional
+
+class IngestJobStatus(BaseModel):
+    job_id: str
+    kind: str = "ingest"
+    corpus: Optional[str] = None
+    collection: str
+    status: str
+    mode: str
+    source: str = "crawl"
+    resume: bool
+    rebuild: bool = False
+    workers: int = 1
+    target_collection: Optional[str] = None
+    embedding_model: Optional[str] = None
+    created_at: float
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    progress: Dict[str, Any] = {}
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
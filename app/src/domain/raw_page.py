@@ -1,9 +1,7 @@
-from pydantic import BaseModel, HttpUrl
-from typing import Optional
+from typing import NamedTuple, Optional
 
-class RawPage(BaseModel):
-    url: HttpUrl
+class RawPage(NamedTuple):
+    url: str
     depth: int
-    html: str
     text: str
     title: Optional[str]
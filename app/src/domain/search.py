@@ -1,15 +1,58 @@
-from pydantic import BaseModel
+from pydantic import BaseModel, Field
+from typing import List, Literal, Optional
+
+SEARCH_FIELDS = ["content", "url", "title", "index", "total"]
+HYDRATED_FIELDS = ["content"]
+MAX_K = 100
+MAX_GROUP_SIZE = 100
+
+class SearchFilter(BaseModel):
+    urls: Optional[List[str]] = None
+    sections: Optional[List[str]] = None
+    exclude_sections: Optional[List[str]] = None
+    min_index: Optional[int] = None
+    max_index: Optional[int] = None
 
 class SearchRequest(BaseModel):
     query: str
-    k: int = None
+    k: Optional[int] = Field(None, ge=1, le=MAX_K)
+    group_by_url: bool = False
+    group_size: int = Field(1, ge=1, le=MAX_GROUP_SIZE)
+    fields: Optional[List[str]] = None
+    corpora: Optional[List[str]] = None
+    exclude_corpora: Optional[List[str]] = None
+    filter: Optional[SearchFilter] = None
+    diversity: Optional[Literal["none", "pages", "mmr"]] = None
+
+class SearchBatchRequest(BaseModel):
+    queries: List[str]
+    k: Optional[int] = Field(None, ge=1, le=MAX_K)
+    group_by_url: bool = False
+    group_size: int = Field(1, ge=1, le=MAX_GROUP_SIZE)
+    fields: Optional[List[str]] = None
+    corpora: Optional[List[str]] = None
+    exclude_corpora: Optional[List[str]] = None
+    filter: Optional[SearchFilter] = None
+    diversity: Optional[Literal["none", "pages", "mmr"]] = None
 
 class SearchResponse(BaseModel):
     id: str
-    content: str
+    content: Optional[str] = None
+    url: Optional[str] = None
+    title: Optional[str] = None
+    index: Optional[int] = None
+    total: Optional[int] = None
+    corpus: Optional[str] = None
+    similarity: float
+    rank: int
+
+class SearchGroup(BaseModel):
     url: str
-    title: str
-    index: int
-    total: int
     similarity: float
-    rank: int
\ No newline at end of file
+    rank: int
+    hits: List[SearchResponse]
+
+class SearchResults(BaseModel):
+    query: str
+    results: List[SearchResponse] = []
+    groups: List[SearchGroup] = []
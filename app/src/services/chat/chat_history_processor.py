@@ -1,9 +1,13 @@
+import re
 from typing import List
+from app.src.config import get_settings
 from app.src.domain.chat import ChatMessage
+from app.src.services.chat.session_store import ChatSession
 from app.src.utils.logs import logger
 
 class ChatHistoryProcessor:
     def __init__(self):
+        self.settings = get_settings()
         self.max_history_length = 10
 
     def format_chat_history(self, chat_history: List[ChatMessage]) -> str:
@@ -43,3 +47,57 @@ class ChatHistoryProcessor:
         except Exception as e:
             logger.error(f"Error extracting relevant context: {str(e)}")
             return ""
+
+    def estimate_tokens(self, text: str) -> int:
+        return (len(text) + 3) // 4
+
+    def _summarize_message(self, message: ChatMessage) -> str:
+        max_chars = self.settings.session_summary_line_chars
+        content = re.sub(r'\s+', ' ', message.content).strip()
+        if message.role == "assistant":
+            first_sentence = re.split(r'(?<=[.!?])\s', content, maxsplit=1)[0]
+            return f"Assistant answered: {first_sentence[:max_chars]}"
+        return f"User asked: {content[:max_chars]}"
+
+    def compact_session(self, session: ChatSession):
+        budget = self.settings.session_history_token_budget
+        recent_tokens = sum(self.estimate_tokens(m.content) for m in session.messages)
+
+        while session.messages and (
+            len(session.messages) > self.settings.session_max_recent_messages
+            or (len(session.messages) > 1 and recent_tokens > budget)
+        ):
+            oldest = session.messages.pop(0)
+            recent_tokens -= self.estimate_tokens(oldest.content)
+            session.summary_lines.append(self._summarize_message(oldest))
+
+        summary_budget = self.settings.session_summary_token_budget
+        dropped = 0
+        while session.summary_lines and self.estimate_tokens(session.summary) > summary_budget:
+            session.summary_lines.pop(0)
+            dropped += 1
+        logger.debug(f"Compacted session {session.id}: recent={len(session.messages)}, summary_lines={len(session.summary_lines)}, dropped={dropped}")
+
+    def record_turn(self, session: ChatSession, query: str, answer: str):
+        session.messages.append(ChatMessage(role="user", content=query))
+        session.messages.append(ChatMessage(role="assistant", content=answer))
+        session.turns += 1
+        self.compact_session(session)
+
+    def extract_session_context(self, session: ChatSession) -> str:
+        try:
+            parts = []
+            if session.summary_lines:
+                parts.append(f"Summary of earlier turns:\n{session.summary}")
+            formatted_history = self.format_chat_history(session.messages)
+            if formatted_history:
+                parts.append(formatted_history)
+            if parts:
+                logger.info(f"Using session history for context enhancement - Session: {session.id}, Turns: {session.turns}")
+                return "\n\n# Previous Conversation:\n" + "\n\n".join(parts) + "\n"
+
+            return ""
+
+        except Exception as e:
+            logger.error(f"Error extracting session context: {str(e)}")
+            return ""
@@ -1,22 +1,25 @@
-import google.generativeai as genai
 import os
 import re
-from typing import List, Dict, Any
+from typing import List, Optional
 from app.src.config import get_settings
+from app.src.domain.chunks import AnyChunk
+from app.src.services.chat.llm_client import LLMClient
 from app.src.utils.logs import logger
 
 class CitationAnalyzer:
     def __init__(self):
         self.settings = get_settings()
-        if self.settings.gemini_api_key:
-            genai.configure(api_key=self.settings.gemini_api_key)
-            self.model = genai.GenerativeModel(self.settings.gemini_model)
-            logger.info("Citation analyzer initialized with Gemini model")
-        else:
-            self.model = None
-            logger.error("GEMINI_API_KEY not configured for citation analyzer")
-
-    def _build_query_analysis_prompt(self, query: str, search_results: List[Dict[str, Any]]) -> str:
+        self.client = LLMClient("citation")
+
+    @property
+    def model(self):
+        return self.client.model
+
+    @model.setter
+    def model(self, model):
+        self.client.model = model
+
+    def _build_query_analysis_prompt(self, query: str, search_results: List[AnyChunk]) -> str:
         try:
             logger.debug("Building query analysis prompt")
 
@@ -38,8 +41,8 @@ class CitationAnalyzer:
 
             citations_text = ""
             for i, result in enumerate(search_results, 1):
-                title = result.get('title', 'Untitled')
-                content = result.get('content', '')
+                title = result.title or 'Untitled'
+                content = result.content or ''
                 citations_text += f"\n-----\nCitation [{i}] | Title: {title}\nContent: {content}\n-----\n"
 
             if not citations_text.strip():
@@ -86,7 +89,7 @@ class CitationAnalyzer:
             logger.error(f"Error parsing citation response: {str(e)}")
             return []
 
-    def analyze_relevant_citations(self, query: str, search_results: List[Dict[str, Any]]) -> List[int]:
+    def analyze_relevant_citations(self, query: str, search_results: List[AnyChunk], timeout: Optional[float] = None) -> List[int]:
         try:
             logger.info(f"Starting citation analysis - Query: '{query[:50]}...', Results: {len(search_results)}")
             if not self.model:
@@ -99,10 +102,7 @@ class CitationAnalyzer:
             prompt = self._build_query_analysis_prompt(query, search_results)
             logger.debug("Sending request to Gemini for citation analysis")
             logger.info("analysis prompt: " + prompt)
-            response = self.model.generate_content(
-                prompt,
-                generation_config={"max_output_tokens": self.settings.answer_max_tokens}
-            )
+            response = self.client.generate_content(prompt, timeout=timeout)
             if not response or not response.text:
                 raise ValueError("No response received from Gemini for citation analysis")
 
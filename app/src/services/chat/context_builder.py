@@ -1,24 +1,42 @@
-from typing import List, Dict, Any
+from typing import List, Optional
 from app.src.config import get_settings
+from app.src.domain.chunks import AnyChunk
 
 class ContextBuilder:
     def __init__(self):
         self.settings = get_settings()
 
-    def build_context(self, search_results: List[Dict[str, Any]]) -> str:
+    def build_context(self, search_results: List[AnyChunk], max_chars: Optional[int] = None) -> str:
         if not search_results:
             return ""
 
         context_parts = []
+        used_chars = 0
         for i, result in enumerate(search_results, start=1):
-            title = result.get('title', '')
-            url = result.get('url', '')
-            content = result.get('content', '')
+            title = result.title or ''
+            url = result.url
+            content = result.content or ''
 
             header = f"Citation [{i}] | Titled: {title}"
             if url:
                 header += f" | Url: ({url})"
 
-            context_parts.append(f" -----\n{header}\n{content}")
+            part = f" -----\n{header}\n{content}"
+            if max_chars is not None and used_chars + len(part) > max_chars:
+                if not context_parts:
+                    context_parts.append(part[:max_chars])
+                break
+            context_parts.append(part)
+            used_chars += len(part) + 2
 
         return "\n\n".join(context_parts)
+
+    def select_within_budget(self, search_results: List[AnyChunk], max_chars: int) -> List[AnyChunk]:
+        selected = []
+        used_chars = 0
+        for result in search_results:
+            used_chars += len(result.content or '') + len(result.title or '') + len(result.url) + 40
+            if selected and used_chars > max_chars:
+                break
+            selected.append(result)
+        return selected
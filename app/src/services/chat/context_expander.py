@@ -1,5 +1,6 @@
-from typing import List, Dict, Any
-from app.src.services.chat.document_retriever import DocumentRetriever
+from typing import List, Optional
+from app.src.domain.chunks import AnyChunk, ScoredChunk
+from app.src.services.chat.document_retriever import DocumentRetriever, DocumentCache
 from app.src.config import get_settings
 from app.src.utils.logs import logger
 
@@ -8,7 +9,7 @@ class ContextExpander:
         self.settings = get_settings()
         self.document_retriever = DocumentRetriever()
 
-    def _extract_citation_sources(self, search_results: List[Dict[str, Any]], relevant_indices: List[int]) -> List[Dict[str, Any]]:
+    def _extract_citation_sources(self, search_results: List[ScoredChunk], relevant_indices: List[int]) -> List[ScoredChunk]:
         try:
             logger.debug(f"Extracting citation sources for indices: {relevant_indices}")
 
@@ -25,7 +26,7 @@ class ContextExpander:
                 if 1 <= index <= len(search_results):
                     citation = search_results[index - 1]
                     relevant_citations.append(citation)
-                    logger.debug(f"Extracted citation {index}: {citation.get('title', 'Untitled')}")
+                    logger.debug(f"Extracted citation {index}: {citation.title or 'Untitled'}")
                 else:
                     logger.warning(f"Invalid citation index {index} for {len(search_results)} results")
 
@@ -36,17 +37,17 @@ class ContextExpander:
             logger.error(f"Error extracting citation sources: {str(e)}")
             return []
 
-    def _get_full_document_for_citation(self, citation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def _get_full_document_for_citation(self, citation: ScoredChunk, document_cache: Optional[DocumentCache] = None) -> List[AnyChunk]:
         try:
-            citation_id = citation.get('id', 'unknown')
-            citation_title = citation.get('title', 'Untitled')
+            citation_id = citation.id
+            citation_title = citation.title or 'Untitled'
             logger.info(f"Retrieving full document for citation: {citation_title} (ID: {citation_id})")
 
             if not citation:
                 logger.error("Empty citation provided for document retrieval")
                 return []
 
-            full_document_chunks = self.document_retriever.get_full_document(citation)
+            full_document_chunks = self.document_retriever.get_full_document(citation, document_cache)
 
             if not full_document_chunks:
                 logger.warning(f"No document chunks retrieved for citation: {citation_id}")
@@ -63,7 +64,7 @@ class ContextExpander:
             logger.error(f"Error retrieving full document for citation: {str(e)}")
             return [citation]
 
-    def expand_context(self, search_results: List[Dict[str, Any]], relevant_indices: List[int], original_query: str) -> List[Dict[str, Any]]:
+    def expand_context(self, search_results: List[ScoredChunk], relevant_indices: List[int], original_query: str, document_cache: Optional[DocumentCache] = None) -> List[AnyChunk]:
         try:
             logger.info(f"Starting context expansion - Query: '{original_query[:50]}...', Indices: {relevant_indices}")
 
@@ -91,10 +92,10 @@ class ContextExpander:
             for i, citation in enumerate(relevant_citations):
                 try:
                     logger.debug(f"Processing citation {i+1}/{len(relevant_citations)}")
-                    full_document_chunks = self._get_full_document_for_citation(citation)
+                    full_document_chunks = self._get_full_document_for_citation(citation, document_cache)
 
                     for chunk in full_document_chunks:
-                        content = chunk.get('content', '')
+                        content = chunk.content or ''
                         if content and content not in seen_content:
                             seen_content.add(content)
                             expanded_results.append(chunk)
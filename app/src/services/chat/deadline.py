@@ -0,0 +1,22 @@
+import math
+import time
+from typing import Optional
+
+class Deadline:
+    def __init__(self, budget_ms: Optional[float] = None):
+        self.budget_ms = budget_ms
+        self.started = time.monotonic()
+
+    def elapsed_ms(self) -> float:
+        return (time.monotonic() - self.started) * 1000
+
+    def remaining_ms(self) -> float:
+        if self.budget_ms is None:
+            return math.inf
+        return max(0.0, self.budget_ms - self.elapsed_ms())
+
+    def below(self, threshold_ms: float) -> bool:
+        return self.remaining_ms() < threshold_ms
+
+    def timeout(self, cap_ms: float, reserve_ms: float = 0.0) -> float:
+        return max(0.0, min(cap_ms, self.remaining_ms() - reserve_ms)) / 1000
@@ -1,28 +1,70 @@
-from typing import List, Dict, Any
+import threading
+from concurrent.futures import Future
+from typing import Callable, Dict, List, Optional
+from app.src.domain.chunks import AnyChunk, Chunk
+from app.src.services.store.corpora import get_corpus
 from app.src.services.store.store import VectorStore
 from app.src.config import get_settings
 from app.src.utils.logs import logger
+from app.src.utils.metrics import CACHE_REQUESTS
+
+class DocumentCache:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._documents: Dict[str, Future] = {}
+
+    def get_or_load(self, url: str, loader: Callable[[str], List[Chunk]]) -> List[Chunk]:
+        with self._lock:
+            document = self._documents.get(url)
+            is_owner = document is None
+            if is_owner:
+                document = Future()
+                self._documents[url] = document
+
+        CACHE_REQUESTS.labels("document", "miss" if is_owner else "hit").inc()
+        if is_owner:
+            try:
+                document.set_result(loader(url))
+            except Exception as e:
+                document.set_exception(e)
+        else:
+            logger.debug(f"Document cache hit for URL: {url}")
+        return list(document.result())
+
+    def __len__(self) -> int:
+        return len(self._documents)
 
 class DocumentRetriever:
     def __init__(self):
         self.settings = get_settings()
-        self.store = VectorStore()
+        self._stores: Dict[str, VectorStore] = {}
+
+    def store_for(self, citation: AnyChunk) -> VectorStore:
+        corpus = get_corpus(getattr(citation, "corpus", "") or None)
+        store = self._stores.get(corpus.name)
+        if store is None:
+            store = self._stores[corpus.name] = VectorStore(corpus.collection, alias=True)
+        return store
 
-    def get_full_document(self, citation: Dict[str, Any]) -> List[Dict[str, Any]]:
+    def get_full_document(self, citation: AnyChunk, document_cache: Optional[DocumentCache] = None) -> List[AnyChunk]:
         try:
-            url = citation.get('url', '')
-            title = citation.get('title', '')
+            url = citation.url
+            title = citation.title
             logger.info(f"Attempting to retrieve full document - URL: {url}, Title: {title}")
             if url:
                 logger.info(f"Retrieving full document for URL: {url}")
-                all_chunks = self.store.get_all_chunks_by_url(url)
+                store = self.store_for(citation)
+                if document_cache is not None:
+                    all_chunks = document_cache.get_or_load(url, store.get_all_chunks_by_url)
+                else:
+                    all_chunks = store.get_all_chunks_by_url(url)
                 if not all_chunks:
                     logger.warning(f"No chunks found for URL: {url}")
                     return []
                 logger.info(f"Retrieved {len(all_chunks)} chunks for URL: {url} in original order")
                 return all_chunks
 
-            logger.warning(f"Could not retrieve full document for citation: {citation.get('id', 'unknown')}")
+            logger.warning(f"Could not retrieve full document for citation: {citation.id}")
             return [citation]
 
         except Exception as e:
@@ -0,0 +1,80 @@
+import re
+from typing import List, Optional, Tuple
+import numpy as np
+from app.src.config import get_settings
+from app.src.domain.chunks import AnyChunk
+from app.src.services.embedder.embedder import Embedder
+from app.src.utils.logs import logger
+from app.src.utils.tracing import span
+
+SENTENCE_BOUNDARY = re.compile(r"(?<=[.!?])\s+(?=[A-Z0-9\"'(\[])|\n+")
+WORD = re.compile(r"\w+")
+
+class ExtractiveAnswerer:
+    def __init__(self):
+        self.settings = get_settings()
+        self.embedder = Embedder()
+
+    def split_sentences(self, text: str) -> List[str]:
+        sentences = []
+        for sentence in SENTENCE_BOUNDARY.split(text or ""):
+            sentence = " ".join(sentence.split())
+            if len(sentence) >= self.settings.extractive_min_sentence_chars:
+                sentences.append(sentence)
+        return sentences
+
+    def _candidates(self, results: List[AnyChunk]) -> List[Tuple[int, str]]:
+        candidates = []
+        seen = set()
+        for position, result in enumerate(results[:self.settings.extractive_max_results]):
+            sentences = self.split_sentences(result.content or '')
+            for sentence in sentences[:self.settings.extractive_max_sentences_per_result]:
+                if sentence in seen:
+                    continue
+                seen.add(sentence)
+                candidates.append((position, sentence))
+        return candidates
+
+    def _lexical_scores(self, query: str, candidates: List[Tuple[int, str]]) -> np.ndarray:
+        terms = set(WORD.findall(query.lower()))
+        scores = []
+        for position, sentence in candidates:
+            overlap = len(terms & set(WORD.findall(sentence.lower()))) / (len(terms) or 1)
+            scores.append(overlap - 0.01 * position)
+        return np.asarray(scores, dtype=np.float32)
+
+    def extract(
+        self,
+        query: str,
+        results: List[AnyChunk],
+        query_embedding: Optional[List[float]] = None,
+        fallback: bool = False
+    ) -> Tuple[str, List[AnyChunk]]:
+        candidates = self._candidates(results)
+        if not candidates:
+            return "", []
+
+        with span("chat", "extractive"):
+            texts = [sentence for _, sentence in candidates]
+            if fallback:
+                # The latency budget is nearly spent, so rank by term overlap instead of running the model
+                scores = self._lexical_scores(query, candidates)
+            elif query_embedding is None:
+                embeddings = self.embedder.embed([query] + texts)
+                query_embedding, embeddings = embeddings[0], embeddings[1:]
+                scores = np.asarray(embeddings, dtype=np.float32) @ np.asarray(query_embedding, dtype=np.float32)
+            else:
+                embeddings = self.embedder.embed(texts)
+                scores = np.asarray(embeddings, dtype=np.float32) @ np.asarray(query_embedding, dtype=np.float32)
+
+        best = np.argsort(-scores)[:self.settings.extractive_max_sentences]
+        cited: List[int] = []
+        lines = []
+        for i in best:
+            position, sentence = candidates[i]
+            if position not in cited:
+                cited.append(position)
+            lines.append(f"{sentence} [{cited.index(position) + 1}]")
+
+        logger.info(f"Extractive answer built - Candidates: {len(candidates)}, Fallback: {fallback}, Sentences: {len(lines)}, Sources: {len(cited)}")
+        return "\n".join(lines), [results[position] for position in cited]
@@ -0,0 +1,152 @@
+import contextvars
+import threading
+import time
+import zlib
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from functools import lru_cache
+from typing import List, Optional
+import google.generativeai as genai
+from app.src.config import get_settings
+from app.src.services.chat.llm_stub import StubGenerativeModel
+from app.src.utils.logs import logger
+from app.src.utils.metrics import LLM_CIRCUIT_OPEN, LLM_HEDGED_REQUESTS
+from app.src.utils.tracing import observe_llm_call
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+class CircuitBreaker:
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+
+    @property
+    def is_open(self) -> bool:
+        return self._opened_at is not None
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if time.monotonic() - self._opened_at < self.reset_timeout or self._trial_in_flight:
+                return False
+            self._trial_in_flight = True
+            logger.info("LLM circuit half-open, allowing trial request")
+            return True
+
+    def record_success(self):
+        with self._lock:
+            if self._opened_at is not None:
+                logger.info("LLM circuit closed after successful trial request")
+            self._failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+            LLM_CIRCUIT_OPEN.set(0)
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            self._trial_in_flight = False
+            if self._opened_at is not None or self._failures >= self.failure_threshold:
+                if self._opened_at is None:
+                    logger.error(f"LLM circuit opened after {self._failures} consecutive failures")
+                self._opened_at = time.monotonic()
+                LLM_CIRCUIT_OPEN.set(1)
+
+@lru_cache
+def get_circuit_breaker() -> CircuitBreaker:
+    settings = get_settings()
+    return CircuitBreaker(settings.llm_circuit_failure_threshold, settings.llm_circuit_reset_seconds)
+
+@lru_cache
+def get_llm_executor() -> ThreadPoolExecutor:
+    return ThreadPoolExecutor(max_workers=get_settings().llm_max_workers, thread_name_prefix="llm")
+
+class LLMClient:
+    def __init__(self, call: str):
+        self.call = call
+        self.settings = get_settings()
+        self.breaker = get_circuit_breaker()
+        self._latencies = deque(maxlen=self.settings.llm_hedge_window)
+        if self.settings.llm_stub_enabled:
+            self.model = StubGenerativeModel(
+                self.settings.llm_stub_latency_ms,
+                self.settings.llm_stub_jitter_ms,
+                seed=zlib.crc32(call.encode("utf-8")),
+                distribution=self.settings.llm_stub_distribution
+            )
+            logger.warning(f"LLM client using the local stub model ({self.settings.llm_stub_distribution} latency, median {self.settings.llm_stub_latency_ms:.0f}ms) - Call: {call}")
+        elif self.settings.gemini_api_key:
+            genai.configure(api_key=self.settings.gemini_api_key)
+            self.model = genai.GenerativeModel(self.settings.gemini_model)
+            logger.info(f"LLM client initialized with Gemini model - Call: {call}")
+        else:
+            self.model = None
+            logger.error(f"GEMINI_API_KEY not configured for LLM client - Call: {call}")
+
+    def _hedge_delay(self) -> Optional[float]:
+        if not self.settings.llm_hedging_enabled or len(self._latencies) < self.settings.llm_hedge_min_samples:
+            return None
+        ordered = sorted(self._latencies)
+        index = min(len(ordered) - 1, int(len(ordered) * self.settings.llm_hedge_percentile / 100))
+        return ordered[index]
+
+    def _call(self, prompt: str, timeout: float, max_output_tokens: int):
+        started = time.perf_counter()
+        try:
+            response = self.model.generate_content(
+                prompt,
+                generation_config={"max_output_tokens": max_output_tokens},
+                request_options={"timeout": timeout}
+            )
+        except Exception:
+            observe_llm_call(self.call, prompt, None, started, "error")
+            raise
+        observe_llm_call(self.call, prompt, response, started, "success")
+        self._latencies.append(time.perf_counter() - started)
+        return response
+
+    def generate_content(self, prompt: str, timeout: Optional[float] = None, max_output_tokens: Optional[int] = None):
+        if not self.model:
+            raise RuntimeError("Error: Gemini API not configured. Please set GEMINI_API_KEY environment variable.")
+        if not self.breaker.allow():
+            raise CircuitOpenError("Gemini circuit breaker is open")
+
+        timeout = timeout if timeout is not None else self.settings.llm_timeout_ms / 1000
+        max_output_tokens = max_output_tokens or self.settings.answer_max_tokens
+        if timeout <= 0:
+            raise TimeoutError(f"No time left for {self.call} LLM call")
+
+        executor = get_llm_executor()
+        deadline = time.monotonic() + timeout
+        pending: List[Future] = [executor.submit(contextvars.copy_context().run, self._call, prompt, timeout, max_output_tokens)]
+        hedge_delay = self._hedge_delay()
+        last_error: Optional[BaseException] = None
+
+        while pending:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            wait_for = min(remaining, hedge_delay) if hedge_delay is not None and len(pending) == 1 else remaining
+            done, not_done = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            pending = list(not_done)
+            for future in done:
+                if future.exception() is None:
+                    self.breaker.record_success()
+                    return future.result()
+                last_error = future.exception()
+            if not done and hedge_delay is not None and len(pending) == 1:
+                LLM_HEDGED_REQUESTS.labels(self.call).inc()
+                logger.info(f"Hedging {self.call} LLM call after {hedge_delay * 1000:.0f}ms")
+                pending.append(executor.submit(contextvars.copy_context().run, self._call, prompt, max(0.0, deadline - time.monotonic()), max_output_tokens))
+                hedge_delay = None
+
+        self.breaker.record_failure()
+        if last_error is not None and not pending:
+            raise last_error
+        raise TimeoutError(f"{self.call} LLM call exceeded {timeout * 1000:.0f}ms")
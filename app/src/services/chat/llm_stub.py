@@ -0,0 +1,38 @@
+import math
+import random
+import threading
+import time
+from typing import NamedTuple
+
+class StubUsage(NamedTuple):
+    prompt_token_count: int
+    candidates_token_count: int
+
+class StubResponse:
+    def __init__(self, text: str, prompt: str = ""):
+        self.text = text
+        self.usage_metadata = StubUsage(len(prompt) // 4, len(text) // 4)
+
+class StubGenerativeModel:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, seed: int = 0, distribution: str = "gauss"):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.distribution = distribution
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    def _sample_latency(self) -> float:
+        with self._lock:
+            self.calls += 1
+            if not self.jitter_ms or not self.latency_ms:
+                return self.latency_ms / 1000
+            if self.distribution == "lognormal":
+                return self._rng.lognormvariate(math.log(self.latency_ms), self.jitter_ms / self.latency_ms) / 1000
+            return max(0.0, self._rng.gauss(self.latency_ms, self.jitter_ms)) / 1000
+
+    def generate_content(self, prompt: str, generation_config=None, **kwargs) -> StubResponse:
+        time.sleep(self._sample_latency())
+        if "# Available Citations:" in prompt:
+            return StubResponse("1,2", prompt)
+        return StubResponse("Based on the provided context, here is a stub answer [1].", prompt)
@@ -1,18 +1,21 @@
-import google.generativeai as genai
 import os
+from typing import Optional
 from app.src.config import get_settings
+from app.src.services.chat.llm_client import LLMClient
 from app.src.utils.logs import logger
 
 class LLMOrchestrator:
     def __init__(self):
         self.settings = get_settings()
-        if self.settings.gemini_api_key:
-            genai.configure(api_key=self.settings.gemini_api_key)
-            self.model = genai.GenerativeModel(self.settings.gemini_model)
-            logger.info("LLM orchestrator initialized with Gemini model")
-        else:
-            self.model = None
-            logger.error("GEMINI_API_KEY not configured for LLM orchestrator")
+        self.client = LLMClient("answer")
+
+    @property
+    def model(self):
+        return self.client.model
+
+    @model.setter
+    def model(self, model):
+        self.client.model = model
 
     def build_prompt(self, query: str, context: str, chat_history_context: str = "") -> str:
         try:
@@ -61,7 +64,7 @@ class LLMOrchestrator:
             logger.error(f"Unexpected error building prompt: {str(e)}")
             raise
 
-    def generate(self, prompt: str) -> str:
+    def generate(self, prompt: str, timeout: Optional[float] = None) -> str:
         try:
             logger.info("Starting LLM generation")
 
@@ -76,10 +79,7 @@ class LLMOrchestrator:
 
             logger.debug(f"Sending request to Gemini - Prompt length: {len(prompt)}")
 
-            response = self.model.generate_content(
-                prompt,
-                generation_config={"max_output_tokens": self.settings.answer_max_tokens}
-            )
+            response = self.client.generate_content(prompt, timeout=timeout)
 
             if not response:
                 logger.error("No response object received from Gemini")
@@ -101,7 +101,7 @@ class LLMOrchestrator:
         except ValueError as e:
             logger.error(f"Validation error in LLM generation: {str(e)}")
             raise
-        except RuntimeError as e:
+        except (RuntimeError, TimeoutError) as e:
             logger.error(f"Runtime error in LLM generation: {str(e)}")
             raise
         except Exception as e:
@@ -1,13 +1,27 @@
-from app.src.domain.chat import ChatRequest, ChatResponse, Citation
+import asyncio
+from concurrent.futures import TimeoutError as FutureTimeoutError
+import hashlib
+import json
+import numpy as np
+from typing import AsyncIterator, List, Dict, Optional
+from app.src.domain.chat import ChatRequest, ChatResponse, Citation, ChatBatchRequest, ChatBatchResult
+from app.src.domain.chunks import AnyChunk, ScoredChunk
 from app.src.services.search.service import SearchService
 from app.src.services.chat.context_builder import ContextBuilder
 from app.src.services.chat.orchestrator import LLMOrchestrator
 from app.src.services.chat.query import QueryProcessor
 from app.src.services.chat.citation_analyzer import CitationAnalyzer
 from app.src.services.chat.context_expander import ContextExpander
+from app.src.services.chat.document_retriever import DocumentCache
 from app.src.services.chat.chat_history_processor import ChatHistoryProcessor
+from app.src.services.chat.deadline import Deadline
+from app.src.services.chat.extractive import ExtractiveAnswerer
+from app.src.services.chat.session_store import ChatSession, SessionStore
+from app.src.services.chat.single_flight import SingleFlight
 from app.src.config import get_settings
 from app.src.utils.logs import logger
+from app.src.utils.metrics import CACHE_REQUESTS, CHAT_DEGRADATIONS
+from app.src.utils.tracing import span
 
 class ChatService:
     def __init__(self):
@@ -17,13 +31,80 @@ class ChatService:
         self.query_processor = QueryProcessor()
         self.citation_analyzer = CitationAnalyzer()
         self.context_expander = ContextExpander()
+        self.extractive_answerer = ExtractiveAnswerer()
         self.chat_history_processor = ChatHistoryProcessor()
+        self.session_store = SessionStore()
+        self.single_flight = SingleFlight("chat")
         self.settings = get_settings()
         logger.info("Chat service initialized with all components including chat history processor")
 
     def chat(self, request: ChatRequest) -> ChatResponse:
+        with span("chat", "total"):
+            deadline = Deadline(request.latency_budget_ms or self.settings.chat_latency_budget_ms)
+            if not self.settings.chat_coalescing_enabled:
+                return self._chat_in_session(request, deadline)
+            try:
+                response, shared = self.single_flight.do(
+                    self._coalescing_key(request),
+                    lambda: self._chat_in_session(request, deadline),
+                    timeout=self._wait_timeout(deadline, self.settings.chat_answer_min_remaining_ms)
+                )
+            except FutureTimeoutError:
+                degraded: List[str] = []
+                self._degrade(degraded, "coalesce_timeout", deadline)
+                response = self._chat_in_session(request, deadline)
+                response.degraded = degraded + response.degraded
+                return response
+            return response.model_copy(deep=True) if shared else response
+
+    def _wait_timeout(self, deadline: Deadline, reserve_ms: float) -> Optional[float]:
+        if deadline.budget_ms is None:
+            return None
+        return deadline.timeout(deadline.budget_ms, reserve_ms)
+
+    def _coalescing_key(self, request: ChatRequest) -> str:
+        key = {
+            "query": self.query_processor.clean_query(request.query or "").lower(),
+            "k": request.k,
+            "mode": request.mode,
+            "corpora": request.corpora,
+            "exclude_corpora": request.exclude_corpora,
+            "filter": request.filter.model_dump() if request.filter else None,
+            "diversity": request.diversity,
+            "session_id": request.session_id,
+            "history": [] if request.session_id else [[m.role, m.content] for m in request.chat_history],
+        }
+        return hashlib.sha256(json.dumps(key, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def _retrieval_scope(self, request: ChatRequest) -> str:
+        scope = {
+            "k": request.k,
+            "corpora": request.corpora,
+            "exclude_corpora": request.exclude_corpora,
+            "filter": request.filter.model_dump() if request.filter else None,
+            "diversity": request.diversity,
+            # The stored topic embedding is only comparable with queries embedded by the same model,
+            # so a promotion to another embedding model invalidates the context.
+            "model": self.search_service.query_model(),
+        }
+        return json.dumps(scope, sort_keys=True)
+
+    def _chat_in_session(self, request: ChatRequest, deadline: Deadline) -> ChatResponse:
+        if not request.session_id:
+            return self._chat(request, deadline)
+
+        session = self.session_store.get_or_create(request.session_id)
+        with session.lock:
+            response = self._chat(request, deadline, session)
+            # Error, invalid-query and no-results replies carry no citations and are not real answers
+            if response.rewritten_query and response.citations:
+                self.chat_history_processor.record_turn(session, response.rewritten_query, response.answer)
+        response.session_id = session.id
+        return response
+
+    def _chat(self, request: ChatRequest, deadline: Deadline, session: Optional[ChatSession] = None) -> ChatResponse:
         try:
-            logger.info(f"Starting chat request - Query: '{request.query[:50]}...', K: {request.k}, History messages: {len(request.chat_history)}")
+            logger.info(f"Starting chat request - Query: '{request.query[:50]}...', K: {request.k}, History messages: {len(request.chat_history)}, Session: {request.session_id}")
 
             if not request.query:
                 logger.error("Empty query received in chat request")
@@ -33,36 +114,93 @@ class ChatService:
                     rewritten_query=""
                 )
 
-            processed_query = self.query_processor.process_query(request.query)
+            with span("chat", "query_processing"):
+                processed_query = self.query_processor.process_query(request.query)
+                if processed_query and session is not None:
+                    chat_history_context = self.chat_history_processor.extract_session_context(session)
+                elif processed_query:
+                    chat_history_context = self.chat_history_processor.extract_relevant_context(
+                        request.chat_history,
+                    )
             if not processed_query:
                 logger.warning(f"Query processing failed for: '{request.query}'")
-                return ChatResponse(
-                    answer="Please provide a valid question. Your query should be between 2-500 characters.",
-                    citations=[],
-                    rewritten_query=request.query
-                )
+                return self._invalid_query_response(request.query)
 
             logger.info(f"Query processed successfully: '{processed_query}'")
-            chat_history_context = self.chat_history_processor.extract_relevant_context(
-                request.chat_history,
-            )
-            initial_search_results = self.search_service.search(
-                query=processed_query,
-                k=request.k
-            )
+            if deadline.below(self.settings.chat_retrieval_min_remaining_ms):
+                degraded: List[str] = []
+                self._degrade(degraded, "retrieval_skipped", deadline)
+                return self._budget_exhausted_response(processed_query, degraded)
+            try:
+                # Session context is only reused for a follow-up retrieving with the same scope.
+                scope = self._retrieval_scope(request)
+                reusable = session is not None and request.mode == "generative" and session.context_scope == scope
+                query_embedding = None
+                if session is not None or request.mode == "extractive":
+                    query_embedding = self.search_service.embed_query(
+                        processed_query,
+                        timeout=self._wait_timeout(deadline, self.settings.chat_retrieval_min_remaining_ms)
+                    )
+                if reusable and self._is_same_topic(session, query_embedding):
+                    return self._answer_from_session(session, processed_query, chat_history_context, query_embedding, deadline)
+
+                initial_search_results = self.search_service.search(
+                    query=processed_query,
+                    k=request.k,
+                    embedding=query_embedding,
+                    corpora=request.corpora,
+                    exclude_corpora=request.exclude_corpora,
+                    search_filter=request.filter,
+                    diversity=request.diversity,
+                    embedding_timeout=self._wait_timeout(deadline, self.settings.chat_retrieval_min_remaining_ms)
+                )
+            except FutureTimeoutError:
+                degraded = []
+                self._degrade(degraded, "embedding_timeout", deadline)
+                return self._budget_exhausted_response(processed_query, degraded)
             if not initial_search_results:
                 logger.error(f"No search results found for query: '{processed_query}'")
-                return ChatResponse(
-                    answer="I couldn't find any relevant information for your question. Please try rephrasing or asking about GitLab's handbook/direction topics.",
-                    citations=[],
-                    rewritten_query=processed_query
-                )
+                return self._no_results_response(processed_query)
             logger.info(f"Initial search completed - Found {len(initial_search_results)} results")
 
-            relevant_citation_indices = self.citation_analyzer.analyze_relevant_citations(
-                processed_query,
-                initial_search_results
-            )
+            if request.mode == "extractive":
+                return self._extractive_response(processed_query, initial_search_results, [], query_embedding)
+
+            if reusable and self._hits_session_urls(session, initial_search_results):
+                return self._answer_from_session(session, processed_query, chat_history_context, query_embedding, deadline)
+            if session is not None and session.context:
+                CACHE_REQUESTS.labels("session_context", "miss").inc()
+
+            return self._answer(processed_query, initial_search_results, chat_history_context, session=session, query_embedding=query_embedding, deadline=deadline, scope=scope)
+
+        except Exception as e:
+            logger.error(f"Unexpected error in chat service: {str(e)}")
+            return self._error_response(request.query if request.query else "")
+
+    def _answer(
+        self,
+        processed_query: str,
+        initial_search_results: List[ScoredChunk],
+        chat_history_context: str,
+        document_cache: Optional[DocumentCache] = None,
+        session: Optional[ChatSession] = None,
+        query_embedding: Optional[List[float]] = None,
+        deadline: Optional[Deadline] = None,
+        scope: Optional[str] = None
+    ) -> ChatResponse:
+        try:
+            deadline = deadline or Deadline()
+            degraded: List[str] = []
+            if deadline.below(self.settings.chat_citation_min_remaining_ms):
+                self._degrade(degraded, "citation_skipped", deadline)
+                relevant_citation_indices = list(range(1, min(3, len(initial_search_results) + 1)))
+            else:
+                with span("chat", "citation_llm"):
+                    relevant_citation_indices = self.citation_analyzer.analyze_relevant_citations(
+                        processed_query,
+                        initial_search_results,
+                        timeout=deadline.timeout(self.settings.llm_citation_timeout_ms, self.settings.chat_answer_min_remaining_ms)
+                    )
 
             if not relevant_citation_indices:
                 logger.error("No relevant citation indices determined")
@@ -73,11 +211,20 @@ class ChatService:
                 )
 
             logger.info(f"Citation analysis completed - Selected indices: {relevant_citation_indices}")
-            expanded_search_results = self.context_expander.expand_context(
-                initial_search_results,
-                relevant_citation_indices,
-                processed_query
-            )
+            if deadline.below(self.settings.chat_expansion_min_remaining_ms):
+                self._degrade(degraded, "expansion_skipped", deadline)
+                expanded_search_results = [
+                    initial_search_results[i - 1] for i in relevant_citation_indices
+                    if 1 <= i <= len(initial_search_results)
+                ]
+            else:
+                with span("chat", "expansion"):
+                    expanded_search_results = self.context_expander.expand_context(
+                        initial_search_results,
+                        relevant_citation_indices,
+                        processed_query,
+                        document_cache
+                    )
             if not expanded_search_results:
                 logger.error("No expanded search results generated")
                 return ChatResponse(
@@ -87,37 +234,217 @@ class ChatService:
                 )
 
             logger.info(f"Context expansion completed - Final results: {len(expanded_search_results)} documents")
-            context = self.context_builder.build_context(expanded_search_results)
-            logger.info(f"Context built successfully - Length: {len(context)} characters")
-            prompt = self.llm.build_prompt(processed_query, context, chat_history_context)
+            if session is not None and query_embedding is not None and not degraded:
+                self._remember_context(session, expanded_search_results, query_embedding, scope)
+            return self._generate(processed_query, expanded_search_results, chat_history_context, deadline, degraded)
+
+        except Exception as e:
+            logger.error(f"Unexpected error answering query: {str(e)}")
+            return self._error_response(processed_query)
+
+    def _generate(
+        self,
+        processed_query: str,
+        expanded_search_results: List[AnyChunk],
+        chat_history_context: str,
+        deadline: Deadline,
+        degraded: List[str]
+    ) -> ChatResponse:
+        try:
+            with span("chat", "context_build"):
+                max_context_chars = None
+                if deadline.below(self.settings.chat_shrink_context_below_ms):
+                    self._degrade(degraded, "context_shrunk", deadline)
+                    max_context_chars = self.settings.chat_degraded_context_chars
+                    expanded_search_results = self.context_builder.select_within_budget(expanded_search_results, max_context_chars)
+                context = self.context_builder.build_context(expanded_search_results, max_context_chars)
+                logger.info(f"Context built successfully - Length: {len(context)} characters")
+                prompt = self.llm.build_prompt(processed_query, context, chat_history_context)
+
+            if deadline.below(self.settings.chat_answer_min_remaining_ms):
+                self._degrade(degraded, "llm_fallback", deadline)
+                return self._extractive_response(processed_query, expanded_search_results, degraded)
+
             logger.info("Sending prompt to LLM for answer generation, prompt: " + prompt)
-            answer = self.llm.generate(prompt)
+            try:
+                with span("chat", "answer_llm"):
+                    answer = self.llm.generate(prompt, timeout=deadline.timeout(self.settings.llm_timeout_ms))
+            except (RuntimeError, TimeoutError) as e:
+                logger.error(f"Answer generation failed, falling back to non-LLM answer: {str(e)}")
+                self._degrade(degraded, "llm_fallback", deadline)
+                return self._extractive_response(processed_query, expanded_search_results, degraded)
             logger.info(f"LLM response generated successfully - Length: {len(answer)} characters, Answer preview: '{answer}...'")
 
-            citations = []
-            for i, result in enumerate(expanded_search_results, 1):
-                citation = Citation(
-                    id=result['id'],
-                    url=result.get('url', ''),
-                    title=result.get('title', 'Untitled'),
-                    index=i,
-                    total=len(expanded_search_results),
-                    snippet=result.get('content', '')
-                )
-                citations.append(citation)
+            citations = self._build_citations(expanded_search_results)
             logger.info(f"Citations prepared successfully - Count: {len(citations)}")
             final_response = ChatResponse(
                 answer=answer,
                 citations=citations,
-                rewritten_query=processed_query
+                rewritten_query=processed_query,
+                degraded=degraded
             )
             logger.info("Chat request completed successfully")
             return final_response
 
         except Exception as e:
-            logger.error(f"Unexpected error in chat service: {str(e)}")
-            return ChatResponse(
-                answer="Sorry, I encountered a technical error. Please try again later.",
-                citations=[],
-                rewritten_query=request.query if request.query else ""
+            logger.error(f"Unexpected error answering query: {str(e)}")
+            return self._error_response(processed_query)
+
+    def _build_citations(self, results: List[AnyChunk]) -> List[Citation]:
+        citations = []
+        for i, result in enumerate(results, 1):
+            citation = Citation(
+                id=result.id,
+                url=result.url,
+                title=result.title or 'Untitled',
+                index=i,
+                total=len(results),
+                snippet=result.content or ''
             )
+            citations.append(citation)
+        return citations
+
+    def _degrade(self, degraded: List[str], kind: str, deadline: Deadline):
+        degraded.append(kind)
+        CHAT_DEGRADATIONS.labels(kind).inc()
+        logger.warning(f"Degrading chat pipeline: {kind} - Remaining budget: {deadline.remaining_ms():.0f}ms")
+
+    def _extractive_response(
+        self,
+        processed_query: str,
+        results: List[AnyChunk],
+        degraded: List[str],
+        query_embedding: Optional[List[float]] = None
+    ) -> ChatResponse:
+        try:
+            answer, cited = self.extractive_answerer.extract(
+                processed_query,
+                results,
+                query_embedding,
+                fallback="llm_fallback" in degraded
+            )
+        except Exception as e:
+            logger.error(f"Extractive answer failed: {str(e)}")
+            answer, cited = "", []
+        if not answer:
+            cited = results[:self.settings.extractive_max_sentences]
+            answer = "\n".join(f"{' '.join((r.content or '').split())[:300]} [{i}]" for i, r in enumerate(cited, 1))
+        return ChatResponse(
+            answer=answer,
+            citations=self._build_citations(cited),
+            rewritten_query=processed_query,
+            degraded=degraded
+        )
+
+    def _is_same_topic(self, session: ChatSession, query_embedding: List[float]) -> bool:
+        if not session.context or session.topic_embedding is None or len(session.topic_embedding) != len(query_embedding):
+            return False
+        similarity = float(np.dot(session.topic_embedding, query_embedding))
+        logger.info(f"Session topic similarity: {similarity:.3f} - Session: {session.id}")
+        return similarity >= self.settings.session_reuse_similarity
+
+    def _hits_session_urls(self, session: ChatSession, search_results: List[ScoredChunk]) -> bool:
+        if not session.context_urls:
+            return False
+        top_urls = [result.url for result in search_results[:self.settings.session_reuse_top_hits]]
+        overlap = sum(1 for url in top_urls if url in session.context_urls) / len(top_urls)
+        logger.info(f"Session URL overlap: {overlap:.2f} - Session: {session.id}")
+        return overlap >= self.settings.session_reuse_url_overlap
+
+    def _remember_context(self, session: ChatSession, expanded_search_results: List[AnyChunk], query_embedding: List[float], scope: Optional[str]):
+        session.context = expanded_search_results[:self.settings.session_context_max_chunks]
+        session.context_scope = scope
+        session.context_urls = {result.url for result in session.context}
+        session.topic_embedding = list(query_embedding)
+        session.topic_turns = 1
+
+    def _answer_from_session(self, session: ChatSession, processed_query: str, chat_history_context: str, query_embedding: List[float], deadline: Deadline) -> ChatResponse:
+        CACHE_REQUESTS.labels("session_context", "hit").inc()
+        logger.info(f"Reusing session context - Session: {session.id}, Chunks: {len(session.context)}")
+        if session.topic_embedding is None or len(session.topic_embedding) != len(query_embedding):
+            session.topic_embedding, session.topic_turns = list(query_embedding), 1
+        else:
+            topic = np.asarray(session.topic_embedding) * session.topic_turns + np.asarray(query_embedding)
+            norm = np.linalg.norm(topic)
+            session.topic_embedding = (topic / norm if norm else topic).tolist()
+            session.topic_turns += 1
+        return self._generate(processed_query, session.context, chat_history_context, deadline, [])
+
+    def _invalid_query_response(self, query: str) -> ChatResponse:
+        return ChatResponse(
+            answer="Please provide a valid question. Your query should be between 2-500 characters.",
+            citations=[],
+            rewritten_query=query
+        )
+
+    def _no_results_response(self, query: str) -> ChatResponse:
+        return ChatResponse(
+            answer="I couldn't find any relevant information for your question. Please try rephrasing or asking about GitLab's handbook/direction topics.",
+            citations=[],
+            rewritten_query=query
+        )
+
+    def _budget_exhausted_response(self, query: str, degraded: List[str]) -> ChatResponse:
+        return ChatResponse(
+            answer="Sorry, I couldn't answer within the time available. Please try again.",
+            citations=[],
+            rewritten_query=query,
+            degraded=degraded
+        )
+
+    def _error_response(self, query: str) -> ChatResponse:
+        return ChatResponse(
+            answer="Sorry, I encountered a technical error. Please try again later.",
+            citations=[],
+            rewritten_query=query
+        )
+
+    async def chat_batch(self, request: ChatBatchRequest) -> AsyncIterator[ChatBatchResult]:
+        logger.info(f"Starting chat batch - Queries: {len(request.queries)}, K: {request.k}")
+        processed_queries = [self.query_processor.process_query(query) for query in request.queries]
+        valid_positions = [i for i, query in enumerate(processed_queries) if query]
+
+        search_results: Dict[int, List[ScoredChunk]] = {}
+        if valid_positions:
+            batch_results = await asyncio.to_thread(
+                self.search_service.search_batch,
+                [processed_queries[i] for i in valid_positions],
+                request.k,
+                None,
+                request.corpora,
+                request.exclude_corpora,
+                request.filter,
+                request.diversity
+            )
+            search_results = dict(zip(valid_positions, batch_results))
+
+        document_cache = DocumentCache()
+        concurrency = max(1, min(request.concurrency or self.settings.chat_batch_concurrency, self.settings.chat_batch_concurrency))
+        semaphore = asyncio.Semaphore(concurrency)
+
+        async def answer(position: int) -> ChatBatchResult:
+            query = request.queries[position]
+            processed_query = processed_queries[position]
+            if not processed_query:
+                response = self._invalid_query_response(query)
+            elif not search_results.get(position):
+                response = self._no_results_response(processed_query)
+            else:
+                async with semaphore:
+                    response = await asyncio.to_thread(
+                        self._answer,
+                        processed_query,
+                        search_results[position],
+                        "",
+                        document_cache
+                    )
+            return ChatBatchResult(position=position, query=query, response=response)
+
+        tasks = [asyncio.create_task(answer(i)) for i in range(len(request.queries))]
+        try:
+            for next_result in asyncio.as_completed(tasks):
+                yield await next_result
+        finally:
+            for task in tasks:
+                task.cancel()
+        logger.info(f"Chat batch completed - Queries: {len(request.queries)}, Documents fetched: {len(document_cache)}")
@@ -0,0 +1,80 @@
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from typing import List, Optional, Set
+from app.src.config import get_settings
+from app.src.domain.chat import ChatMessage
+from app.src.domain.chunks import AnyChunk
+from app.src.utils.logs import logger
+
+class ChatSession:
+    def __init__(self, session_id: str):
+        self.id = session_id
+        self.summary_lines: List[str] = []
+        self.messages: List[ChatMessage] = []
+        self.turns = 0
+        self.context: List[AnyChunk] = []
+        self.context_urls: Set[str] = set()
+        self.context_scope: Optional[str] = None
+        self.topic_embedding: Optional[List[float]] = None
+        self.topic_turns = 0
+        self.last_access = time.monotonic()
+        self.lock = threading.RLock()
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+class SessionStore:
+    def __init__(self):
+        self.settings = get_settings()
+        self._sessions: "OrderedDict[str, ChatSession]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _is_expired(self, session: ChatSession, now: float) -> bool:
+        return now - session.last_access > self.settings.session_ttl_seconds
+
+    def _evict(self, now: float):
+        expired = [sid for sid, session in self._sessions.items() if self._is_expired(session, now)]
+        for sid in expired:
+            del self._sessions[sid]
+        while len(self._sessions) > self.settings.session_max_sessions:
+            sid, _ = self._sessions.popitem(last=False)
+            expired.append(sid)
+        if expired:
+            logger.info(f"Evicted {len(expired)} chat sessions, active={len(self._sessions)}")
+
+    def _lookup(self, session_id: str, now: float) -> Optional[ChatSession]:
+        session = self._sessions.get(session_id)
+        if session is None:
+            return None
+        if self._is_expired(session, now):
+            del self._sessions[session_id]
+            return None
+        session.last_access = now
+        self._sessions.move_to_end(session_id)
+        return session
+
+    def get(self, session_id: str) -> Optional[ChatSession]:
+        with self._lock:
+            return self._lookup(session_id, time.monotonic())
+
+    def get_or_create(self, session_id: Optional[str] = None) -> ChatSession:
+        now = time.monotonic()
+        with self._lock:
+            session = self._lookup(session_id, now) if session_id else None
+            if session is not None:
+                return session
+            session = ChatSession(session_id or uuid.uuid4().hex)
+            self._sessions[session.id] = session
+            self._evict(now)
+        logger.info(f"Created chat session: {session.id}")
+        return session
+
+    def delete(self, session_id: str) -> bool:
+        with self._lock:
+            return self._sessions.pop(session_id, None) is not None
+
+    def __len__(self) -> int:
+        return len(self._sessions)
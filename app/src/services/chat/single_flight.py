@@ -0,0 +1,39 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.src.utils.logs import logger
+from app.src.utils.metrics import COALESCED_REQUESTS
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[str, Future] = {}
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any], timeout: Optional[float] = None) -> Tuple[Any, bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            is_leader = call is None
+            if is_leader:
+                call = Future()
+                self._calls[key] = call
+            else:
+                self.coalesced += 1
+
+        if not is_leader:
+            COALESCED_REQUESTS.labels(self.name).inc()
+            logger.info(f"Coalesced {self.name} request onto in-flight call - Total coalesced: {self.coalesced}")
+            return call.result(timeout), True
+
+        try:
+            call.set_result(fn())
+        except Exception as e:
+            call.set_exception(e)
+        finally:
+            with self._lock:
+                del self._calls[key]
+        return call.result(), False
+
+    def in_flight(self) -> int:
+        return len(self._calls)
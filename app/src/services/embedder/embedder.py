@@ -1,24 +1,53 @@
+from typing import Any, Dict, Optional
 from sentence_transformers import SentenceTransformer
 from app.src.config import get_settings
+from app.src.services.embedder.sidecar_client import get_sidecar_client
+from app.src.services.store.corpora import get_corpus
 from app.src.utils.logs import logger
+_active_models: Dict[str, str] = {}
+def set_active_model(name: Optional[str], alias: Optional[str] = None):
+    alias = alias or get_corpus().collection
+    if name != _active_models.get(alias):
+        logger.info(f"embedding_model_active alias={alias} name={name or get_settings().embedding_model_name}")
+    if name:
+        _active_models[alias] = name
+    else:
+        _active_models.pop(alias, None)
+def active_model(alias: Optional[str] = None) -> str:
+    return _active_models.get(alias or get_corpus().collection) or get_settings().embedding_model_name
 class Embedder:
     _model = None
-    def __init__(self):
+    _models: Dict[str, Any] = {}
+    def __init__(self, model_name: Optional[str] = None, batch_size: Optional[int] = None, remote: Optional[bool] = None):
         self.s = get_settings()
-        self.batch_size = self.s.embedding_batch_size
+        self.model_name = model_name
+        self.batch_size = batch_size or self.s.embedding_batch_size
+        self.remote = bool(self.s.embedding_sidecar_socket) if remote is None else remote
     def _ensure_model(self):
-        if self.__class__._model is None:
-            logger.info(f"embedding_model_load name={self.s.embedding_model_name}")
-            self.__class__._model = SentenceTransformer(self.s.embedding_model_name, trust_remote_code=True)
+        name = self.model_name or active_model()
+        if name == self.s.embedding_model_name:
+            if self.__class__._model is None:
+                logger.info(f"embedding_model_load name={name}")
+                self.__class__._model = SentenceTransformer(name, trust_remote_code=True)
+            return self.__class__._model
+        if name not in self.__class__._models:
+            logger.info(f"embedding_model_load name={name}")
+            self.__class__._models[name] = SentenceTransformer(name, trust_remote_code=True)
+        return self.__class__._models[name]
+    def preload(self):
+        self._ensure_model()
+
     def embed(self, texts: list[str]) -> list[list[float]]:
         if not texts:
             return []
-        self._ensure_model()
+        if self.remote:
+            return get_sidecar_client().embed(texts, self.model_name or active_model())
+        model = self._ensure_model()
         logger.info(f"embed texts={len(texts)} batch={self.batch_size}")
         out: list[list[float]] = []
         for i in range(0, len(texts), self.batch_size):
             batch = texts[i:i+self.batch_size]
-            arr = self.__class__._model.encode(batch, batch_size=min(self.batch_size, len(batch)), normalize_embeddings=True, convert_to_numpy=True)
+            arr = model.encode(batch, batch_size=min(self.batch_size, len(batch)), normalize_embeddings=True, convert_to_numpy=True)
             for emb in arr:
                 out.append(emb.tolist())
         return out
@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from functools import lru_cache
+from typing import List, NamedTuple, Optional
+from app.src.config import get_settings
+from app.src.services.embedder.embedder import Embedder
+from app.src.utils.logs import logger
+from app.src.utils.metrics import EMBEDDING_BATCH_SIZE, EMBEDDING_QUEUE_DELAY
+
+class PendingEmbedding(NamedTuple):
+    text: str
+    future: Future
+    enqueued: float
+
+class EmbeddingScheduler:
+    def __init__(self, embedder: Optional[Embedder] = None, window_ms: Optional[float] = None, max_batch_size: Optional[int] = None):
+        self.settings = get_settings()
+        self.embedder = embedder or Embedder()
+        self.window = (self.settings.embedding_batch_window_ms if window_ms is None else window_ms) / 1000
+        self.max_batch_size = max_batch_size or self.settings.embedding_batch_max_size
+        self._queue: "queue.Queue[PendingEmbedding]" = queue.Queue()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+    def submit(self, text: str) -> Future:
+        self._ensure_worker()
+        future: Future = Future()
+        self._queue.put(PendingEmbedding(text, future, time.perf_counter()))
+        return future
+
+    def embed(self, text: str, timeout: Optional[float] = None) -> List[float]:
+        future = self.submit(text)
+        try:
+            return future.result(timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise
+
+    def _ensure_worker(self):
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    logger.error("Embedding scheduler thread died, restarting it")
+                self._thread = threading.Thread(target=self._loop, name="embedding-scheduler", daemon=True)
+                self._thread.start()
+                logger.info(f"Embedding scheduler started: window={self.window * 1000:.1f}ms max_batch={self.max_batch_size}")
+
+    def _collect(self) -> List[PendingEmbedding]:
+        batch = [self._queue.get()]
+        deadline = batch[0].enqueued + self.window
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                batch.append(self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return batch
+
+    def _loop(self):
+        while True:
+            batch: List[PendingEmbedding] = []
+            try:
+                batch = self._collect()
+                started = time.perf_counter()
+                # Callers that timed out cancelled their future, so they are not embedded.
+                batch = [pending for pending in batch if pending.future.set_running_or_notify_cancel()]
+                if not batch:
+                    continue
+                for pending in batch:
+                    EMBEDDING_QUEUE_DELAY.observe(started - pending.enqueued)
+                EMBEDDING_BATCH_SIZE.observe(len(batch))
+                texts = list(dict.fromkeys(pending.text for pending in batch))
+                vectors = dict(zip(texts, self.embedder.embed(texts)))
+                for pending in batch:
+                    pending.future.set_result(vectors[pending.text])
+            except Exception as e:
+                logger.error(f"Batched query embedding failed for {len(batch)} queries: {e}")
+                for pending in batch:
+                    if not pending.future.done():
+                        pending.future.set_exception(e)
+
+@lru_cache
+def get_embedding_scheduler(model_name: Optional[str] = None) -> EmbeddingScheduler:
+    return EmbeddingScheduler(Embedder(model_name))
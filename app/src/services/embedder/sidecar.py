@@ -0,0 +1,82 @@
+import argparse
+import asyncio
+import json
+import os
+from typing import Dict, Optional, Tuple
+import numpy as np
+from app.src.config import get_settings
+from app.src.services.embedder.embedder import Embedder
+from app.src.services.embedder.scheduler import EmbeddingScheduler
+from app.src.services.embedder.sidecar_client import FRAME_HEADER
+from app.src.utils.logs import logger
+
+async def read_frame(reader: asyncio.StreamReader) -> bytes:
+    (size,) = FRAME_HEADER.unpack(await reader.readexactly(FRAME_HEADER.size))
+    return await reader.readexactly(size)
+
+def write_frame(writer: asyncio.StreamWriter, payload: bytes):
+    writer.write(FRAME_HEADER.pack(len(payload)) + payload)
+
+class EmbeddingSidecar:
+    def __init__(self, path: Optional[str] = None, window_ms: Optional[float] = None, max_batch_size: Optional[int] = None):
+        self.settings = get_settings()
+        self.path = path or self.settings.embedding_sidecar_socket
+        self.window_ms = window_ms
+        self.max_batch_size = max_batch_size
+        self._schedulers: Dict[str, EmbeddingScheduler] = {}
+
+    def _scheduler(self, model: str) -> EmbeddingScheduler:
+        scheduler = self._schedulers.get(model)
+        if scheduler is None:
+            embedder = Embedder(model, remote=False)
+            scheduler = self._schedulers[model] = EmbeddingScheduler(embedder, self.window_ms, self.max_batch_size)
+        return scheduler
+
+    async def _embed(self, request: Dict) -> Tuple[bytes, int, int]:
+        scheduler = self._scheduler(request.get("model") or self.settings.embedding_model_name)
+        vectors = await asyncio.gather(*(asyncio.wrap_future(scheduler.submit(text)) for text in request["texts"]))
+        return np.asarray(vectors, dtype=np.float32).tobytes(), len(vectors), len(vectors[0]) if vectors else 0
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = json.loads(await read_frame(reader))
+                except asyncio.IncompleteReadError:
+                    break
+                try:
+                    data, n, dim = await self._embed(request)
+                    write_frame(writer, json.dumps({"n": n, "dim": dim}).encode("utf-8"))
+                    write_frame(writer, data)
+                except Exception as e:
+                    logger.error(f"Embedding sidecar request failed: {e}")
+                    write_frame(writer, json.dumps({"error": str(e)}).encode("utf-8"))
+                await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        if os.path.exists(self.path):
+            os.remove(self.path)
+        Embedder(remote=False).preload()
+        server = await asyncio.start_unix_server(self._handle, path=self.path)
+        os.chmod(self.path, 0o660)
+        logger.info(f"Embedding sidecar listening on {self.path}")
+        async with server:
+            await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve query and document embeddings to local workers over a Unix socket")
+    parser.add_argument("--socket", default=None, help="Socket path, defaults to EMBEDDING_SIDECAR_SOCKET")
+    parser.add_argument("--window-ms", type=float, default=None, help="Micro-batching window, defaults to EMBEDDING_BATCH_WINDOW_MS")
+    parser.add_argument("--max-batch-size", type=int, default=None, help="Largest batch, defaults to EMBEDDING_BATCH_MAX_SIZE")
+    args = parser.parse_args()
+
+    path = args.socket or get_settings().embedding_sidecar_socket or "./resources/embedder.sock"
+    asyncio.run(EmbeddingSidecar(path, args.window_ms, args.max_batch_size).serve())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+import json
+import socket
+import struct
+import threading
+from functools import lru_cache
+from typing import List, Optional
+import numpy as np
+from app.src.config import get_settings
+from app.src.utils.logs import logger
+
+FRAME_HEADER = struct.Struct(">I")
+
+def send_frame(conn: socket.socket, payload: bytes):
+    conn.sendall(FRAME_HEADER.pack(len(payload)) + payload)
+
+def recv_exact(conn: socket.socket, size: int) -> bytes:
+    data = bytearray()
+    while len(data) < size:
+        chunk = conn.recv(size - len(data))
+        if not chunk:
+            raise ConnectionError("Embedding sidecar closed the connection")
+        data.extend(chunk)
+    return bytes(data)
+
+def recv_frame(conn: socket.socket) -> bytes:
+    (size,) = FRAME_HEADER.unpack(recv_exact(conn, FRAME_HEADER.size))
+    return recv_exact(conn, size)
+
+class SidecarError(RuntimeError):
+    pass
+
+class SidecarClient:
+    def __init__(self, path: Optional[str] = None, timeout: Optional[float] = None):
+        settings = get_settings()
+        self.path = path or settings.embedding_sidecar_socket
+        self.timeout = timeout or settings.embedding_sidecar_timeout_seconds
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            conn.settimeout(self.timeout)
+            conn.connect(self.path)
+            self._local.conn = conn
+        return conn
+
+    def _reset(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+        self._local.conn = None
+
+    def _request(self, request: bytes):
+        conn = self._connection()
+        send_frame(conn, request)
+        header = json.loads(recv_frame(conn))
+        if "error" in header:
+            raise SidecarError(header["error"])
+        return header, recv_frame(conn)
+
+    def embed(self, texts: List[str], model: str) -> List[List[float]]:
+        request = json.dumps({"model": model, "texts": list(texts)}).encode("utf-8")
+        try:
+            header, data = self._request(request)
+        except (OSError, ConnectionError) as e:
+            self._reset()
+            logger.warning(f"Embedding sidecar connection failed, reconnecting: {e}")
+            try:
+                header, data = self._request(request)
+            except (OSError, ConnectionError) as e:
+                self._reset()
+                logger.error(f"Embedding sidecar at {self.path} unavailable: {e}")
+                raise
+        return np.frombuffer(data, dtype=np.float32).reshape(header["n"], header["dim"]).tolist()
+
+@lru_cache
+def get_sidecar_client() -> SidecarClient:
+    return SidecarClient()
@@ -0,0 +1,130 @@
+import glob
+import gzip
+import json
+import os
+import time
+from typing import Dict, Iterator, List, Optional, Tuple
+from app.src.config import get_settings
+from app.src.utils.logs import logger
+
+DATA_SUFFIX = ".pages.gz"
+LEGACY_DATA_SUFFIX = ".warc.gz"
+INDEX_SUFFIX = ".idx.jsonl"
+
+def read_index(index_path: str) -> Iterator[Dict]:
+    with open(index_path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                logger.warning(f"Ignoring torn archive index record in {index_path}")
+
+def data_path_for(index_path: str) -> str:
+    base = index_path[:-len(INDEX_SUFFIX)]
+    if not os.path.exists(base + DATA_SUFFIX) and os.path.exists(base + LEGACY_DATA_SUFFIX):
+        return base + LEGACY_DATA_SUFFIX
+    return base + DATA_SUFFIX
+
+class PageArchive:
+    def __init__(self, name: str = "pages", directory: Optional[str] = None):
+        self.settings = get_settings()
+        self.directory = directory or self.settings.page_archive_dir
+        os.makedirs(self.directory, exist_ok=True)
+        self.index_path = os.path.join(self.directory, f"{name}{INDEX_SUFFIX}")
+        self.path = data_path_for(self.index_path)
+        self._file = None
+        self._index = None
+        self.written = 0
+
+    def append(self, url: str, html: str, depth: int = 0, fetched_at: Optional[float] = None):
+        if self._file is None:
+            self._file = open(self.path, "ab")
+            self._index = open(self.index_path, "a", encoding="utf-8")
+        fetched_at = round(fetched_at or time.time(), 3)
+        header = json.dumps({"url": url, "fetched_at": fetched_at, "depth": depth})
+        member = gzip.compress(f"{header}\n{html}".encode("utf-8"), compresslevel=self.settings.page_archive_compress_level)
+        offset = self._file.tell()
+        self._file.write(member)
+        self._file.flush()
+        self._index.write(json.dumps({"url": url, "fetched_at": fetched_at, "depth": depth, "offset": offset, "length": len(member)}) + "\n")
+        self._index.flush()
+        self.written += 1
+
+    def close(self):
+        for f in (self._file, self._index):
+            if f is not None:
+                f.close()
+        self._file = self._index = None
+        if self.written:
+            logger.info(f"Archived {self.written} raw pages to {self.path}")
+            if self.settings.page_archive_keep_fetches:
+                self.compact()
+
+    def compact(self, keep: Optional[int] = None) -> int:
+        keep = keep or self.settings.page_archive_keep_fetches
+        if self._file is not None or not os.path.exists(self.index_path):
+            return 0
+        entries = list(read_index(self.index_path))
+        fetches: Dict[str, List[Dict]] = {}
+        for entry in entries:
+            fetches.setdefault(entry["url"], []).append(entry)
+        retained = {id(entry) for history in fetches.values() for entry in sorted(history, key=lambda e: e["fetched_at"])[-keep:]}
+        dropped = len(entries) - len(retained)
+        if not dropped:
+            return 0
+
+        path = self.index_path[:-len(INDEX_SUFFIX)] + DATA_SUFFIX
+        tmp_path, tmp_index_path = path + ".tmp", self.index_path + ".tmp"
+        with open(self.path, "rb") as src, open(tmp_path, "wb") as dst, open(tmp_index_path, "w", encoding="utf-8") as index:
+            for entry in entries:
+                if id(entry) not in retained:
+                    continue
+                src.seek(entry["offset"])
+                member = src.read(entry["length"])
+                index.write(json.dumps({**entry, "offset": dst.tell()}) + "\n")
+                dst.write(member)
+        os.replace(tmp_path, path)
+        os.replace(tmp_index_path, self.index_path)
+        if path != self.path:
+            os.remove(self.path)
+            self.path = path
+        logger.info(f"Compacted page archive {self.path}: dropped {dropped} older fetches, kept {len(retained)}")
+        return dropped
+
+def load_index(directory: Optional[str] = None) -> Dict[str, Dict]:
+    directory = directory or get_settings().page_archive_dir
+    latest: Dict[str, Dict] = {}
+    for index_path in sorted(glob.glob(os.path.join(directory, f"*{INDEX_SUFFIX}"))):
+        data_path = data_path_for(index_path)
+        for entry in read_index(index_path):
+            previous = latest.get(entry["url"])
+            if previous is None or entry["fetched_at"] >= previous["fetched_at"]:
+                entry["path"] = data_path
+                latest[entry["url"]] = entry
+    return latest
+
+def read_page(f, entry: Dict) -> str:
+    f.seek(entry["offset"])
+    _, html = gzip.decompress(f.read(entry["length"])).decode("utf-8").split("\n", 1)
+    return html
+
+def iter_archive(directory: Optional[str] = None, limit: int = 0) -> Iterator[Tuple[str, int, str]]:
+    entries = sorted(load_index(directory).values(), key=lambda entry: (entry["path"], entry["offset"]))
+    if limit:
+        entries = entries[:limit]
+    logger.info(f"Replaying {len(entries)} archived pages")
+    f, path = None, None
+    try:
+        for entry in entries:
+            if entry["path"] != path:
+                if f is not None:
+                    f.close()
+                path = entry["path"]
+                f = open(path, "rb")
+            try:
+                yield entry["url"], entry["depth"], read_page(f, entry)
+            except Exception as e:
+                logger.error(f"Error reading archived page {entry['url']}: {e}")
+    finally:
+        if f is not None:
+            f.close()
@@ -5,6 +5,8 @@ from app.src.domain.chunks import Chunk
 from app.src.domain.raw_page import RawPage
 from app.src.utils.logs import logger
 
+CHUNK_NAMESPACE = uuid.UUID('12345678-1234-5678-1234-123456789abc')
+
 
 class Chunker:
     def __init__(self):
@@ -26,8 +28,7 @@ class Chunker:
         for i, part in enumerate(parts):
             if len(part.strip()) < 20:
                 continue
-            namespace = uuid.UUID('12345678-1234-5678-1234-123456789abc')
-            chunk_id = str(uuid.uuid5(namespace, f"{page.url}-{i}"))
+            chunk_id = str(uuid.uuid5(CHUNK_NAMESPACE, f"{page.url}-{i}"))
             chunks.append(
                 Chunk(
                     id=chunk_id,
@@ -1,58 +1,120 @@
 import asyncio
-from typing import Optional, Set
+from typing import Dict, List, Optional, Set, Tuple
 from urllib.parse import urljoin, urldefrag, urlparse
 import httpx
 from bs4 import BeautifulSoup
 from app.src.config import get_settings
+from app.src.domain.corpus import Corpus
 from app.src.domain.raw_page import RawPage
+from app.src.services.ingest.archive import PageArchive, iter_archive
+from app.src.services.ingest.frontier import Frontier
+from app.src.services.ingest.progress import IngestProgress
 from app.src.utils.logs import logger
+from app.src.utils.metrics import INGEST_ITEMS
+from app.src.utils.tracing import span
 
 
 class Crawler:
-    def __init__(self):
+    def __init__(
+        self,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+        archive: Optional[PageArchive] = None,
+        corpus: Optional[Corpus] = None,
+        progress: Optional[IngestProgress] = None
+    ):
         self.settings = get_settings()
+        self.transport = transport
+        self.archive = archive
+        self.progress = progress
+        self.base_urls = corpus.base_urls if corpus else self.settings.base_urls
+        self.max_pages = corpus.crawl_max_pages if corpus else self.settings.crawl_max_pages
+        self.max_depth = corpus.crawl_max_depth if corpus else self.settings.crawl_max_depth
         self.seen = set()
+        self.frontier: Dict[str, int] = {}
         self._pages_count = 0
 
+    def _count(self, stage: str):
+        INGEST_ITEMS.labels(stage).inc()
+        if self.progress is not None:
+            self.progress.add(stage)
+
     def allowed(self, url: str) -> bool:
-        return any(base in url for base in self.settings.base_urls)
+        return any(base in url for base in self.base_urls)
 
-    def extract_text(self, html: str) -> tuple[str, Optional[str]]:
+    def parse_page(self, html: str) -> tuple[str, Optional[str], List[str]]:
         soup = BeautifulSoup(html, 'html.parser')
-        body = soup.body or soup
-        text = body.get_text(strip=True, separator='\n')
         title_tag = soup.find('title')
         title = title_tag.text.strip() if title_tag else None
+        links = [link['href'] for link in soup.find_all('a', href=True)]
+        text = None
         try:
             from trafilatura import extract
-            tranfilatura_text = extract(html, include_comments=False, include_images=False, favor_recall=True, output_format='markdown')
-            text = tranfilatura_text or text
+            text = extract(html, include_comments=False, include_images=False, favor_recall=True, output_format='markdown')
         except Exception:
             pass
-        return text or '', title
+        if not text:
+            body = soup.body or soup
+            text = body.get_text(strip=True, separator='\n')
+        return text or '', title, links
 
-    async def enqueue_a_tags(self, html: str, depth, url_queue):
-        soup = BeautifulSoup(html, 'html.parser')
-        for link in soup.find_all('a', href=True):
-            next_url = link['href']
-            if next_url not in self.seen and self.allowed(next_url):
-                await url_queue.put((next_url, depth + 1))
-
-    async def crawl(self, queue: asyncio.Queue, previsited: Optional[Set[str]] = None):
+    def extract_text(self, html: str) -> tuple[str, Optional[str]]:
+        text, title, _ = self.parse_page(html)
+        return text, title
+
+    def ack(self, url: str):
+        self.frontier.pop(url, None)
+
+    async def enqueue(self, url: str, depth: int, url_queue):
+        if url in self.seen or url in self.frontier:
+            return
+        self.frontier[url] = depth
+        await url_queue.put((url, depth))
+
+    async def enqueue_links(self, links: List[str], depth, url_queue):
+        for next_url in links:
+            if self.allowed(next_url):
+                await self.enqueue(next_url, depth + 1, url_queue)
+
+    async def fetch_page(self, client: httpx.AsyncClient, url: str, depth: int = 0) -> Optional[Tuple[str, Optional[str], List[str]]]:
+        with span("ingest", "fetch"):
+            response = await client.get(url, timeout=self.settings.request_timeout)
+        self._count("fetch")
+
+        if response.status_code != 200 or 'text/html' not in response.headers.get('content-type', '').lower():
+            logger.warning(f"Skipping {url}: status={response.status_code}")
+            return None
+
+        if self.archive is not None:
+            self.archive.append(url, response.text, depth)
+        return self.read_html(url, response.text)
+
+    def read_html(self, url: str, html: str) -> Optional[Tuple[str, Optional[str], List[str]]]:
+        with span("ingest", "parse"):
+            text, title, links = self.parse_page(html)
+        self._count("parse")
+        if len(text.strip()) < 100:
+            logger.warning(f"Skipping {url}: insufficient content")
+            return None
+        return text, title, links
+
+    async def crawl(self, queue: asyncio.Queue, previsited: Optional[Set[str]] = None, frontier: Optional[Dict[str, int]] = None):
         self.seen = previsited or set()
+        self.frontier = {}
         self._pages_count = 0
         url_queue = asyncio.Queue()
 
-        for url in self.settings.base_urls:
-            if url not in self.seen:
-                await url_queue.put((url, 0))
+        seeds = frontier or {url: 0 for url in self.base_urls}
+        for url, depth in seeds.items():
+            await self.enqueue(url, depth, url_queue)
+        if frontier:
+            logger.info(f"Resuming crawl from {len(self.frontier)} frontier urls")
 
-        logger.info(f"Starting crawl with max_pages={self.settings.crawl_max_pages}")
+        logger.info(f"Starting crawl with max_pages={self.max_pages}")
 
-        async with httpx.AsyncClient(headers={'User-Agent': self.settings.user_agent}) as client:
+        async with httpx.AsyncClient(headers={'User-Agent': self.settings.user_agent}, transport=self.transport) as client:
             async def worker():
                 while True:
-                    if self._pages_count >= self.settings.crawl_max_pages:
+                    if self._pages_count >= self.max_pages:
                         while not url_queue.empty():
                             url_queue.get_nowait()
                             url_queue.task_done()
@@ -62,33 +124,30 @@ class Crawler:
                     except asyncio.TimeoutError:
                         return
 
-                    if depth > self.settings.crawl_max_depth or url in self.seen:
+                    if depth > self.max_depth or url in self.seen:
+                        self.frontier.pop(url, None)
                         url_queue.task_done()
                         continue
 
+                    queued = False
                     try:
-                        response = await client.get(url, timeout=self.settings.request_timeout)
-
-                        if response.status_code != 200 or 'text/html' not in response.headers.get('content-type', '').lower():
-                            logger.warning(f"Skipping {url}: status={response.status_code}")
-                            url_queue.task_done()
-                            continue
-
-                        text, title = self.extract_text(response.text)
-                        if len(text.strip()) < 100:
-                            logger.warning(f"Skipping {url}: insufficient content")
-                            url_queue.task_done()
+                        page = await self.fetch_page(client, url, depth)
+                        if page is None:
                             continue
+                        text, title, links = page
 
-                        await queue.put(RawPage(url=url, depth=depth, html=response.text, text=text, title=title))
+                        await queue.put(RawPage(url, depth, text, title))
+                        queued = True
                         self.seen.add(url)
                         self._pages_count += 1
-                        if depth < self.settings.crawl_max_depth:
-                            await self.enqueue_a_tags(response.text, depth, url_queue)
+                        if depth < self.max_depth:
+                            await self.enqueue_links(links, depth, url_queue)
 
                     except Exception as e:
                         logger.error(f"Error crawling {url}: {e}")
                     finally:
+                        if not queued:
+                            self.frontier.pop(url, None)
                         url_queue.task_done()
 
             workers = [asyncio.create_task(worker()) for _ in range(self.settings.max_concurrency)]
@@ -101,3 +160,66 @@ class Crawler:
         await queue.put(None)
         logger.info(f"Crawling complete: {self._pages_count} pages")
         return self._pages_count
+
+    async def crawl_shard(self, queue: asyncio.Queue, frontier: Frontier, shard: int):
+        self._pages_count = 0
+        logger.info(f"Starting crawl of shard {shard}/{frontier.shards} with global max_pages={frontier.max_pages}")
+
+        async with httpx.AsyncClient(headers={'User-Agent': self.settings.user_agent}, transport=self.transport) as client:
+            async def worker():
+                while not frontier.budget_exhausted():
+                    claimed = frontier.claim(shard)
+                    if not claimed:
+                        if frontier.outstanding() == 0:
+                            return
+                        await asyncio.sleep(self.settings.crawl_shard_poll_seconds)
+                        continue
+
+                    url, depth = claimed[0]
+                    queued = False
+                    try:
+                        if depth > self.max_depth:
+                            continue
+                        page = await self.fetch_page(client, url, depth)
+                        if page is None or not frontier.reserve_page():
+                            continue
+                        text, title, links = page
+
+                        if depth < self.max_depth:
+                            frontier.add((link, depth + 1) for link in links if self.allowed(link))
+                        await queue.put(RawPage(url, depth, text, title))
+                        queued = True
+                        self._pages_count += 1
+                        frontier.mark_fetched(url)
+
+                    except Exception as e:
+                        logger.error(f"Error crawling {url}: {e}")
+                    finally:
+                        if not queued:
+                            frontier.complete([url], ok=False)
+
+            workers = [asyncio.create_task(worker()) for _ in range(self.settings.max_concurrency)]
+            await asyncio.gather(*workers)
+
+        await queue.put(None)
+        logger.info(f"Crawling of shard {shard} complete: {self._pages_count} pages")
+        return self._pages_count
+
+    async def replay(self, queue: asyncio.Queue, directory: Optional[str] = None):
+        self._pages_count = 0
+        for url, depth, html in iter_archive(directory):
+            try:
+                page = self.read_html(url, html)
+            except Exception as e:
+                logger.error(f"Error replaying {url}: {e}")
+                continue
+            if page is None:
+                continue
+            text, title, _ = page
+            await queue.put(RawPage(url, depth, text, title))
+            self._pages_count += 1
+            await asyncio.sleep(0)
+
+        await queue.put(None)
+        logger.info(f"Replay complete: {self._pages_count} pages")
+        return self._pages_count
@@ -0,0 +1,92 @@
+import re
+import zlib
+from collections import defaultdict
+from typing import Dict, List, Set, Tuple
+import numpy as np
+from app.src.config import get_settings
+from app.src.domain.chunks import Chunk
+from app.src.utils.logs import logger
+
+MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+MAX_HASH = np.uint64((1 << 32) - 1)
+TOKEN_PATTERN = re.compile(r"\w+")
+
+class MinHashDeduplicator:
+    def __init__(self):
+        settings = get_settings()
+        self.num_perm = settings.dedup_num_perm
+        self.bands = settings.dedup_bands
+        self.rows = self.num_perm // self.bands
+        self.threshold = settings.dedup_threshold
+        self.shingle_size = settings.dedup_shingle_size
+        rng = np.random.RandomState(settings.dedup_seed)
+        self._a = rng.randint(1, 1 << 32, size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=self.num_perm, dtype=np.uint64)
+        self._buckets: Dict[Tuple[int, bytes], List[str]] = defaultdict(list)
+        self._signatures: Dict[str, np.ndarray] = {}
+        self.aliases: Dict[str, List[Dict]] = {}
+        self.seen = 0
+        self.dropped = 0
+
+    def _shingles(self, text: str) -> Set[int]:
+        tokens = TOKEN_PATTERN.findall(text.lower())
+        if len(tokens) <= self.shingle_size:
+            return {zlib.crc32(" ".join(tokens).encode("utf-8"))}
+        return {
+            zlib.crc32(" ".join(tokens[i:i + self.shingle_size]).encode("utf-8"))
+            for i in range(len(tokens) - self.shingle_size + 1)
+        }
+
+    def signature(self, text: str) -> np.ndarray:
+        hashes = np.fromiter(self._shingles(text), dtype=np.uint64)
+        permuted = (np.outer(hashes, self._a) + self._b) % MERSENNE_PRIME & MAX_HASH
+        return permuted.min(axis=0)
+
+    def _band_keys(self, signature: np.ndarray) -> List[Tuple[int, bytes]]:
+        return [(band, signature[band * self.rows:(band + 1) * self.rows].tobytes()) for band in range(self.bands)]
+
+    def _find_duplicate(self, signature: np.ndarray, keys: List[Tuple[int, bytes]]) -> str:
+        checked = set()
+        for key in keys:
+            for candidate in self._buckets.get(key, ()):
+                if candidate in checked:
+                    continue
+                checked.add(candidate)
+                if np.mean(self._signatures[candidate] == signature) >= self.threshold:
+                    return candidate
+        return ""
+
+    def filter(self, chunks: List[Chunk]) -> Tuple[List[Chunk], Set[str]]:
+        kept = []
+        updated = set()
+        for chunk in chunks:
+            self.seen += 1
+            signature = self.signature(chunk.content)
+            keys = self._band_keys(signature)
+            canonical = self._find_duplicate(signature, keys)
+            if canonical:
+                self.dropped += 1
+                self.aliases.setdefault(canonical, []).append({
+                    "url": chunk.url,
+                    "title": chunk.title or "",
+                    "index": chunk.index,
+                    "total": chunk.total
+                })
+                updated.add(canonical)
+                continue
+
+            self._signatures[chunk.id] = signature
+            for key in keys:
+                self._buckets[key].append(chunk.id)
+            kept.append(chunk)
+
+        if len(kept) < len(chunks):
+            logger.debug(f"Dropped {len(chunks) - len(kept)} near-duplicate chunks out of {len(chunks)}")
+        return kept, updated
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "chunks_seen": self.seen,
+            "duplicates_dropped": self.dropped,
+            "reduction": round(self.dropped / self.seen, 4) if self.seen else 0.0
+        }
@@ -0,0 +1,236 @@
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+PENDING, LEASED, DONE, SKIPPED, FETCHED = 0, 1, 2, 3, 4
+
+class Frontier(ABC):
+    def __init__(self, shards: int = 1, max_pages: int = 0, lease_seconds: float = 300.0):
+        self.shards = shards
+        self.max_pages = max_pages
+        self.lease_seconds = lease_seconds
+
+    def shard_of(self, url: str) -> int:
+        return zlib.crc32(url.encode("utf-8")) % self.shards
+
+    @abstractmethod
+    def add(self, urls: Iterable[Tuple[str, int]]) -> int:
+        ...
+
+    @abstractmethod
+    def mark_seen(self, urls: Iterable[str]):
+        ...
+
+    @abstractmethod
+    def claim(self, shard: int, limit: int = 1) -> List[Tuple[str, int]]:
+        ...
+
+    @abstractmethod
+    def complete(self, urls: Iterable[str], ok: bool = True):
+        ...
+
+    @abstractmethod
+    def mark_fetched(self, url: str):
+        ...
+
+    @abstractmethod
+    def requeue_unfinished(self) -> int:
+        ...
+
+    @abstractmethod
+    def reserve_page(self) -> bool:
+        ...
+
+    @abstractmethod
+    def budget_exhausted(self) -> bool:
+        ...
+
+    @abstractmethod
+    def outstanding(self) -> int:
+        ...
+
+    @abstractmethod
+    def done_urls(self) -> Set[str]:
+        ...
+
+    def close(self):
+        pass
+
+class InMemoryFrontier(Frontier):
+    def __init__(self, shards: int = 1, max_pages: int = 0, lease_seconds: float = 300.0):
+        super().__init__(shards, max_pages, lease_seconds)
+        self._lock = threading.Lock()
+        self._urls: Dict[str, List] = {}
+        self._pages = 0
+
+    def add(self, urls: Iterable[Tuple[str, int]]) -> int:
+        added = 0
+        with self._lock:
+            for url, depth in urls:
+                if url not in self._urls:
+                    self._urls[url] = [self.shard_of(url), depth, PENDING, 0.0]
+                    added += 1
+        return added
+
+    def mark_seen(self, urls: Iterable[str]):
+        with self._lock:
+            for url in urls:
+                self._urls.setdefault(url, [self.shard_of(url), 0, DONE, 0.0])
+
+    def claim(self, shard: int, limit: int = 1) -> List[Tuple[str, int]]:
+        now = time.time()
+        claimed = []
+        with self._lock:
+            for url, entry in self._urls.items():
+                if entry[0] != shard:
+                    continue
+                if entry[2] == PENDING or (entry[2] == LEASED and now - entry[3] > self.lease_seconds):
+                    entry[2], entry[3] = LEASED, now
+                    claimed.append((url, entry[1]))
+                    if len(claimed) >= limit:
+                        break
+        return claimed
+
+    def complete(self, urls: Iterable[str], ok: bool = True):
+        with self._lock:
+            for url in urls:
+                if url in self._urls:
+                    self._urls[url][2] = DONE if ok else SKIPPED
+
+    def mark_fetched(self, url: str):
+        with self._lock:
+            if url in self._urls and self._urls[url][2] == LEASED:
+                self._urls[url][2] = FETCHED
+
+    def requeue_unfinished(self) -> int:
+        requeued = 0
+        with self._lock:
+            for entry in self._urls.values():
+                if entry[2] in (LEASED, FETCHED):
+                    entry[2] = PENDING
+                    requeued += 1
+        return requeued
+
+    def reserve_page(self) -> bool:
+        with self._lock:
+            if self.max_pages and self._pages >= self.max_pages:
+                return False
+            self._pages += 1
+            return True
+
+    def budget_exhausted(self) -> bool:
+        return bool(self.max_pages) and self._pages >= self.max_pages
+
+    def outstanding(self) -> int:
+        with self._lock:
+            return sum(1 for entry in self._urls.values() if entry[2] in (PENDING, LEASED))
+
+    def done_urls(self) -> Set[str]:
+        with self._lock:
+            return {url for url, entry in self._urls.items() if entry[2] == DONE}
+
+class SqliteFrontier(Frontier):
+    def __init__(self, path: str, shards: int = 1, max_pages: int = 0, lease_seconds: float = 300.0):
+        super().__init__(shards, max_pages, lease_seconds)
+        self.path = path
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, timeout=30.0, isolation_level=None, check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS urls (url TEXT PRIMARY KEY, shard INTEGER, depth INTEGER, state INTEGER, leased_at REAL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS urls_shard_state ON urls (shard, state)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value INTEGER)")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('pages', 0)")
+        self._conn.execute("INSERT OR IGNORE INTO meta VALUES ('max_pages', ?)", (max_pages,))
+        self.max_pages = self._conn.execute("SELECT value FROM meta WHERE key = 'max_pages'").fetchone()[0]
+
+    def _transaction(self, fn):
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = fn(self._conn)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def add(self, urls: Iterable[Tuple[str, int]]) -> int:
+        rows = [(url, self.shard_of(url), depth, PENDING) for url, depth in urls]
+        if not rows:
+            return 0
+
+        def insert(conn):
+            before = conn.total_changes
+            conn.executemany("INSERT OR IGNORE INTO urls VALUES (?, ?, ?, ?, NULL)", rows)
+            return conn.total_changes - before
+        return self._transaction(insert)
+
+    def mark_seen(self, urls: Iterable[str]):
+        rows = [(url, self.shard_of(url), 0, DONE) for url in urls]
+        if rows:
+            self._transaction(lambda conn: conn.executemany("INSERT OR IGNORE INTO urls VALUES (?, ?, ?, ?, NULL)", rows))
+
+    def claim(self, shard: int, limit: int = 1) -> List[Tuple[str, int]]:
+        now = time.time()
+
+        def lease(conn):
+            rows = conn.execute(
+                "SELECT url, depth FROM urls WHERE shard = ? AND (state = ? OR (state = ? AND leased_at < ?)) "
+                "ORDER BY depth LIMIT ?",
+                (shard, PENDING, LEASED, now - self.lease_seconds, limit)
+            ).fetchall()
+            conn.executemany("UPDATE urls SET state = ?, leased_at = ? WHERE url = ?", [(LEASED, now, url) for url, _ in rows])
+            return rows
+        return [(url, depth) for url, depth in self._transaction(lease)]
+
+    def complete(self, urls: Iterable[str], ok: bool = True):
+        rows = [(DONE if ok else SKIPPED, url) for url in urls]
+        if rows:
+            self._transaction(lambda conn: conn.executemany("UPDATE urls SET state = ? WHERE url = ?", rows))
+
+    def mark_fetched(self, url: str):
+        self._transaction(lambda conn: conn.execute("UPDATE urls SET state = ? WHERE url = ? AND state = ?", (FETCHED, url, LEASED)))
+
+    def requeue_unfinished(self) -> int:
+        return self._transaction(
+            lambda conn: conn.execute("UPDATE urls SET state = ? WHERE state IN (?, ?)", (PENDING, LEASED, FETCHED)).rowcount
+        )
+
+    def reserve_page(self) -> bool:
+        if not self.max_pages:
+            return True
+
+        def reserve(conn):
+            cursor = conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'pages' AND value < ?", (self.max_pages,))
+            return cursor.rowcount == 1
+        return self._transaction(reserve)
+
+    def budget_exhausted(self) -> bool:
+        if not self.max_pages:
+            return False
+        with self._lock:
+            return self._conn.execute("SELECT value FROM meta WHERE key = 'pages'").fetchone()[0] >= self.max_pages
+
+    def outstanding(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM urls WHERE state IN (?, ?)", (PENDING, LEASED)).fetchone()[0]
+
+    def done_urls(self) -> Set[str]:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT url FROM urls WHERE state = ?", (DONE,))}
+
+    def close(self):
+        self._conn.close()
+
+def open_frontier(path: Optional[str], shards: int, max_pages: int, lease_seconds: float) -> Frontier:
+    if path:
+        return SqliteFrontier(path, shards, max_pages, lease_seconds)
+    return InMemoryFrontier(shards, max_pages, lease_seconds)
@@ -0,0 +1,348 @@
+import fcntl
+import multiprocessing
+import os
+import queue
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from app.src.config import get_settings
+from app.src.services.ingest.pipeline import IngestCancelled, IngestionPipeline
+from app.src.services.ingest.progress import IngestProgress
+from app.src.services.ingest.reembed import ReembedMigration
+from app.src.services.ingest.sharded import frontier_path, open_shared_frontier, prepare_frontier, run_shard
+from app.src.services.store.corpora import get_corpus
+from app.src.services.store.registry import get_collection_registry
+from app.src.services.store.visited_store import VisitedStore
+from app.src.utils.logs import logger
+
+ACTIVE_STATES = ("queued", "running", "cancelling")
+
+class IngestJobConflict(Exception):
+    pass
+
+class CollectionLock:
+    def __init__(self, collection: str):
+        self.settings = get_settings()
+        os.makedirs(self.settings.ingest_journal_dir, exist_ok=True)
+        self.path = os.path.join(self.settings.ingest_journal_dir, f"{collection}.lock")
+        self._fd: Optional[int] = None
+
+    def acquire(self, owner: str):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            with open(self.path, "r", encoding="utf-8") as f:
+                holder = f.read().strip() or "another process"
+            raise IngestJobConflict(f"Ingestion already running for this collection: {holder}")
+        os.ftruncate(fd, 0)
+        os.write(fd, owner.encode("utf-8"))
+        self._fd = fd
+
+    def release(self):
+        if self._fd is not None:
+            fcntl.flock(self._fd, fcntl.LOCK_UN)
+            os.close(self._fd)
+            self._fd = None
+
+class IngestJob:
+    def __init__(
+        self,
+        collection: str,
+        resume: bool,
+        mode: str,
+        rebuild: bool = False,
+        workers: int = 1,
+        source: str = "crawl",
+        kind: str = "ingest",
+        embedding_model: Optional[str] = None,
+        corpus: Optional[str] = None
+    ):
+        self.id = uuid.uuid4().hex
+        self.collection = collection
+        self.corpus = corpus or collection
+        self.kind = kind
+        self.embedding_model = embedding_model
+        self.source = source
+        self.resume = resume and source == "crawl"
+        workers = workers if source == "crawl" else 1
+        self.mode = "process" if workers > 1 else mode
+        self.rebuild = rebuild
+        self.workers = workers
+        self.target_collection: Optional[str] = None
+        self.status = "queued"
+        self.created_at = time.time()
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+        self.progress: Dict[str, Any] = {}
+        self.result: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.cancel_event = multiprocessing.get_context("spawn").Event() if self.mode == "process" else threading.Event()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "job_id": self.id,
+            "kind": self.kind,
+            "corpus": self.corpus,
+            "collection": self.collection,
+            "status": self.status,
+            "mode": self.mode,
+            "source": self.source,
+            "resume": self.resume,
+            "rebuild": self.rebuild,
+            "workers": self.workers,
+            "target_collection": self.target_collection,
+            "embedding_model": self.embedding_model,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "progress": self.progress,
+            "result": self.result,
+            "error": self.error,
+        }
+
+def _run_in_process(resume: bool, target_collection: Optional[str], source: str, corpus: str, events, cancel_event):
+    progress = IngestProgress(sink=lambda snapshot: events.put(("progress", snapshot)))
+    try:
+        pipeline = IngestionPipeline(progress, cancel_event, target_collection, source=source, corpus=get_corpus(corpus))
+        result = pipeline.run_sync(resume)
+        events.put(("completed", result))
+    except IngestCancelled:
+        events.put(("cancelled", None))
+    except Exception as e:
+        events.put(("failed", str(e)))
+
+def _run_shard_in_process(
+    shard: int,
+    shards: int,
+    path: str,
+    resume: bool,
+    target_collection: Optional[str],
+    corpus: str,
+    events,
+    cancel_event
+):
+    progress = IngestProgress(sink=lambda snapshot: events.put((shard, "progress", snapshot)))
+    try:
+        result = run_shard(shard, shards, path, target_collection, resume, progress, cancel_event, corpus)
+        events.put((shard, "completed", result))
+    except IngestCancelled:
+        events.put((shard, "cancelled", None))
+    except Exception as e:
+        events.put((shard, "failed", str(e)))
+
+def _merge_shard_progress(snapshots: Dict[int, Dict[str, Any]]) -> Dict[str, Any]:
+    stages: Dict[str, Dict[str, float]] = {}
+    for snapshot in snapshots.values():
+        for stage, stats in snapshot.get("stages", {}).items():
+            merged = stages.setdefault(stage, {"items": 0, "items_per_s": 0.0})
+            merged["items"] += stats["items"]
+            merged["items_per_s"] = round(merged["items_per_s"] + stats["items_per_s"], 2)
+    etas = [snapshot["eta_s"] for snapshot in snapshots.values() if snapshot.get("eta_s") is not None]
+    return {
+        "elapsed_s": max((snapshot.get("elapsed_s", 0.0) for snapshot in snapshots.values()), default=0.0),
+        "pages": sum(snapshot.get("pages", 0) for snapshot in snapshots.values()),
+        "chunks": sum(snapshot.get("chunks", 0) for snapshot in snapshots.values()),
+        "frontier": max((snapshot.get("frontier", 0) for snapshot in snapshots.values()), default=0),
+        "stages": stages,
+        "eta_s": max(etas) if etas else None,
+        "shards": {str(shard): snapshot for shard, snapshot in sorted(snapshots.items())},
+    }
+
+class IngestJobManager:
+    def __init__(self):
+        self.settings = get_settings()
+        self._jobs: "OrderedDict[str, IngestJob]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def start(
+        self,
+        resume: bool = False,
+        mode: Optional[str] = None,
+        rebuild: bool = False,
+        workers: Optional[int] = None,
+        source: str = "crawl",
+        corpus: Optional[str] = None
+    ) -> IngestJob:
+        workers = max(1, workers or self.settings.ingest_workers)
+        corpus = get_corpus(corpus)
+        job = IngestJob(corpus.collection, resume, mode or self.settings.ingest_worker_mode, rebuild, workers, source, corpus=corpus.name)
+        self._launch(job)
+        logger.info(f"Ingestion job started: {job.id} corpus={job.corpus} collection={job.collection} mode={job.mode} source={job.source} workers={job.workers} resume={resume} rebuild={rebuild}")
+        return job
+
+    def start_reembed(self, embedding_model: str, resume: bool = False, corpus: Optional[str] = None) -> IngestJob:
+        corpus = get_corpus(corpus)
+        job = IngestJob(corpus.collection, resume, "thread", kind="reembed", embedding_model=embedding_model, corpus=corpus.name)
+        self._launch(job)
+        logger.info(f"Re-embedding job started: {job.id} collection={job.collection} model={embedding_model} resume={resume}")
+        return job
+
+    def _launch(self, job: IngestJob):
+        collection_lock = CollectionLock(job.collection)
+        collection_lock.acquire(job.id)
+        with self._lock:
+            self._jobs[job.id] = job
+            finished = [job_id for job_id, known in self._jobs.items() if known.finished_at is not None]
+            for job_id in finished[:max(0, len(self._jobs) - self.settings.ingest_job_history)]:
+                del self._jobs[job_id]
+        threading.Thread(target=self._run, args=(job, collection_lock), name=f"ingest-{job.id[:8]}", daemon=True).start()
+
+    def get(self, job_id: str) -> Optional[IngestJob]:
+        return self._jobs.get(job_id)
+
+    def list(self) -> List[IngestJob]:
+        return list(reversed(self._jobs.values()))
+
+    def cancel(self, job_id: str) -> Optional[IngestJob]:
+        job = self.get(job_id)
+        if job is not None and job.status in ACTIVE_STATES:
+            job.status = "cancelling"
+            job.cancel_event.set()
+            logger.info(f"Ingestion job cancellation requested: {job.id}")
+        return job
+
+    def _run(self, job: IngestJob, collection_lock: CollectionLock):
+        job.started_at = time.time()
+        if job.status == "queued":
+            job.status = "running"
+        try:
+            registry = get_collection_registry()
+            if job.rebuild or job.kind == "reembed":
+                job.target_collection = (
+                    (job.resume and registry.building_version(job.collection, job.embedding_model))
+                    or registry.create_version(job.collection, job.embedding_model)
+                )
+            if job.kind == "reembed":
+                self._run_reembed(job, registry.live(job.collection))
+            elif job.workers > 1:
+                self._run_sharded(job)
+            elif job.mode == "process":
+                self._run_process(job)
+            else:
+                self._run_thread(job)
+            if job.target_collection and job.status == "completed":
+                registry.promote(job.collection, job.target_collection)
+        except Exception as e:
+            job.status, job.error = "failed", str(e)
+        finally:
+            job.finished_at = time.time()
+            collection_lock.release()
+            logger.info(f"Ingestion job finished: {job.id} status={job.status}")
+
+    def _run_thread(self, job: IngestJob):
+        progress = IngestProgress(sink=lambda snapshot: setattr(job, "progress", snapshot))
+        try:
+            pipeline = IngestionPipeline(progress, job.cancel_event, job.target_collection, source=job.source, corpus=get_corpus(job.corpus))
+            job.result = pipeline.run_sync(job.resume)
+            job.status = "completed"
+        except IngestCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Ingestion job {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+
+    def _run_reembed(self, job: IngestJob, source_collection: Optional[str]):
+        if source_collection is None:
+            raise ValueError(f"No live collection behind alias {job.collection} to re-embed")
+        progress = IngestProgress(sink=lambda snapshot: setattr(job, "progress", snapshot))
+        try:
+            migration = ReembedMigration(source_collection, job.target_collection, job.embedding_model, progress, job.cancel_event)
+            job.result = migration.run(job.resume)
+            job.status = "completed"
+        except IngestCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            logger.error(f"Re-embedding job {job.id} failed: {e}")
+            job.status, job.error = "failed", str(e)
+
+    def _run_process(self, job: IngestJob):
+        context = multiprocessing.get_context("spawn")
+        events = context.Queue()
+        process = context.Process(target=_run_in_process, args=(job.resume, job.target_collection, job.source, job.corpus, events, job.cancel_event), name=f"ingest-{job.id[:8]}")
+        process.start()
+        while True:
+            try:
+                kind, payload = events.get(timeout=1.0)
+            except queue.Empty:
+                if not process.is_alive():
+                    job.status, job.error = "failed", f"Ingestion worker exited with code {process.exitcode}"
+                    break
+                continue
+            if kind == "progress":
+                job.progress = payload
+                continue
+            job.status = kind
+            if kind == "completed":
+                job.result = payload
+            elif kind == "failed":
+                job.error = payload
+            break
+        process.join()
+
+    def _run_sharded(self, job: IngestJob):
+        corpus = get_corpus(job.corpus)
+        path = frontier_path(job.target_collection or job.collection)
+        visited_store = VisitedStore(job.collection)
+        visited = () if job.rebuild else visited_store.get_visited_urls()
+        prepare_frontier(path, job.workers, job.resume, visited, job.target_collection, corpus).close()
+
+        context = multiprocessing.get_context("spawn")
+        events = context.Queue()
+        processes = [
+            context.Process(
+                target=_run_shard_in_process,
+                args=(shard, job.workers, path, job.resume, job.target_collection, job.corpus, events, job.cancel_event),
+                name=f"ingest-{job.id[:8]}-shard{shard}"
+            )
+            for shard in range(job.workers)
+        ]
+        for process in processes:
+            process.start()
+
+        snapshots: Dict[int, Dict[str, Any]] = {}
+        outcomes: Dict[int, Any] = {}
+        while len(outcomes) < job.workers:
+            try:
+                shard, kind, payload = events.get(timeout=1.0)
+            except queue.Empty:
+                for shard, process in enumerate(processes):
+                    if shard not in outcomes and not process.is_alive():
+                        outcomes[shard] = ("failed", f"Ingestion shard {shard} exited with code {process.exitcode}")
+                continue
+            if kind == "progress":
+                snapshots[shard] = payload
+                job.progress = _merge_shard_progress(snapshots)
+                continue
+            outcomes[shard] = (kind, payload)
+            if kind == "failed":
+                job.cancel_event.set()
+        for process in processes:
+            process.join()
+
+        kinds = {kind for kind, _ in outcomes.values()}
+        errors = [f"shard {shard}: {payload}" for shard, (kind, payload) in sorted(outcomes.items()) if kind == "failed"]
+        if errors:
+            job.status, job.error = "failed", "; ".join(errors)
+        elif "cancelled" in kinds:
+            job.status = "cancelled"
+        else:
+            results = [payload for _, payload in outcomes.values()]
+            job.result = {key: sum(result[key] for result in results) for key in results[0]}
+            job.result["shards"] = job.workers
+            job.status = "completed"
+
+        frontier = open_shared_frontier(path, job.workers)
+        try:
+            visited_store.visited_urls |= frontier.done_urls()
+        finally:
+            frontier.close()
+        visited_store.save_visited()
+
+@lru_cache
+def get_ingest_job_manager() -> IngestJobManager:
+    return IngestJobManager()
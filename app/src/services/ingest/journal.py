@@ -0,0 +1,90 @@
+import json
+import os
+import time
+from typing import Dict, List, Optional, Set, Tuple
+from app.src.config import get_settings
+from app.src.utils.logs import logger
+
+class IngestJournal:
+    def __init__(self, name: Optional[str] = None):
+        self.settings = get_settings()
+        name = name or self.settings.collection_name
+        os.makedirs(self.settings.ingest_journal_dir, exist_ok=True)
+        self.path = os.path.join(self.settings.ingest_journal_dir, f"{name}.journal.jsonl")
+        self.frontier_path = os.path.join(self.settings.ingest_journal_dir, f"{name}.frontier.json")
+        self._file = None
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def load(self) -> Tuple[Set[str], Dict[str, int]]:
+        states: Dict[str, str] = {}
+        depths: Dict[str, int] = {}
+        if os.path.exists(self.path):
+            with open(self.path, "r", encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                    except json.JSONDecodeError:
+                        logger.warning(f"Ignoring torn journal record in {self.path}")
+                        continue
+                    states[record["url"]] = record["state"]
+                    if "depth" in record:
+                        depths[record["url"]] = record["depth"]
+
+        frontier: Dict[str, int] = {}
+        if os.path.exists(self.frontier_path):
+            try:
+                with open(self.frontier_path, "r", encoding="utf-8") as f:
+                    frontier = {url: depth for url, depth in json.load(f)}
+            except Exception as e:
+                logger.error(f"Error loading ingestion frontier: {e}")
+        done = {url for url, state in states.items() if state == "upserted"}
+        for url, state in states.items():
+            if state != "upserted":
+                frontier.setdefault(url, depths.get(url, 0))
+        logger.info(f"Loaded ingestion journal: {len(done)} urls done, {len(frontier)} urls to resume")
+        return done, frontier
+
+    def open(self, resume: bool = False):
+        if not resume:
+            for path in (self.path, self.frontier_path):
+                if os.path.exists(path):
+                    os.remove(path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._last_flush = time.monotonic()
+
+    def record(self, url: str, state: str, **fields):
+        self._file.write(json.dumps({"t": round(time.time(), 3), "url": url, "state": state, **fields}) + "\n")
+        self._pending += 1
+
+    def record_many(self, urls: List[str], state: str):
+        for url in urls:
+            self.record(url, state)
+
+    def due(self) -> bool:
+        return (
+            self._pending >= self.settings.ingest_journal_flush_records
+            or time.monotonic() - self._last_flush >= self.settings.ingest_journal_flush_seconds
+        )
+
+    def flush(self, frontier: Optional[Dict[str, int]] = None):
+        if self._file is None:
+            return
+        self._file.flush()
+        os.fsync(self._file.fileno())
+        if frontier is not None:
+            tmp_path = self.frontier_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(sorted(frontier.items()), f)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp_path, self.frontier_path)
+        logger.debug(f"Ingestion checkpoint: {self._pending} journal records, frontier={len(frontier or {})}")
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def close(self, frontier: Optional[Dict[str, int]] = None):
+        self.flush(frontier)
+        if self._file is not None:
+            self._file.close()
+            self._file = None
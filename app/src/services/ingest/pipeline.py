@@ -1,65 +1,187 @@
 import asyncio
-from typing import List
+import os
+from typing import Dict, List, Optional
 from app.src.config import get_settings
+from app.src.domain.corpus import Corpus
+from app.src.services.ingest.archive import PageArchive
 from app.src.services.ingest.chunker import Chunker
 from app.src.services.ingest.crawler import Crawler
+from app.src.services.ingest.dedup import MinHashDeduplicator
+from app.src.services.ingest.frontier import Frontier
+from app.src.services.ingest.journal import IngestJournal
+from app.src.services.ingest.progress import IngestProgress
 from app.src.services.embedder.embedder import Embedder
+from app.src.services.store.registry import get_collection_registry
 from app.src.services.store.store import VectorStore
 from app.src.services.store.visited_store import VisitedStore
 from app.src.utils.logs import logger
+from app.src.utils.metrics import INGEST_ITEMS
+from app.src.utils.tracing import span
 from app.src.domain.chunks import Chunk
 
 
+class IngestCancelled(Exception):
+    pass
+
+
 class IngestionPipeline:
-    def __init__(self):
+    def __init__(
+        self,
+        progress: Optional[IngestProgress] = None,
+        cancel_event=None,
+        target_collection: Optional[str] = None,
+        frontier: Optional[Frontier] = None,
+        shard: int = 0,
+        source: str = "crawl",
+        corpus: Optional[Corpus] = None
+    ):
         self.settings = get_settings()
-        self.crawler = Crawler()
+        self.progress = progress or IngestProgress()
+        self.cancel_event = cancel_event
+        self.frontier = frontier
+        self.shard = shard
+        self.source = source
+        self.corpus = corpus
+        collection = corpus.collection if corpus else self.settings.collection_name
+        self.archive_dir = self.settings.page_archive_dir
+        if collection != self.settings.collection_name:
+            self.archive_dir = os.path.join(self.settings.page_archive_dir, corpus.name)
+        self.archive = None
+        if source == "crawl" and self.settings.page_archive_enabled:
+            self.archive = PageArchive(f"pages.shard{shard}" if frontier is not None else "pages", self.archive_dir)
+        self.crawler = Crawler(archive=self.archive, corpus=corpus, progress=self.progress)
+        self.progress.max_pages = self.crawler.max_pages
         self.chunker = Chunker()
-        self.embedder = Embedder()
-        self.vector_store = VectorStore()
-        self.visited_store = VisitedStore()
-
-    async def run(self):
+        registry = get_collection_registry()
+        self.embedder = Embedder(registry.embedding_model(target_collection or registry.live(collection)))
+        self.vector_store = VectorStore(target_collection or collection, alias=target_collection is None)
+        self.visited_store = VisitedStore(collection)
+        if target_collection is not None or frontier is not None or source == "archive":
+            self.visited_store.visited_urls = set()
+        self.deduplicator = MinHashDeduplicator()
+        journal_name = target_collection or collection
+        self.journal = IngestJournal(f"{journal_name}.shard{shard}" if frontier is not None else journal_name)
+
+    async def run(self, resume: bool = False):
         queue = asyncio.Queue()
 
-        visited_urls = self.visited_store.get_visited_urls()
-        crawler_task = asyncio.create_task(self.crawler.crawl(queue, visited_urls))
+        if self.source == "archive":
+            self.journal.open()
+            crawler_task = asyncio.create_task(self.crawler.replay(queue, self.archive_dir))
+        elif self.frontier is not None:
+            self.journal.open(resume)
+            crawler_task = asyncio.create_task(self.crawler.crawl_shard(queue, self.frontier, self.shard))
+        else:
+            visited_urls = self.visited_store.get_visited_urls()
+            frontier = None
+            if resume:
+                done, frontier = self.journal.load()
+                visited_urls |= done
+                for url in done:
+                    self.visited_store.mark_visited(url)
+            self.journal.open(resume)
+            crawler_task = asyncio.create_task(self.crawler.crawl(queue, visited_urls, frontier))
 
         total_pages = 0
         total_chunks = 0
         chunk_buffer: List[Chunk] = []
+        buffer_urls: List[str] = []
+
+        logger.info(f"Starting ingestion pipeline (source={self.source}, resume={resume})")
+
+        try:
+            while True:
+                page = await self._next_page(queue)
+                if page is None:
+                    break
+                if self.visited_store.is_visited(page.url):
+                    self.crawler.ack(page.url)
+                    continue
+
+                self.visited_store.mark_visited(page.url)
+                self.journal.record(page.url, "fetched", depth=page.depth)
+                self.crawler.ack(page.url)
+                total_pages += 1
+                self._count("pages", 1)
+                self.progress.set_frontier(self.frontier.outstanding() if self.frontier is not None else len(self.crawler.frontier))
+
+                with span("ingest", "chunk"):
+                    chunks = self.chunker.chunk_page(page)
+                self._count("chunk", len(chunks))
+                if self.settings.dedup_enabled:
+                    chunks = self._deduplicate(chunks, chunk_buffer)
+                self.journal.record(page.url, "chunked", chunks=len(chunks))
+                if chunks:
+                    chunk_buffer.extend(chunks)
+                    buffer_urls.append(page.url)
+                else:
+                    self._mark_upserted([page.url])
+
+                if len(chunk_buffer) >= 10:
+                    await self._process_chunks(chunk_buffer, buffer_urls)
+                    total_chunks += len(chunk_buffer)
+                    chunk_buffer.clear()
+                    buffer_urls.clear()
+
+                if self.journal.due():
+                    self.journal.flush(self._checkpoint_frontier())
+
+            if chunk_buffer:
+                await self._process_chunks(chunk_buffer, buffer_urls)
+                total_chunks += len(chunk_buffer)
 
-        logger.info("Starting ingestion pipeline")
-
+            pages_crawled = await crawler_task
+            if self.frontier is None and self.source == "crawl":
+                self.visited_store.save_visited()
+        except IngestCancelled:
+            crawler_task.cancel()
+            await asyncio.gather(crawler_task, return_exceptions=True)
+            logger.warning(f"Ingestion cancelled after {total_pages} pages, resume with the journal to continue")
+            raise
+        finally:
+            self.journal.close(self._checkpoint_frontier())
+            if self.archive is not None:
+                self.archive.close()
+            self.progress.publish()
+
+        dedup_stats = self.deduplicator.stats()
+        logger.info(
+            f"Ingestion complete: {pages_crawled} pages, {total_chunks} chunks, "
+            f"{dedup_stats['duplicates_dropped']} near-duplicates dropped ({dedup_stats['reduction']:.1%})"
+        )
+        return {"pages": pages_crawled, "chunks": total_chunks, "duplicates_dropped": dedup_stats["duplicates_dropped"]}
+
+    def _checkpoint_frontier(self) -> Optional[Dict[str, int]]:
+        return self.crawler.frontier if self.frontier is None and self.source == "crawl" else None
+
+    def _mark_upserted(self, urls: List[str]):
+        self.journal.record_many(urls, "upserted")
+        if self.frontier is not None:
+            self.frontier.complete(urls)
+
+    async def _next_page(self, queue: asyncio.Queue):
         while True:
-            page = await queue.get()
-            if page is None:
-                break
-            if self.visited_store.is_visited(str(page.url)):
+            if self.cancel_event is not None and self.cancel_event.is_set():
+                raise IngestCancelled()
+            try:
+                return await asyncio.wait_for(queue.get(), timeout=1.0)
+            except asyncio.TimeoutError:
                 continue
 
-            self.visited_store.mark_visited(str(page.url))
-            total_pages += 1
+    def _count(self, stage: str, count: int):
+        INGEST_ITEMS.labels(stage).inc(count)
+        self.progress.add(stage, count)
 
-            chunks = self.chunker.chunk_page(page)
-            chunk_buffer.extend(chunks)
+    def _deduplicate(self, chunks: List[Chunk], chunk_buffer: List[Chunk]) -> List[Chunk]:
+        with span("ingest", "dedup"):
+            kept, updated = self.deduplicator.filter(chunks)
+            pending = {chunk.id for chunk in chunk_buffer} | {chunk.id for chunk in kept}
+            for canonical_id in updated - pending:
+                self.vector_store.set_aliases(canonical_id, self.deduplicator.aliases[canonical_id])
+        self._count("dedup_dropped", len(chunks) - len(kept))
+        return kept
 
-            if len(chunk_buffer) >= 10:
-                await self._process_chunks(chunk_buffer)
-                total_chunks += len(chunk_buffer)
-                chunk_buffer.clear()
-
-        if chunk_buffer:
-            await self._process_chunks(chunk_buffer)
-            total_chunks += len(chunk_buffer)
-
-        pages_crawled = await crawler_task
-        self.visited_store.save_visited()
-
-        logger.info(f"Ingestion complete: {pages_crawled} pages, {total_chunks} chunks")
-        return {"pages": pages_crawled, "chunks": total_chunks}
-
-    async def _process_chunks(self, chunks: List[Chunk]):
+    async def _process_chunks(self, chunks: List[Chunk], page_urls: List[str]):
         if not chunks:
             return
 
@@ -67,16 +189,23 @@ class IngestionPipeline:
         documents = [chunk.content for chunk in chunks]
         metadatas = [
             {
-                "url": str(chunk.url),
+                "url": chunk.url,
                 "title": chunk.title or "",
                 "index": chunk.index,
-                "total": chunk.total
+                "total": chunk.total,
+                **({"aliases": self.deduplicator.aliases[chunk.id]} if chunk.id in self.deduplicator.aliases else {})
             }
             for chunk in chunks
         ]
 
-        embeddings = self.embedder.embed(documents)
-        self.vector_store.add(ids, documents, metadatas, embeddings)
-
-    def run_sync(self):
-        return asyncio.run(self.run())
+        with span("ingest", "embed"):
+            embeddings = self.embedder.embed(documents)
+        self._count("embed", len(embeddings))
+        self.journal.record_many(page_urls, "embedded")
+        with span("ingest", "upsert"):
+            self.vector_store.add(ids, documents, metadatas, embeddings)
+        self._count("upsert", len(ids))
+        self._mark_upserted(page_urls)
+
+    def run_sync(self, resume: bool = False):
+        return asyncio.run(self.run(resume))
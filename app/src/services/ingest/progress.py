@@ -0,0 +1,65 @@
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+from app.src.config import get_settings
+
+class IngestProgress:
+    def __init__(self, sink: Optional[Callable[[Dict[str, Any]], None]] = None, publish_interval: float = 1.0):
+        self.settings = get_settings()
+        self.sink = sink
+        self.publish_interval = publish_interval
+        self._lock = threading.Lock()
+        self._started = time.monotonic()
+        self._last_publish = 0.0
+        self._items: Dict[str, int] = {}
+        self._frontier = 0
+        self._total: Optional[Tuple[str, int]] = None
+        self.max_pages = self.settings.crawl_max_pages
+
+    def add(self, stage: str, count: int = 1):
+        with self._lock:
+            self._items[stage] = self._items.get(stage, 0) + count
+        self._maybe_publish()
+
+    def set_frontier(self, size: int):
+        self._frontier = size
+
+    def set_total(self, stage: str, total: int):
+        self._total = (stage, total)
+
+    def _maybe_publish(self, force: bool = False):
+        if self.sink is None:
+            return
+        now = time.monotonic()
+        if force or now - self._last_publish >= self.publish_interval:
+            self._last_publish = now
+            self.sink(self.snapshot())
+
+    def publish(self):
+        self._maybe_publish(force=True)
+
+    def snapshot(self) -> Dict[str, Any]:
+        elapsed = time.monotonic() - self._started
+        with self._lock:
+            items = dict(self._items)
+        pages = items.get("pages", 0)
+        pages_per_s = pages / elapsed if elapsed else 0.0
+        remaining = max(0, self.max_pages - pages)
+        if self._frontier:
+            remaining = min(remaining, self._frontier)
+        if self._total is not None:
+            stage, total = self._total
+            pages_per_s = items.get(stage, 0) / elapsed if elapsed else 0.0
+            remaining = max(0, total - items.get(stage, 0))
+
+        return {
+            "elapsed_s": round(elapsed, 1),
+            "pages": pages,
+            "chunks": items.get("upsert", 0),
+            "frontier": self._frontier,
+            "stages": {
+                stage: {"items": count, "items_per_s": round(count / elapsed, 2) if elapsed else 0.0}
+                for stage, count in items.items()
+            },
+            "eta_s": round(remaining / pages_per_s, 1) if pages_per_s and remaining else None,
+        }
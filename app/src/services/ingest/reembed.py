@@ -0,0 +1,103 @@
+import json
+import os
+from typing import Any, Dict, Optional, Tuple
+from app.src.config import get_settings
+from app.src.services.embedder.embedder import Embedder
+from app.src.services.ingest.pipeline import IngestCancelled
+from app.src.services.ingest.progress import IngestProgress
+from app.src.services.store.store import VectorStore, get_qdrant_client
+from app.src.utils.logs import logger
+from app.src.utils.metrics import INGEST_ITEMS
+from app.src.utils.tracing import qdrant_span, span
+
+class ReembedMigration:
+    def __init__(
+        self,
+        source_collection: str,
+        target_collection: str,
+        embedding_model: str,
+        progress: Optional[IngestProgress] = None,
+        cancel_event=None
+    ):
+        self.settings = get_settings()
+        self.client = get_qdrant_client()
+        self.source_collection = source_collection
+        self.target_collection = target_collection
+        self.embedding_model = embedding_model
+        self.progress = progress or IngestProgress()
+        self.cancel_event = cancel_event
+        self.embedder = Embedder(embedding_model, self.settings.reembed_batch_size)
+        self.store = VectorStore(target_collection, embedding_model)
+        os.makedirs(self.settings.ingest_journal_dir, exist_ok=True)
+        self.checkpoint_path = os.path.join(self.settings.ingest_journal_dir, f"{target_collection}.reembed.json")
+
+    def _load_checkpoint(self) -> Tuple[Any, int]:
+        if not os.path.exists(self.checkpoint_path):
+            return None, 0
+        try:
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                checkpoint = json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading re-embedding checkpoint: {e}")
+            return None, 0
+        if checkpoint.get("source") != self.source_collection:
+            logger.warning(f"Ignoring re-embedding checkpoint for a different source collection: {checkpoint.get('source')}")
+            return None, 0
+        return checkpoint.get("offset"), checkpoint.get("migrated", 0)
+
+    def _save_checkpoint(self, offset: Any, migrated: int):
+        tmp_path = self.checkpoint_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"source": self.source_collection, "offset": offset, "migrated": migrated}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _count(self, stage: str, count: int):
+        INGEST_ITEMS.labels(stage).inc(count)
+        self.progress.add(stage, count)
+
+    def run(self, resume: bool = False) -> Dict[str, Any]:
+        offset, migrated = self._load_checkpoint() if resume else (None, 0)
+        if migrated:
+            logger.info(f"Resuming re-embedding of {self.source_collection} after {migrated} points")
+        total = self.client.count(collection_name=self.source_collection).count
+        self.progress.set_total("reembed", max(0, total - migrated))
+        logger.info(f"Re-embedding {total} points from {self.source_collection} into {self.target_collection} with {self.embedding_model}")
+
+        try:
+            while True:
+                if self.cancel_event is not None and self.cancel_event.is_set():
+                    raise IngestCancelled()
+                with qdrant_span("scroll"):
+                    points, next_offset = self.client.scroll(
+                        collection_name=self.source_collection,
+                        limit=self.settings.reembed_scroll_size,
+                        offset=offset,
+                        with_payload=True,
+                        with_vectors=False
+                    )
+                if points:
+                    ids = [str(point.id) for point in points]
+                    documents = [(point.payload or {}).get("content", "") for point in points]
+                    metadatas = [{k: v for k, v in (point.payload or {}).items() if k != "content"} for point in points]
+                    with span("ingest", "embed"):
+                        embeddings = self.embedder.embed(documents)
+                    with span("ingest", "upsert"):
+                        self.store.add(ids, documents, metadatas, embeddings)
+                    migrated += len(points)
+                    self._count("reembed", len(points))
+                self._save_checkpoint(next_offset, migrated)
+                if next_offset is None:
+                    break
+                offset = next_offset
+        finally:
+            self.progress.publish()
+
+        logger.info(f"Re-embedding complete: {migrated} points into {self.target_collection}")
+        return {
+            "points": migrated,
+            "source_collection": self.source_collection,
+            "target_collection": self.target_collection,
+            "embedding_model": self.embedding_model
+        }
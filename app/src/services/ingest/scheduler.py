@@ -0,0 +1,101 @@
+import fcntl
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+from app.src.config import get_settings
+from app.src.domain.corpus import Corpus
+from app.src.services.ingest.jobs import IngestJobConflict, IngestJobManager, get_ingest_job_manager
+from app.src.services.store.corpora import get_corpora
+from app.src.utils.logs import logger
+
+class IngestScheduler:
+    def __init__(self, manager: Optional[IngestJobManager] = None):
+        self.settings = get_settings()
+        self.manager = manager or get_ingest_job_manager()
+        self.path = os.path.join(self.settings.ingest_journal_dir, "schedule.json")
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._leader_fd: Optional[int] = None
+
+    def _load(self) -> Dict[str, float]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading ingestion schedule state: {e}")
+            return {}
+
+    def _save(self, state: Dict[str, float]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def due(self, now: Optional[float] = None) -> List[Corpus]:
+        now = now or time.time()
+        state = self._load()
+        return [
+            corpus for corpus in get_corpora().values()
+            if corpus.schedule_hours > 0 and now - state.get(corpus.name, 0.0) >= corpus.schedule_hours * 3600
+        ]
+
+    def tick(self):
+        for corpus in self.due():
+            try:
+                job = self.manager.start(rebuild=True, corpus=corpus.name)
+            except IngestJobConflict as e:
+                logger.info(f"Scheduled ingestion of corpus {corpus.name} postponed: {e}")
+                continue
+            state = self._load()
+            state[corpus.name] = time.time()
+            self._save(state)
+            logger.info(f"Scheduled ingestion of corpus {corpus.name} started: {job.id}")
+
+    def _lead(self) -> bool:
+        # Every API worker starts the scheduler, but only the one holding this lock runs it.
+        # The others keep polling it and take over if that worker goes away.
+        if self._leader_fd is not None:
+            return True
+        os.makedirs(self.settings.ingest_journal_dir, exist_ok=True)
+        fd = os.open(os.path.join(self.settings.ingest_journal_dir, "schedule.lock"), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._leader_fd = fd
+        logger.info(f"Ingestion scheduler is running in process {os.getpid()}")
+        return True
+
+    def _loop(self):
+        while not self._stop.is_set():
+            try:
+                if self._lead():
+                    self.tick()
+            except Exception as e:
+                logger.error(f"Ingestion scheduler tick failed: {e}")
+            self._stop.wait(self.settings.ingest_scheduler_poll_seconds)
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._loop, name="ingest-scheduler", daemon=True)
+        self._thread.start()
+        logger.info(f"Ingestion scheduler started for {sum(1 for c in get_corpora().values() if c.schedule_hours > 0)} scheduled corpora")
+
+    def stop(self):
+        self._stop.set()
+        if self._leader_fd is not None:
+            fcntl.flock(self._leader_fd, fcntl.LOCK_UN)
+            os.close(self._leader_fd)
+            self._leader_fd = None
+
+@lru_cache
+def get_ingest_scheduler() -> IngestScheduler:
+    return IngestScheduler()
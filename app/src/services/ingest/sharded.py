@@ -0,0 +1,82 @@
+import argparse
+import os
+from typing import Iterable, Optional
+from app.src.config import get_settings
+from app.src.domain.corpus import Corpus
+from app.src.services.ingest.frontier import Frontier, SqliteFrontier
+from app.src.services.ingest.pipeline import IngestionPipeline
+from app.src.services.ingest.progress import IngestProgress
+from app.src.services.store.corpora import get_corpus
+from app.src.services.store.store import VectorStore
+from app.src.utils.logs import logger
+
+def frontier_path(name: Optional[str] = None) -> str:
+    settings = get_settings()
+    return os.path.join(settings.ingest_journal_dir, f"{name or settings.collection_name}.frontier.sqlite")
+
+def open_shared_frontier(path: str, shards: int, max_pages: Optional[int] = None) -> Frontier:
+    settings = get_settings()
+    max_pages = settings.crawl_max_pages if max_pages is None else max_pages
+    return SqliteFrontier(path, shards, max_pages, settings.ingest_frontier_lease_seconds)
+
+def prepare_frontier(
+    path: str,
+    shards: int,
+    resume: bool = False,
+    visited: Iterable[str] = (),
+    target_collection: Optional[str] = None,
+    corpus: Optional[Corpus] = None
+) -> Frontier:
+    corpus = corpus or get_corpus()
+    VectorStore(target_collection or corpus.collection, alias=target_collection is None)
+    if not resume:
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(path + suffix):
+                os.remove(path + suffix)
+    frontier = open_shared_frontier(path, shards, corpus.crawl_max_pages)
+    if resume:
+        requeued = frontier.requeue_unfinished()
+        logger.info(f"Resuming sharded frontier {path}: {requeued} unfinished URLs requeued, {frontier.outstanding()} outstanding")
+    else:
+        frontier.mark_seen(visited)
+        frontier.add((url, 0) for url in corpus.base_urls)
+        logger.info(f"Seeded sharded frontier {path} with {len(corpus.base_urls)} base URLs of corpus {corpus.name} across {shards} shards")
+    return frontier
+
+def run_shard(
+    shard: int,
+    shards: int,
+    path: str,
+    target_collection: Optional[str] = None,
+    resume: bool = False,
+    progress: Optional[IngestProgress] = None,
+    cancel_event=None,
+    corpus_name: Optional[str] = None
+):
+    frontier = open_shared_frontier(path, shards)
+    try:
+        pipeline = IngestionPipeline(progress, cancel_event, target_collection, frontier, shard, corpus=get_corpus(corpus_name))
+        return pipeline.run_sync(resume)
+    finally:
+        frontier.close()
+
+def main():
+    parser = argparse.ArgumentParser(description="Run one shard of a sharded crawl and ingestion")
+    parser.add_argument("--shard", type=int, required=True)
+    parser.add_argument("--shards", type=int, required=True)
+    parser.add_argument("--frontier", default=None, help="Path of the shared frontier database")
+    parser.add_argument("--target-collection", default=None)
+    parser.add_argument("--corpus", default=None, help="Corpus to crawl, defaults to the default corpus")
+    parser.add_argument("--seed", action="store_true", help="Create and seed the frontier before running")
+    parser.add_argument("--resume", action="store_true")
+    args = parser.parse_args()
+
+    corpus = get_corpus(args.corpus)
+    path = args.frontier or frontier_path(args.target_collection or corpus.collection)
+    if args.seed:
+        prepare_frontier(path, args.shards, args.resume, target_collection=args.target_collection, corpus=corpus).close()
+    result = run_shard(args.shard, args.shards, path, args.target_collection, args.resume, corpus_name=corpus.name)
+    logger.info(f"Shard {args.shard}/{args.shards} finished: {result}")
+
+if __name__ == "__main__":
+    main()
@@ -1,54 +1,383 @@
-from typing import List, Dict, Any, Optional
+import contextvars
+import numpy as np
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Optional, Tuple, TypeVar
 from app.src.config import get_settings
-from app.src.services.embedder.embedder import Embedder
+from app.src.domain.chunks import ScoredChunk, ScoredGroup
+from app.src.domain.corpus import Corpus
+from app.src.domain.search import HYDRATED_FIELDS, SEARCH_FIELDS, SearchFilter
+from app.src.services.embedder.embedder import Embedder, active_model
+from app.src.services.embedder.scheduler import get_embedding_scheduler
+from app.src.services.store.corpora import get_corpus, select_corpora
 from app.src.services.store.store import VectorStore
 from app.src.utils.logs import logger
+from app.src.utils.metrics import RETRIEVAL_DEPTH
+from app.src.utils.tracing import span
+
+T = TypeVar("T")
 
 class SearchService:
     def __init__(self):
         self.settings = get_settings()
-        self.embedder = Embedder()
-        self.store = VectorStore()
+        self._embedders: Dict[str, Embedder] = {}
+        self._stores: Dict[str, VectorStore] = {}
+        self._pool = ThreadPoolExecutor(max_workers=self.settings.search_fanout_workers, thread_name_prefix="search-fanout")
+
+    @property
+    def store(self) -> VectorStore:
+        return self.store_for(get_corpus())
+
+    def store_for(self, corpus: Corpus) -> VectorStore:
+        store = self._stores.get(corpus.name)
+        if store is None:
+            store = self._stores[corpus.name] = VectorStore(corpus.collection, alias=True)
+        return store
+
+    def model_for(self, corpus: Corpus) -> str:
+        return active_model(corpus.collection)
+
+    def embedder_for(self, model: str) -> Embedder:
+        embedder = self._embedders.get(model)
+        if embedder is None:
+            embedder = self._embedders[model] = Embedder(model)
+        return embedder
+
+    def query_model(self) -> str:
+        return self.model_for(get_corpus())
+
+    def embed_query(self, query: str, model: Optional[str] = None, timeout: Optional[float] = None) -> List[float]:
+        model = model or self.query_model()
+        with span("retrieval", "embed"):
+            if self.settings.embedding_batching_enabled:
+                return get_embedding_scheduler(model).embed(query, timeout)
+            return self.embedder_for(model).embed([query])[0]
+
+    def _embed_for(
+        self,
+        query: str,
+        targets: List[Corpus],
+        embedding: Optional[List[float]] = None,
+        timeout: Optional[float] = None
+    ) -> Dict[str, List[float]]:
+        # Corpora can be live on different embedding models, so the query is embedded once per distinct model.
+        # A caller-supplied embedding comes from embed_query and therefore belongs to the default corpus's model.
+        embeddings = {self.model_for(get_corpus()): embedding} if embedding is not None else {}
+        for model in dict.fromkeys(self.model_for(corpus) for corpus in targets):
+            if model not in embeddings:
+                embeddings[model] = self.embed_query(query, model, timeout)
+        return embeddings
+
+    def _embed_batch_for(self, queries: List[str], targets: List[Corpus]) -> Dict[str, List[List[float]]]:
+        with span("retrieval", "embed"):
+            return {model: self.embedder_for(model).embed(queries) for model in dict.fromkeys(self.model_for(corpus) for corpus in targets)}
+
+    def _query_fields(self, payload_fields: Optional[List[str]], hydrate: bool) -> Optional[List[str]]:
+        fields = SEARCH_FIELDS if payload_fields is None else payload_fields
+        return [field for field in fields if field not in HYDRATED_FIELDS] if hydrate else payload_fields
+
+    def _fanout(self, targets: List[Corpus], fn: Callable[[Corpus, VectorStore], T]) -> List[Tuple[Corpus, T]]:
+        if len(targets) == 1:
+            return [(targets[0], fn(targets[0], self.store_for(targets[0])))]
+        # Each task runs in a copy of the caller's context so its log lines keep the request id.
+        futures = [(corpus, self._pool.submit(contextvars.copy_context().run, fn, corpus, self.store_for(corpus))) for corpus in targets]
+        return [(corpus, future.result()) for corpus, future in futures]
+
+    def _normalize(self, scores: List[float]) -> Callable[[float], float]:
+        if not scores:
+            return lambda score: score
+        low, high = min(scores), max(scores)
+        if high == low:
+            return lambda score: 1.0
+        return lambda score: (score - low) / (high - low)
+
+    def _merge(self, per_corpus: List[Tuple[Corpus, List[ScoredChunk]]]) -> List[ScoredChunk]:
+        if len(per_corpus) == 1:
+            corpus, results = per_corpus[0]
+            return [result._replace(corpus=corpus.name) for result in results]
+
+        merged: Dict[str, ScoredChunk] = {}
+        for corpus, results in per_corpus:
+            scale = self._normalize([result.similarity for result in results])
+            for result in results:
+                result = result._replace(similarity=scale(result.similarity), corpus=corpus.name)
+                if result.id not in merged or result.similarity > merged[result.id].similarity:
+                    merged[result.id] = result
+        return sorted(merged.values(), key=lambda result: result.similarity, reverse=True)
+
+    def _vector_search(
+        self,
+        embeddings: Dict[str, List[float]],
+        k: int,
+        payload_fields: Optional[List[str]] = None,
+        targets: Optional[List[Corpus]] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[ScoredChunk]:
+        def query_corpus(corpus: Corpus, store: VectorStore) -> List[ScoredChunk]:
+            try:
+                return store.query(embeddings[self.model_for(corpus)], k, payload_fields, search_filter)
+            except Exception as e:
+                logger.error(f"Vector search failed for corpus {corpus.name}: {e}")
+                return []
+
+        with span("retrieval", "vector_search"):
+            return self._merge(self._fanout(targets or [get_corpus()], query_corpus))
+
+    def _mmr(self, candidates: List[ScoredChunk], vectors: List[List[float]], models: List[str], k: int) -> List[ScoredChunk]:
+        if len(candidates) <= k:
+            return candidates
+        # Relevance is the (merged) query similarity. Redundancy is only measurable between
+        # chunks embedded by the same model, and chunks from different models count as unrelated.
+        relevance = np.asarray([candidate.similarity for candidate in candidates], dtype=np.float32)
+        similarity = np.zeros((len(candidates), len(candidates)), dtype=np.float32)
+        for model in set(models):
+            group = [i for i, candidate_model in enumerate(models) if candidate_model == model]
+            docs = np.asarray([vectors[i] for i in group], dtype=np.float32)
+            similarity[np.ix_(group, group)] = docs @ docs.T
+        weight = self.settings.search_mmr_lambda
+        selected: List[int] = []
+        remaining = list(range(len(candidates)))
+        while remaining and len(selected) < k:
+            redundancy = similarity[np.ix_(remaining, selected)].max(axis=1) if selected else np.zeros(len(remaining))
+            scores = weight * relevance[remaining] - (1 - weight) * redundancy
+            best = remaining.pop(int(np.argmax(scores)))
+            selected.append(best)
+        return [candidates[i] for i in selected]
+
+    def _diverse_search(
+        self,
+        embeddings: Dict[str, List[float]],
+        k: int,
+        pages: int,
+        payload_fields: Optional[List[str]] = None,
+        targets: Optional[List[Corpus]] = None,
+        search_filter: Optional[SearchFilter] = None,
+        mmr: bool = False
+    ) -> List[ScoredChunk]:
+        def query_corpus(corpus: Corpus, store: VectorStore) -> List[Tuple[str, List[ScoredChunk], List[Optional[List[float]]]]]:
+            try:
+                return store.query_groups(embeddings[self.model_for(corpus)], pages, 1, payload_fields, search_filter, mmr)
+            except Exception as e:
+                logger.error(f"Diverse vector search failed for corpus {corpus.name}: {e}")
+                return []
 
-    def _vector_search(self, query: str, k: int) -> List[Dict[str, Any]]:
-        embedding = self.embedder.embed([query])[0]
+        with span("retrieval", "vector_search"):
+            per_corpus = self._fanout(targets or [get_corpus()], query_corpus)
+        # Pages are told apart by the Qdrant group id, since `url` may not be among the payload fields.
+        pages_of = {hits[0].id: url for _, groups in per_corpus for url, hits, _ in groups if hits}
+        vectors = {hits[0].id: vecs[0] for _, groups in per_corpus for _, hits, vecs in groups if hits}
+        best_per_page: Dict[str, ScoredChunk] = {}
+        for result in self._merge([(corpus, [hits[0] for _, hits, _ in groups if hits]) for corpus, groups in per_corpus]):
+            best_per_page.setdefault(pages_of[result.id], result)
+        candidates = list(best_per_page.values())[:pages]
+        if not mmr:
+            return candidates[:k]
+        with span("retrieval", "mmr"):
+            models = {corpus.name: self.model_for(corpus) for corpus, _ in per_corpus}
+            return self._mmr(candidates, [vectors[result.id] for result in candidates], [models[result.corpus] for result in candidates], k)
+
+    def _rank(self, candidates: List[ScoredChunk], k: Optional[int]) -> List[ScoredChunk]:
+        return [result._replace(rank=i) for i, result in enumerate(candidates[:k], 1)]
+
+    def _raw_scores(self, diversity: str, targets: List[Corpus]) -> bool:
+        # The score rules need raw cosine similarities in descending order. Several corpora are
+        # min-max normalized per corpus and MMR reorders by redundancy, so both keep only the
+        # floor, ceiling and token budget.
+        return len(targets) == 1 and diversity != "mmr"
+
+    def _adaptive_depth(self, results: List[ScoredChunk], raw_scores: bool = True) -> Tuple[int, str]:
+        if not results:
+            return 0, "empty"
+        floor = min(self.settings.search_adaptive_min_k, len(results))
+        ceiling = min(max(self.settings.search_adaptive_max_k, floor), len(results))
+        top = results[0].similarity
+        threshold = max(self.settings.search_adaptive_min_similarity, top * self.settings.search_adaptive_relative_similarity if top > 0 else top)
+        tokens = 0
+        for i, result in enumerate(results[:ceiling]):
+            tokens += (len(result.content or "") + 3) // 4
+            if i < floor:
+                continue
+            if raw_scores and result.similarity < threshold:
+                return i, "threshold"
+            if raw_scores and results[i - 1].similarity - result.similarity > self.settings.search_adaptive_score_gap:
+                return i, "gap"
+            if tokens > self.settings.search_adaptive_token_budget:
+                return i, "tokens"
+        return ceiling, "ceiling" if ceiling < len(results) else "exhausted"
+
+    def _cut(self, results: List[ScoredChunk], raw_scores: bool = True) -> List[ScoredChunk]:
+        depth, cut = self._adaptive_depth(results, raw_scores)
+        RETRIEVAL_DEPTH.labels(cut).observe(depth)
+        return results[:depth]
+
+    def _hydrate(self, results: List[ScoredChunk], payload_fields: Optional[List[str]]) -> List[ScoredChunk]:
+        fields = [field for field in (SEARCH_FIELDS if payload_fields is None else payload_fields) if field in HYDRATED_FIELDS]
+        hydrated: Dict[str, ScoredChunk] = {}
         try:
-            result = self.store.query(embedding, k)
+            with span("retrieval", "hydrate"):
+                for name in dict.fromkeys(result.corpus for result in results):
+                    store = self.store_for(get_corpus(name or None))
+                    hydrated.update((chunk.id, chunk) for chunk in store.hydrate([r for r in results if r.corpus == name], fields))
         except Exception as e:
-            logger.error(f"Vector search failed: {e}")
-            return []
+            logger.error(f"Result hydration failed: {e}")
+        return [hydrated.get(result.id, result) for result in results]
+
+    def _group_search(
+        self,
+        embeddings: Dict[str, List[float]],
+        k: Optional[int],
+        group_size: int,
+        payload_fields: Optional[List[str]],
+        targets: Optional[List[Corpus]] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[ScoredGroup]:
+        def query_corpus(corpus: Corpus, store: VectorStore) -> List[Tuple[str, List[ScoredChunk], List[Optional[List[float]]]]]:
+            try:
+                return store.query_groups(embeddings[self.model_for(corpus)], k, group_size, payload_fields, search_filter)
+            except Exception as e:
+                logger.error(f"Grouped vector search failed for corpus {corpus.name}: {e}")
+                return []
 
-        ids = result.get('ids', [[]])[0]
-        documents = result.get('documents', [[]])[0]
-        metadatas = result.get('metadatas', [[]])[0]
-        distances = result.get('distances', [[]])[0]
+        with span("retrieval", "vector_search"):
+            per_corpus = self._fanout(targets or [get_corpus()], query_corpus)
+
+        merged: Dict[str, Tuple[str, List[ScoredChunk]]] = {}
+        for corpus, groups in per_corpus:
+            scale = self._normalize([hit.similarity for _, hits, _ in groups for hit in hits]) if len(per_corpus) > 1 else float
+            for url, hits, _ in groups:
+                hits = [hit._replace(similarity=scale(hit.similarity), corpus=corpus.name) for hit in hits]
+                if hits and (url not in merged or hits[0].similarity > merged[url][1][0].similarity):
+                    merged[url] = (url, hits)
+        ordered = sorted(merged.values(), key=lambda group: group[1][0].similarity, reverse=True)[:k]
 
         results = []
-        for i, doc_id in enumerate(ids):
-            meta = metadatas[i] if i < len(metadatas) else {}
-            distance = distances[i] if i < len(distances) else 1.0
-            similarity = max(0.0, 1.0 - distance)
-
-            results.append({
-                'id': doc_id,
-                'content': documents[i],
-                'url': meta.get('url', ''),
-                'title': meta.get('title', ''),
-                'index': meta.get('index', 0),
-                'total': meta.get('total', 1),
-                'similarity': similarity
-            })
+        for i, (url, group) in enumerate(ordered, 1):
+            hits = self._rank(group, group_size)
+            results.append(ScoredGroup(url, hits[0].similarity if hits else 0.0, i, hits))
         return results
 
-    def search(self, query: str, k: Optional[int] = None) -> List[Dict[str, Any]]:
-        candidates = self._vector_search(query, k)
+    def search(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        payload_fields: Optional[List[str]] = None,
+        embedding: Optional[List[float]] = None,
+        corpora: Optional[List[str]] = None,
+        exclude_corpora: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None,
+        diversity: Optional[str] = None,
+        adaptive: Optional[bool] = None,
+        embedding_timeout: Optional[float] = None
+    ) -> List[ScoredChunk]:
+        targets = select_corpora(corpora, exclude_corpora)
+        diversity = diversity or self.settings.search_diversity
+        adaptive = not k and (self.settings.search_adaptive_k if adaptive is None else adaptive)
+        if adaptive:
+            k = max(self.settings.search_adaptive_candidates, self.settings.search_adaptive_max_k)
+        embeddings = self._embed_for(query, targets, embedding, embedding_timeout)
+        if diversity == "none":
+            hydrate = False
+            results = self._vector_search(embeddings, k, payload_fields, targets, search_filter)
+        else:
+            k = k or 10
+            mmr = diversity == "mmr"
+            pages = k * self.settings.search_mmr_pool_factor if mmr else k
+            hydrate = pages > k
+            results = self._diverse_search(embeddings, k, pages, self._query_fields(payload_fields, hydrate), targets, search_filter, mmr)
+        final_results = self._rank(results, k)
+        if hydrate:
+            final_results = self._hydrate(final_results, payload_fields)
+        if adaptive:
+            final_results = self._cut(final_results, self._raw_scores(diversity, targets))
+
+        logger.info(f"Search completed: query_len={len(query)}, k={k}, adaptive={adaptive}, diversity={diversity}, corpora={len(targets)}, candidates={len(results)}, results={len(final_results)}")
+        return final_results
+
+    def search_batch(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        payload_fields: Optional[List[str]] = None,
+        corpora: Optional[List[str]] = None,
+        exclude_corpora: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None,
+        diversity: Optional[str] = None,
+        adaptive: Optional[bool] = None
+    ) -> List[List[ScoredChunk]]:
+        if not queries:
+            return []
+
+        targets = select_corpora(corpora, exclude_corpora)
+        diversity = diversity or self.settings.search_diversity
+        adaptive = not k and (self.settings.search_adaptive_k if adaptive is None else adaptive)
+        if adaptive:
+            k = max(self.settings.search_adaptive_candidates, self.settings.search_adaptive_max_k)
+        embeddings = self._embed_batch_for(queries, targets)
+        if diversity != "none":
+            k = k or 10
+            mmr = diversity == "mmr"
+            pages = k * self.settings.search_mmr_pool_factor if mmr else k
+            final_results = [
+                self._rank(self._diverse_search({model: vectors[i] for model, vectors in embeddings.items()}, k, pages, payload_fields, targets, search_filter, mmr), k)
+                for i in range(len(queries))
+            ]
+            if adaptive:
+                final_results = [self._cut(results, self._raw_scores(diversity, targets)) for results in final_results]
+            logger.info(f"Batch search completed: queries={len(queries)}, k={k}, adaptive={adaptive}, diversity={diversity}, corpora={len(targets)}, results={sum(len(r) for r in final_results)}")
+            return final_results
+
+        def query_corpus(corpus: Corpus, store: VectorStore) -> List[List[ScoredChunk]]:
+            try:
+                return store.query_batch(embeddings[self.model_for(corpus)], k, payload_fields, search_filter)
+            except Exception as e:
+                logger.error(f"Batch vector search failed for corpus {corpus.name}: {e}")
+                return [[] for _ in queries]
 
-        for result in candidates:
-            result['rerank_score'] = result['similarity']
+        with span("retrieval", "vector_search"):
+            per_corpus = self._fanout(targets, query_corpus)
 
-        final_results = candidates[:k]
-        for i, result in enumerate(final_results):
-            result['rank'] = i + 1
+        final_results = [
+            self._rank(self._merge([(corpus, batch_result[i]) for corpus, batch_result in per_corpus]), k)
+            for i in range(len(queries))
+        ]
+        if adaptive:
+            final_results = [self._cut(results, self._raw_scores(diversity, targets)) for results in final_results]
+        logger.info(f"Batch search completed: queries={len(queries)}, k={k}, adaptive={adaptive}, corpora={len(targets)}, results={sum(len(r) for r in final_results)}")
+        return final_results
+
+    def search_groups(
+        self,
+        query: str,
+        k: Optional[int] = None,
+        group_size: int = 1,
+        payload_fields: Optional[List[str]] = None,
+        corpora: Optional[List[str]] = None,
+        exclude_corpora: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[ScoredGroup]:
+        targets = select_corpora(corpora, exclude_corpora)
+        embeddings = self._embed_for(query, targets)
+        groups = self._group_search(embeddings, k, group_size, payload_fields, targets, search_filter)
+        logger.info(f"Grouped search completed: query_len={len(query)}, k={k}, corpora={len(targets)}, groups={len(groups)}")
+        return groups
+
+    def search_groups_batch(
+        self,
+        queries: List[str],
+        k: Optional[int] = None,
+        group_size: int = 1,
+        payload_fields: Optional[List[str]] = None,
+        corpora: Optional[List[str]] = None,
+        exclude_corpora: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[List[ScoredGroup]]:
+        if not queries:
+            return []
 
-        logger.info(f"Search completed: query_len={len(query)}, k={k}, results={len(final_results)}")
+        targets = select_corpora(corpora, exclude_corpora)
+        embeddings = self._embed_batch_for(queries, targets)
+        final_results = [
+            self._group_search({model: vectors[i] for model, vectors in embeddings.items()}, k, group_size, payload_fields, targets, search_filter)
+            for i in range(len(queries))
+        ]
+        logger.info(f"Batch grouped search completed: queries={len(queries)}, k={k}, corpora={len(targets)}, groups={sum(len(g) for g in final_results)}")
         return final_results
@@ -0,0 +1,58 @@
+import json
+from functools import lru_cache
+from typing import Dict, List, Optional
+from app.src.config import get_settings
+from app.src.domain.corpus import Corpus
+from app.src.utils.logs import logger
+
+class UnknownCorpus(ValueError):
+    pass
+
+@lru_cache
+def get_corpora() -> Dict[str, Corpus]:
+    settings = get_settings()
+    if not settings.corpora_path:
+        return {
+            settings.collection_name: Corpus(
+                settings.collection_name,
+                settings.collection_name,
+                list(settings.base_urls),
+                settings.crawl_max_pages,
+                settings.crawl_max_depth,
+                settings.ingest_schedule_hours
+            )
+        }
+
+    with open(settings.corpora_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    corpora = {
+        name: Corpus(
+            name,
+            config.get("collection", name),
+            list(config["base_urls"]),
+            config.get("crawl_max_pages", settings.crawl_max_pages),
+            config.get("crawl_max_depth", settings.crawl_max_depth),
+            config.get("schedule_hours", settings.ingest_schedule_hours)
+        )
+        for name, config in data.items()
+    }
+    logger.info(f"Loaded {len(corpora)} corpora from {settings.corpora_path}: {sorted(corpora)}")
+    return corpora
+
+def get_corpus(name: Optional[str] = None) -> Corpus:
+    corpora = get_corpora()
+    name = name or get_settings().default_corpus or next(iter(corpora))
+    if name not in corpora:
+        raise UnknownCorpus(f"Unknown corpus {name}, available: {sorted(corpora)}")
+    return corpora[name]
+
+def select_corpora(include: Optional[List[str]] = None, exclude: Optional[List[str]] = None) -> List[Corpus]:
+    corpora = get_corpora()
+    unknown = [name for name in (include or []) + (exclude or []) if name not in corpora]
+    if unknown:
+        raise UnknownCorpus(f"Unknown corpora {unknown}, available: {sorted(corpora)}")
+    names = include or list(corpora)
+    selected = [corpora[name] for name in names if name not in (exclude or [])]
+    if not selected:
+        raise UnknownCorpus("No corpora left to search after exclusions")
+    return selected
@@ -0,0 +1,135 @@
+import json
+import os
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+from app.src.config import get_settings
+from app.src.services.embedder.embedder import set_active_model
+from app.src.services.store.corpora import get_corpora
+from app.src.services.store.store import VectorStore, get_qdrant_client, version_name
+from app.src.utils.logs import logger
+
+class CollectionRegistry:
+    def __init__(self):
+        self.settings = get_settings()
+        self.path = self.settings.collection_registry_path
+        self.client = get_qdrant_client()
+        self._lock = threading.Lock()
+
+    def _load(self) -> Dict[str, Dict[str, Any]]:
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except Exception as e:
+            logger.error(f"Error loading collection registry: {e}")
+            return {}
+
+    def _save(self, data: Dict[str, Dict[str, Any]]):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, name: str) -> Dict[str, Any]:
+        return self._load().get(name, {})
+
+    def record(self, name: str, **fields):
+        with self._lock:
+            data = self._load()
+            data.setdefault(name, {}).update(fields)
+            self._save(data)
+
+    def versions(self, alias: str) -> List[str]:
+        prefix = f"{alias}_v"
+        return sorted(c.name for c in self.client.get_collections().collections if c.name.startswith(prefix))
+
+    def live(self, alias: str) -> Optional[str]:
+        return VectorStore(alias, alias=True).resolve_alias(alias)
+
+    def describe(self, alias: str) -> Dict[str, Any]:
+        data = self._load()
+        live = self.live(alias)
+        return {
+            "alias": alias,
+            "live": live,
+            "versions": [
+                {"name": name, "live": name == live, **data.get(name, {})}
+                for name in self.versions(alias)
+            ]
+        }
+
+    def embedding_model(self, name: Optional[str]) -> Optional[str]:
+        return self.get(name).get("embedding_model") if name else None
+
+    def sync_active_model(self, alias: str) -> str:
+        model = self.embedding_model(self.live(alias))
+        set_active_model(model, alias)
+        return model or self.settings.embedding_model_name
+
+    def sync_active_models(self) -> Dict[str, str]:
+        return {corpus.collection: self.sync_active_model(corpus.collection) for corpus in get_corpora().values()}
+
+    def migrate_payload_indexes(self):
+        for corpus in get_corpora().values():
+            VectorStore(corpus.collection, alias=True).migrate_payload_indexes()
+
+    def create_version(self, alias: str, embedding_model: Optional[str] = None) -> str:
+        name = version_name(alias)
+        embedding_model = embedding_model or self.settings.embedding_model_name
+        VectorStore(name, embedding_model)
+        self.record(name, alias=alias, status="building", created_at=time.time(), embedding_model=embedding_model)
+        logger.info(f"Created collection version {name} for alias {alias} with embedding model {embedding_model}")
+        return name
+
+    def building_version(self, alias: str, embedding_model: Optional[str] = None) -> Optional[str]:
+        data = self._load()
+        embedding_model = embedding_model or self.settings.embedding_model_name
+        building = [
+            name for name in self.versions(alias)
+            if data.get(name, {}).get("status") == "building"
+            and data.get(name, {}).get("embedding_model", self.settings.embedding_model_name) == embedding_model
+        ]
+        return building[-1] if building else None
+
+    def promote(self, alias: str, name: str):
+        previous = self.live(alias)
+        VectorStore(alias, alias=True).switch_alias(alias, name)
+        points = self.client.count(collection_name=name).count
+        self.record(name, status="live", promoted_at=time.time(), points=points)
+        if previous and previous != name:
+            self.record(previous, status="retired", retired_at=time.time())
+        self.sync_active_model(alias)
+        self.gc(alias)
+
+    def gc(self, alias: str, keep: Optional[int] = None):
+        keep = self.settings.collection_keep_versions if keep is None else keep
+        live = self.live(alias)
+        data = self._load()
+        now = time.time()
+        versions = [name for name in self.versions(alias) if name != live]
+        retired = [name for name in versions if data.get(name, {}).get("status") in ("retired", "deleted")]
+        kept = [name for name in retired if data.get(name, {}).get("status") == "retired"][-keep:] if keep else []
+        stale = [
+            name for name in versions
+            if data.get(name, {}).get("status") == "building"
+            and now - data[name].get("created_at", now) > self.settings.collection_building_max_age_seconds
+        ]
+        for name in retired + stale:
+            if name in kept:
+                continue
+            self.client.delete_collection(name)
+            self.record(name, status="deleted", deleted_at=time.time())
+            logger.info(f"Garbage-collected collection version {name}")
+
+    def reset(self, alias: str) -> str:
+        name = self.create_version(alias)
+        self.promote(alias, name)
+        return name
+
+@lru_cache
+def get_collection_registry() -> CollectionRegistry:
+    return CollectionRegistry()
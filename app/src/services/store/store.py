@@ -1,36 +1,227 @@
-from typing import List, Dict, Any
+from functools import lru_cache
+from typing import Callable, List, Dict, Any, Optional, Tuple
 from app.src.config import get_settings
+from app.src.domain.chunks import Chunk, ScoredChunk
+from app.src.domain.search import SearchFilter
 from app.src.utils.logs import logger
+from app.src.utils.tracing import qdrant_span
 from qdrant_client import QdrantClient
 from qdrant_client.http import models as qmodels
+import time
 import uuid
-from app.src.services.embedder.embedder import Embedder
+from urllib.parse import urlparse
+from app.src.services.embedder.embedder import Embedder, active_model
+
+@lru_cache
+def get_qdrant_client() -> QdrantClient:
+    settings = get_settings()
+    if settings.qdrant_location:
+        logger.info(f"Using local Qdrant location={settings.qdrant_location}")
+        if settings.qdrant_location == ":memory:":
+            return QdrantClient(location=":memory:")
+        return QdrantClient(path=settings.qdrant_location)
+    return QdrantClient(host=settings.qdrant_host, port=settings.qdrant_port)
+
+PAYLOAD_INDEXES = {
+    "url": qmodels.PayloadSchemaType.KEYWORD,
+    "aliases[].url": qmodels.PayloadSchemaType.KEYWORD,
+    "sections": qmodels.PayloadSchemaType.KEYWORD,
+    "alias_sections": qmodels.PayloadSchemaType.KEYWORD,
+    "index": qmodels.PayloadSchemaType.INTEGER
+}
+
+def version_name(alias: str) -> str:
+    return f"{alias}_v{time.strftime('%Y%m%d%H%M%S')}_{uuid.uuid4().hex[:4]}"
+
+def normalize_section(section: str) -> str:
+    path = urlparse(section).path if "://" in section else section
+    return "/" + "/".join(part for part in path.split("/") if part) + "/"
+
+def section_paths(url: str) -> List[str]:
+    parts = [part for part in urlparse(url).path.split("/") if part]
+    return ["/" + "/".join(parts[:i]) + "/" for i in range(1, len(parts) + 1)]
+
+def alias_section_paths(aliases: List[Dict[str, Any]]) -> List[str]:
+    return sorted({section for alias in aliases for section in section_paths(alias.get("url", ""))})
+
+def to_qdrant_filter(search_filter: Optional[SearchFilter]) -> Optional[qmodels.Filter]:
+    if search_filter is None:
+        return None
+    must, must_not = [], []
+    # A deduplicated chunk also lives on its alias pages, so scoping to one of them must find it.
+    if search_filter.urls:
+        must.append(qmodels.Filter(should=[
+            qmodels.FieldCondition(key="url", match=qmodels.MatchAny(any=search_filter.urls)),
+            qmodels.FieldCondition(key="aliases[].url", match=qmodels.MatchAny(any=search_filter.urls))
+        ]))
+    if search_filter.sections:
+        sections = [normalize_section(s) for s in search_filter.sections]
+        must.append(qmodels.Filter(should=[
+            qmodels.FieldCondition(key="sections", match=qmodels.MatchAny(any=sections)),
+            qmodels.FieldCondition(key="alias_sections", match=qmodels.MatchAny(any=sections))
+        ]))
+    if search_filter.exclude_sections:
+        must_not.append(qmodels.FieldCondition(key="sections", match=qmodels.MatchAny(any=[normalize_section(s) for s in search_filter.exclude_sections])))
+    if search_filter.min_index is not None or search_filter.max_index is not None:
+        must.append(qmodels.FieldCondition(key="index", range=qmodels.Range(gte=search_filter.min_index, lte=search_filter.max_index)))
+    if not must and not must_not:
+        return None
+    return qmodels.Filter(must=must or None, must_not=must_not or None)
 
 class VectorStore:
-    def __init__(self):
+    def __init__(self, collection_name: Optional[str] = None, embedding_model: Optional[str] = None, alias: bool = False):
         self.settings = get_settings()
-        self.client = QdrantClient(host=self.settings.qdrant_host, port=self.settings.qdrant_port)
-        self.collection_name = self.settings.collection_name
-        if self.collection_name not in [c.name for c in self.client.get_collections().collections]:
+        self.client = get_qdrant_client()
+        self.collection_name = collection_name or self.settings.collection_name
+        self.embedding_model = embedding_model
+        if not self._exists(self.collection_name):
             logger.info("Qdrant collection missing, creating...")
             emb_dim = self._detect_embedding_dim()
-            self._create_collection(emb_dim)
+            if collection_name is None or alias:
+                version = version_name(self.collection_name)
+                self._create_collection(emb_dim, version)
+                self.switch_alias(self.collection_name, version)
+            else:
+                self._create_collection(emb_dim)
         logger.info(f"Vector store initialized: {self.collection_name} (Qdrant)")
 
+    def _exists(self, name: str) -> bool:
+        if name in [c.name for c in self.client.get_collections().collections]:
+            return True
+        return name in [a.alias_name for a in self.client.get_aliases().aliases]
+
+    def resolve_alias(self, alias: str) -> Optional[str]:
+        for a in self.client.get_aliases().aliases:
+            if a.alias_name == alias:
+                return a.collection_name
+        return None
+
+    def switch_alias(self, alias: str, collection_name: str):
+        operations = []
+        backup = None
+        if self.resolve_alias(alias) is not None:
+            operations.append(qmodels.DeleteAliasOperation(delete_alias=qmodels.DeleteAlias(alias_name=alias)))
+        elif alias in [c.name for c in self.client.get_collections().collections]:
+            backup = self._retire_legacy_collection(alias)
+        operations.append(qmodels.CreateAliasOperation(create_alias=qmodels.CreateAlias(collection_name=collection_name, alias_name=alias)))
+        try:
+            with qdrant_span("update_aliases"):
+                self.client.update_collection_aliases(change_aliases_operations=operations)
+        except Exception as e:
+            if backup is not None:
+                logger.error(f"Switching alias {alias} -> {collection_name} failed, the legacy data is kept in {backup}: {e}")
+            raise
+        logger.info(f"Switched alias {alias} -> {collection_name}")
+
+    def _retire_legacy_collection(self, name: str) -> str:
+        # An alias cannot share its name with a collection, so the legacy collection has to go.
+        # Its points are copied into a versioned collection first so they stay recoverable.
+        backup = version_name(name)
+        logger.warning(f"Replacing legacy collection {name} with an alias, copying it to {backup} before dropping it")
+        info = self.client.get_collection(name)
+        self.client.create_collection(collection_name=backup, vectors_config=info.config.params.vectors)
+        self._create_payload_indexes(backup)
+        offset = None
+        copied = 0
+        while True:
+            with qdrant_span("scroll"):
+                points, offset = self.client.scroll(
+                    collection_name=name,
+                    limit=self.settings.reembed_scroll_size,
+                    offset=offset,
+                    with_payload=True,
+                    with_vectors=True
+                )
+            if points:
+                with qdrant_span("upsert"):
+                    self.client.upsert(
+                        collection_name=backup,
+                        points=[qmodels.PointStruct(id=point.id, vector=point.vector, payload=point.payload) for point in points]
+                    )
+                copied += len(points)
+            if offset is None:
+                break
+        if self.client.count(collection_name=backup).count != self.client.count(collection_name=name).count:
+            raise RuntimeError(f"Copy of legacy collection {name} into {backup} is incomplete, keeping the legacy collection")
+        self.client.delete_collection(name)
+        logger.info(f"Retired legacy collection {name} into {backup}: {copied} points")
+        return backup
+
     def _detect_embedding_dim(self) -> int:
         try:
-            emb = Embedder().embed(["dimension probe"])[0]
+            emb = Embedder(self.embedding_model or active_model(self.collection_name)).embed(["dimension probe"])[0]
             return len(emb)
         except Exception as e:
             logger.error(f"Failed to detect embedding dimension: {e}")
             raise
 
-    def _create_collection(self, dim: int):
+    def _create_collection(self, dim: int, name: Optional[str] = None):
+        name = name or self.collection_name
         self.client.create_collection(
-            collection_name=self.collection_name,
+            collection_name=name,
             vectors_config=qmodels.VectorParams(size=dim, distance=qmodels.Distance.COSINE)
         )
-        logger.info(f"Created Qdrant collection name={self.collection_name} dim={dim}")
+        self._create_payload_indexes(name)
+        logger.info(f"Created Qdrant collection name={name} dim={dim}")
+
+    def _create_payload_indexes(self, name: str, existing: Optional[Dict[str, Any]] = None):
+        for field, schema in PAYLOAD_INDEXES.items():
+            if existing and field in existing:
+                continue
+            with qdrant_span("create_payload_index"):
+                self.client.create_payload_index(collection_name=name, field_name=field, field_schema=schema)
+            logger.info(f"Created payload index collection={name} field={field} schema={schema.value}")
+
+    def migrate_payload_indexes(self):
+        name = self.resolve_alias(self.collection_name) or self.collection_name
+        try:
+            existing = self.client.get_collection(name).payload_schema or {}
+            self._create_payload_indexes(name, existing)
+            backfilled = self._backfill(
+                name,
+                qmodels.Filter(must=[qmodels.IsEmptyCondition(is_empty=qmodels.PayloadField(key="sections"))]),
+                ["url"],
+                lambda payload: {"sections": section_paths(payload.get("url", ""))}
+            )
+            if backfilled:
+                logger.info(f"Backfilled section paths for {backfilled} points in {name}")
+            backfilled = self._backfill(
+                name,
+                qmodels.Filter(
+                    must=[qmodels.IsEmptyCondition(is_empty=qmodels.PayloadField(key="alias_sections"))],
+                    must_not=[qmodels.IsEmptyCondition(is_empty=qmodels.PayloadField(key="aliases"))]
+                ),
+                ["aliases"],
+                lambda payload: {"alias_sections": alias_section_paths(payload.get("aliases", []))}
+            )
+            if backfilled:
+                logger.info(f"Backfilled alias section paths for {backfilled} points in {name}")
+        except Exception as e:
+            logger.error(f"Error migrating payload indexes for {name}: {e}")
+
+    def _backfill(self, name: str, missing: qmodels.Filter, fields: List[str], derive: Callable[[Dict[str, Any]], Dict[str, Any]]) -> int:
+        backfilled = 0
+        offset = None
+        while True:
+            with qdrant_span("scroll"):
+                points, offset = self.client.scroll(
+                    collection_name=name,
+                    scroll_filter=missing,
+                    limit=self.settings.payload_backfill_batch_size,
+                    offset=offset,
+                    with_payload=fields,
+                    with_vectors=False
+                )
+            by_payload: Dict[str, Tuple[Dict[str, Any], List[str]]] = {}
+            for point in points:
+                payload = derive(point.payload or {})
+                by_payload.setdefault(repr(payload), (payload, []))[1].append(str(point.id))
+            for payload, ids in by_payload.values():
+                with qdrant_span("set_payload"):
+                    self.client.set_payload(collection_name=name, payload=payload, points=ids)
+            backfilled += len(points)
+            if offset is None:
+                return backfilled
 
     def add(self, ids: list[str], documents: list[str], metadatas: list[dict], embeddings: list[list[float]]):
         try:
@@ -47,67 +238,176 @@ class VectorStore:
                 meta = metadatas[i] if i < len(metadatas) else {}
                 payload = {
                     **meta,
+                    "sections": section_paths(meta.get("url", "")),
+                    **({"alias_sections": alias_section_paths(meta["aliases"])} if meta.get("aliases") else {}),
                     "content": documents[i] if i < len(documents) else ""
                 }
                 points.append(qmodels.PointStruct(id=point_id, vector=emb, payload=payload))
-            self.client.upsert(collection_name=self.collection_name, points=points)
+            with qdrant_span("upsert"):
+                self.client.upsert(collection_name=self.collection_name, points=points)
             logger.info(f"Added {len(points)} documents to vector store (Qdrant)")
         except Exception as e:
             logger.error(f"Error adding documents to vector store: {e}")
             raise
 
-    def query(self, embedding: list[float], k: int):
+    def set_aliases(self, point_id: str, aliases: List[Dict[str, Any]]):
         try:
-            result = self.client.query_points(
-                collection_name=self.collection_name,
-                query=embedding,
-                limit=k,
-                with_payload=True,
-                with_vectors=False
-            )
-            ids = [str(point.id) for point in result.points]
-            documents = [point.payload.get("content", "") for point in result.points]
-            metadatas = []
-            distances = []
-            for point in result.points:
-                payload = dict(point.payload)
-                payload.pop("content", None)
-                metadatas.append(payload)
-                distances.append(point.score)
-            distances = [1 - s for s in distances]
-            return {
-                'ids': [ids],
-                'documents': [documents],
-                'metadatas': [metadatas],
-                'distances': [distances]
-            }
+            with qdrant_span("set_payload"):
+                self.client.set_payload(
+                    collection_name=self.collection_name,
+                    payload={"aliases": aliases, "alias_sections": alias_section_paths(aliases)},
+                    points=[point_id]
+                )
+        except Exception as e:
+            logger.error(f"Error setting aliases for point {point_id}: {e}")
+            raise
+
+    def _to_scored(self, points) -> List[ScoredChunk]:
+        chunks = []
+        for point in points:
+            payload = point.payload or {}
+            chunks.append(ScoredChunk(
+                str(point.id),
+                payload.get('url', ''),
+                payload.get('title', ''),
+                payload.get('content'),
+                payload.get('index', 0),
+                payload.get('total', 1),
+                max(0.0, point.score)
+            ))
+        return chunks
+
+    def _payload_selector(self, payload_fields: Optional[List[str]]):
+        return list(payload_fields) if payload_fields is not None else True
+
+    def query(
+        self,
+        embedding: list[float],
+        k: int,
+        payload_fields: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[ScoredChunk]:
+        try:
+            with qdrant_span("query"):
+                result = self.client.query_points(
+                    collection_name=self.collection_name,
+                    query=embedding,
+                    query_filter=to_qdrant_filter(search_filter),
+                    limit=k,
+                    with_payload=self._payload_selector(payload_fields),
+                    with_vectors=False
+                )
+            return self._to_scored(result.points)
         except Exception as e:
             logger.error(f"Error querying vector store: {e}")
             raise
 
-    def get_all_chunks_by_url(self, url: str) -> List[Dict[str, Any]]:
+    def query_batch(
+        self,
+        embeddings: list[list[float]],
+        k: int,
+        payload_fields: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None
+    ) -> List[List[ScoredChunk]]:
+        try:
+            if not embeddings:
+                return []
+            query_filter = to_qdrant_filter(search_filter)
+            requests = [
+                qmodels.QueryRequest(query=embedding, filter=query_filter, limit=k, with_payload=self._payload_selector(payload_fields), with_vector=False)
+                for embedding in embeddings
+            ]
+            with qdrant_span("query_batch"):
+                responses = self.client.query_batch_points(
+                    collection_name=self.collection_name,
+                    requests=requests
+                )
+            logger.info(f"Batch query completed: queries={len(requests)}")
+            return [self._to_scored(response.points) for response in responses]
+        except Exception as e:
+            logger.error(f"Error batch querying vector store: {e}")
+            raise
+
+    def query_groups(
+        self,
+        embedding: list[float],
+        k: int,
+        group_size: int = 1,
+        payload_fields: Optional[List[str]] = None,
+        search_filter: Optional[SearchFilter] = None,
+        with_vectors: bool = False
+    ) -> List[Tuple[str, List[ScoredChunk], List[Optional[list[float]]]]]:
+        try:
+            with qdrant_span("query_groups"):
+                result = self.client.query_points_groups(
+                    collection_name=self.collection_name,
+                    group_by="url",
+                    query=embedding,
+                    query_filter=to_qdrant_filter(search_filter),
+                    limit=k or 10,
+                    group_size=group_size,
+                    with_payload=self._payload_selector(payload_fields),
+                    with_vectors=with_vectors
+                )
+            return [
+                (str(group.id), self._to_scored(group.hits), [hit.vector if with_vectors else None for hit in group.hits])
+                for group in result.groups
+            ]
+        except Exception as e:
+            logger.error(f"Error group querying vector store: {e}")
+            raise
+
+    def hydrate(self, chunks: List[ScoredChunk], payload_fields: List[str]) -> List[ScoredChunk]:
+        if not chunks or not payload_fields:
+            return chunks
+        try:
+            with qdrant_span("retrieve"):
+                points = self.client.retrieve(
+                    collection_name=self.collection_name,
+                    ids=[chunk.id for chunk in chunks],
+                    with_payload=list(payload_fields),
+                    with_vectors=False
+                )
+            payloads = {str(point.id): point.payload or {} for point in points}
+            return [
+                chunk._replace(**{field: payloads.get(chunk.id, {}).get(field) for field in payload_fields})
+                for chunk in chunks
+            ]
+        except Exception as e:
+            logger.error(f"Error hydrating {len(chunks)} search results: {e}")
+            raise
+
+    def get_all_chunks_by_url(self, url: str, payload_fields: Optional[List[str]] = None) -> List[Chunk]:
         try:
             logger.debug(f"Fetching all chunks for URL: {url}")
-            scroll_res, _next = self.client.scroll(
-                collection_name=self.collection_name,
-                scroll_filter=qmodels.Filter(should=[qmodels.FieldCondition(key="url", match=qmodels.MatchValue(value=url))]),
-                with_payload=True,
-                with_vectors=False,
-                limit=10000
-            )
+            with_payload = True if payload_fields is None else ["url", "aliases", *payload_fields]
+            with qdrant_span("scroll"):
+                scroll_res, _next = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=qmodels.Filter(should=[
+                        qmodels.FieldCondition(key="url", match=qmodels.MatchValue(value=url)),
+                        qmodels.FieldCondition(key="aliases[].url", match=qmodels.MatchValue(value=url))
+                    ]),
+                    with_payload=with_payload,
+                    with_vectors=False,
+                    limit=10000
+                )
             chunks = []
             for p in scroll_res:
                 payload = p.payload or {}
-                chunks.append({
-                    'id': str(p.id),
-                    'content': payload.get('content', ''),
-                    'url': payload.get('url', ''),
-                    'title': payload.get('title', ''),
-                    'index': payload.get('index', 0),
-                    'total': payload.get('total', 1)
-                })
-
-            chunks.sort(key=lambda x: x['index'])
+                placements = [payload] if payload.get('url') == url else []
+                placements += [alias for alias in payload.get('aliases', []) if alias.get('url') == url]
+                for placement in placements:
+                    chunks.append(Chunk(
+                        str(p.id),
+                        placement.get('url', ''),
+                        placement.get('title', ''),
+                        payload.get('content'),
+                        placement.get('index', 0),
+                        placement.get('total', 1)
+                    ))
+
+            chunks.sort(key=lambda x: x.index)
             logger.info(f"Retrieved {len(chunks)} chunks for URL: {url}")
             return chunks
         except Exception as e:
@@ -116,11 +416,18 @@ class VectorStore:
 
     def clear(self):
         try:
-            collections = [c.name for c in self.client.get_collections().collections]
-            if self.collection_name in collections:
-                self.client.delete_collection(self.collection_name)
             emb_dim = self._detect_embedding_dim()
-            self._create_collection(emb_dim)
+            previous = self.resolve_alias(self.collection_name)
+            if previous is not None:
+                version = version_name(self.collection_name)
+                self._create_collection(emb_dim, version)
+                self.switch_alias(self.collection_name, version)
+                self.client.delete_collection(previous)
+            else:
+                collections = [c.name for c in self.client.get_collections().collections]
+                if self.collection_name in collections:
+                    self.client.delete_collection(self.collection_name)
+                self._create_collection(emb_dim)
             logger.info(f"Vector store cleared: {self.collection_name}")
         except Exception as e:
             logger.error(f"Error clearing vector store: {e}")
@@ -1,14 +1,17 @@
 import json
 import os
-from typing import Set
+from typing import Optional, Set
 from app.src.config import get_settings
 from app.src.utils.logs import logger
 
 
 class VisitedStore:
-    def __init__(self):
+    def __init__(self, name: Optional[str] = None):
         self.settings = get_settings()
-        self.visited_urls_path = "./resources/visited_urls.json"
+        if name and name != self.settings.collection_name:
+            self.visited_urls_path = f"./resources/visited_urls.{name}.json"
+        else:
+            self.visited_urls_path = "./resources/visited_urls.json"
         self.visited_urls: Set[str] = self._load_visited()
 
     def is_visited(self, url: str) -> bool:
@@ -1,4 +1,14 @@
 import logging
+from contextvars import ContextVar
 
-logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s")
-logger = logging.getLogger(__name__)
\ No newline at end of file
+request_id_var: ContextVar[str] = ContextVar("request_id", default="-")
+
+class RequestIdFilter(logging.Filter):
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(request_id)s] %(message)s")
+for _handler in logging.getLogger().handlers:
+    _handler.addFilter(RequestIdFilter())
+logger = logging.getLogger(__name__)
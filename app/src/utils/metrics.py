@@ -0,0 +1,70 @@
+from prometheus_client import Counter, Gauge, Histogram
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0)
+SIZE_BUCKETS = (500, 1000, 2000, 5000, 10000, 20000, 50000, 100000, 200000, 500000)
+
+STAGE_LATENCY = Histogram(
+    "rag_stage_latency_seconds", "Latency of chat, retrieval and ingestion stages",
+    ["pipeline", "stage"], buckets=LATENCY_BUCKETS
+)
+STAGE_ERRORS = Counter(
+    "rag_stage_errors_total", "Exceptions raised inside a pipeline stage",
+    ["pipeline", "stage"]
+)
+LLM_LATENCY = Histogram(
+    "rag_llm_latency_seconds", "Latency of Gemini generate_content calls",
+    ["call"], buckets=LATENCY_BUCKETS
+)
+LLM_REQUESTS = Counter(
+    "rag_llm_requests_total", "Gemini generate_content calls by outcome",
+    ["call", "outcome"]
+)
+LLM_PROMPT_CHARS = Histogram(
+    "rag_llm_prompt_chars", "Prompt size sent to Gemini in characters",
+    ["call"], buckets=SIZE_BUCKETS
+)
+LLM_TOKENS = Counter(
+    "rag_llm_tokens_total", "Tokens reported by Gemini usage metadata",
+    ["call", "kind"]
+)
+LLM_HEDGED_REQUESTS = Counter(
+    "rag_llm_hedged_requests_total", "Hedged Gemini requests issued after the latency percentile threshold",
+    ["call"]
+)
+LLM_CIRCUIT_OPEN = Gauge(
+    "rag_llm_circuit_open", "1 while the Gemini circuit breaker is open",
+    multiprocess_mode="livemax"
+)
+CHAT_DEGRADATIONS = Counter(
+    "rag_chat_degradations_total", "Chat pipeline degradations applied to stay within the latency budget",
+    ["kind"]
+)
+QDRANT_LATENCY = Histogram(
+    "rag_qdrant_latency_seconds", "Latency of Qdrant client operations",
+    ["operation"], buckets=LATENCY_BUCKETS
+)
+CACHE_REQUESTS = Counter(
+    "rag_cache_requests_total", "Cache lookups by cache name and result",
+    ["cache", "result"]
+)
+COALESCED_REQUESTS = Counter(
+    "rag_coalesced_requests_total", "Requests served by waiting on an identical in-flight computation",
+    ["operation"]
+)
+INGEST_ITEMS = Counter(
+    "rag_ingest_items_total", "Items processed by ingestion stages",
+    ["stage"]
+)
+EMBEDDING_QUEUE_DELAY = Histogram(
+    "rag_embedding_queue_delay_seconds", "Time a query embedding waited in the micro-batching queue",
+    buckets=LATENCY_BUCKETS
+)
+EMBEDDING_BATCH_SIZE = Histogram(
+    "rag_embedding_batch_size", "Number of query embeddings encoded together by the micro-batching scheduler",
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128)
+)
+RETRIEVAL_DEPTH = Histogram(
+    "rag_retrieval_depth", "Results kept by adaptive retrieval depth, by the rule that cut the list",
+    ["cut"],
+    buckets=(1, 2, 3, 4, 6, 8, 12, 16, 24, 32)
+)
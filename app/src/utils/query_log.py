@@ -0,0 +1,101 @@
+import glob
+import json
+import os
+import random
+import re
+import threading
+import time
+from functools import lru_cache
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+from app.src.config import get_settings
+from app.src.utils.logs import logger
+
+REDACTIONS = [
+    (re.compile(r"[\w.+-]+@[\w-]+(?:\.[\w-]+)+"), "<email>"),
+    (re.compile(r"\bhttps?://\S+", re.IGNORECASE), "<url>"),
+    (re.compile(r"\b(?:glpat|gldt|ghp|sk)[-_][\w-]{8,}", re.IGNORECASE), "<token>"),
+    (re.compile(r"\b[0-9a-f]{16,}\b", re.IGNORECASE), "<hex>"),
+    (re.compile(r"\+?\d[\d\s().-]{6,}\d"), "<number>"),
+]
+
+def anonymize(text: str, max_chars: int = 500) -> str:
+    text = re.sub(r"\s+", " ", text or "").strip()
+    for pattern, replacement in REDACTIONS:
+        text = pattern.sub(replacement, text)
+    return text[:max_chars]
+
+def process_log_path(path: str, pid: int) -> str:
+    stem, ext = os.path.splitext(path)
+    return f"{stem}.{pid}{ext}"
+
+def query_log_files(path: str) -> List[str]:
+    stem, ext = os.path.splitext(path)
+    return sorted(set(glob.glob(path) + glob.glob(f"{path}.1") + glob.glob(f"{stem}.*{ext}") + glob.glob(f"{stem}.*{ext}.1")))
+
+class QueryLog:
+    def __init__(self, path: Optional[str] = None):
+        self.settings = get_settings()
+        self.path = path or self.settings.query_log_path
+        self.enabled = self.settings.query_log_enabled
+        self._lock = threading.Lock()
+        self._rng = random.Random()
+        self._file = None
+        self._path = self.path
+
+    def record(self, endpoint: str, query: str, **fields: Any):
+        self.record_many(endpoint, [query], **fields)
+
+    def record_many(self, endpoint: str, queries: Iterable[str], **fields: Any):
+        if not self.enabled:
+            return
+        lines = []
+        for query in queries:
+            if self._rng.random() >= self.settings.query_log_sample_rate:
+                continue
+            entry = {"t": round(time.time(), 3), "e": endpoint, "q": anonymize(query, self.settings.query_log_max_chars)}
+            entry.update((key, value) for key, value in fields.items() if value is not None)
+            lines.append(json.dumps(entry, separators=(",", ":"), ensure_ascii=False) + "\n")
+        if not lines:
+            return
+        try:
+            with self._lock:
+                if self._file is None:
+                    # Each worker process appends to and rotates its own file, so that
+                    # workers sharing QUERY_LOG_PATH never rename a file another one writes.
+                    self._path = process_log_path(self.path, os.getpid())
+                    os.makedirs(os.path.dirname(self._path) or ".", exist_ok=True)
+                    self._file = open(self._path, "a", encoding="utf-8")
+                self._file.write("".join(lines))
+                self._file.flush()
+                if self._file.tell() >= self.settings.query_log_max_bytes:
+                    self._rotate()
+        except Exception as e:
+            logger.error(f"Error recording query log entry: {e}")
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        os.replace(self._path, self._path + ".1")
+        logger.info(f"Rotated query log {self._path}")
+
+    def close(self):
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+def read_query_log(path: str) -> Iterator[Dict[str, Any]]:
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+def read_query_logs(path: str) -> List[Dict[str, Any]]:
+    entries = [entry for name in query_log_files(path) for entry in read_query_log(name)]
+    return sorted(entries, key=lambda entry: entry.get("t", 0))
+
+@lru_cache
+def get_query_log() -> QueryLog:
+    return QueryLog()
@@ -0,0 +1,36 @@
+import time
+from contextlib import contextmanager
+from app.src.config import get_settings
+from app.src.utils.logs import logger
+from app.src.utils.metrics import STAGE_LATENCY, STAGE_ERRORS, LLM_LATENCY, LLM_REQUESTS, LLM_PROMPT_CHARS, LLM_TOKENS, QDRANT_LATENCY
+
+@contextmanager
+def span(pipeline: str, stage: str):
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(pipeline, stage).inc()
+        raise
+    finally:
+        duration = time.perf_counter() - start
+        STAGE_LATENCY.labels(pipeline, stage).observe(duration)
+        if get_settings().tracing_enabled:
+            logger.info(f"span pipeline={pipeline} stage={stage} duration_ms={duration * 1000:.1f}")
+
+@contextmanager
+def qdrant_span(operation: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        QDRANT_LATENCY.labels(operation).observe(time.perf_counter() - start)
+
+def observe_llm_call(call: str, prompt: str, response, started: float, outcome: str):
+    LLM_LATENCY.labels(call).observe(time.perf_counter() - started)
+    LLM_REQUESTS.labels(call, outcome).inc()
+    LLM_PROMPT_CHARS.labels(call).observe(len(prompt))
+    usage = getattr(response, "usage_metadata", None)
+    if usage is not None:
+        LLM_TOKENS.labels(call, "prompt").inc(getattr(usage, "prompt_token_count", 0) or 0)
+        LLM_TOKENS.labels(call, "completion").inc(getattr(usage, "candidates_token_count", 0) or 0)
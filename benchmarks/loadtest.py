@@ -0,0 +1,349 @@
+"""Load generator for /chat and /search against a running server.
+
+Drives a closed loop at a fixed concurrency or an open loop at a fixed arrival
+rate, with synthetic queries or a captured query log (QUERY_LOG_ENABLED), and
+reports throughput, latency percentiles and errors per endpoint together with
+per-stage latency and errors from the server's /metrics.
+
+Start the server with LLM_STUB_ENABLED=true to replace Gemini by the local stub.
+
+    python -m benchmarks.loadtest --concurrency 16 --duration 60 --output load.json
+    python -m benchmarks.loadtest --rate 20 --query-log resources/query_log.jsonl --replay-timing
+    python -m benchmarks.loadtest --concurrency 32 --output new.json --baseline load.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import math
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+import httpx
+from prometheus_client.parser import text_string_to_metric_families
+from app.src.utils.query_log import read_query_logs
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+STAGE_HISTOGRAMS = {
+    "rag_stage_latency_seconds": ("stage", ("pipeline", "stage")),
+    "rag_llm_latency_seconds": ("llm", ("call",)),
+    "rag_qdrant_latency_seconds": ("qdrant", ("operation",)),
+    "rag_embedding_queue_delay_seconds": ("embedding.queue_delay", ()),
+}
+TEMPLATES = [
+    "How does GitLab handle {}?",
+    "What is the process for {}?",
+    "Where can I find the guidelines on {}?",
+    "What does the handbook say about {}?",
+    "{}",
+]
+TOPICS = [
+    "remote work", "code review", "incident management", "on-call rotations", "expense reports", "hiring",
+    "security releases", "product direction", "OKRs", "values", "asynchronous communication", "onboarding",
+    "paid time off", "merge request approvals", "release posts", "performance reviews",
+]
+
+
+class WorkItem(NamedTuple):
+    endpoint: str
+    query: str
+    k: Optional[int] = None
+    mode: Optional[str] = None
+    at: Optional[float] = None
+
+
+class Sample(NamedTuple):
+    endpoint: str
+    latency_ms: float
+    error: Optional[str]
+    degraded: bool
+
+
+def synthetic_workload(chat_ratio: float, k: Optional[int], seed: int = 0) -> Iterator[WorkItem]:
+    rng = random.Random(seed)
+    with open(os.path.join(FIXTURES_DIR, "queries.json"), "r", encoding="utf-8") as f:
+        fixtures = [q["query"] for q in json.load(f)]
+    while True:
+        if rng.random() < 0.5:
+            query = rng.choice(fixtures)
+        else:
+            query = rng.choice(TEMPLATES).format(rng.choice(TOPICS))
+        yield WorkItem("chat" if rng.random() < chat_ratio else "search", query, k)
+
+
+def log_workload(path: str, k: Optional[int]) -> List[WorkItem]:
+    # Reads the per-worker files (and their rotations) next to `path`, merged in time order.
+    return [
+        WorkItem(entry["e"], entry["q"], k or entry.get("k"), entry.get("m"), entry.get("t"))
+        for entry in read_query_logs(path)
+        if entry.get("e") in ("chat", "search") and entry.get("q")
+    ]
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+async def send(client: httpx.AsyncClient, item: WorkItem, timeout: float, samples: List[Sample]):
+    payload = {"query": item.query}
+    if item.k:
+        payload["k"] = item.k
+    if item.endpoint == "chat" and item.mode:
+        payload["mode"] = item.mode
+    start = time.perf_counter()
+    error, degraded = None, False
+    try:
+        response = await client.post(f"/{item.endpoint}", json=payload, timeout=timeout)
+        if response.status_code >= 400:
+            error = f"http_{response.status_code}"
+        elif item.endpoint == "chat":
+            degraded = bool(response.json().get("degraded"))
+    except httpx.TimeoutException:
+        error = "timeout"
+    except httpx.HTTPError as e:
+        error = type(e).__name__
+    samples.append(Sample(item.endpoint, (time.perf_counter() - start) * 1000, error, degraded))
+
+
+async def closed_loop(client: httpx.AsyncClient, items: Iterator[WorkItem], args, samples: List[Sample]):
+    deadline = time.monotonic() + args.duration
+    remaining = itertools.count()
+
+    async def worker():
+        while time.monotonic() < deadline and (not args.requests or next(remaining) < args.requests):
+            item = next(items, None)
+            if item is None:
+                return
+            await send(client, item, args.timeout, samples)
+
+    await asyncio.gather(*(worker() for _ in range(args.concurrency)))
+
+
+async def open_loop(client: httpx.AsyncClient, items: Iterator[WorkItem], args, samples: List[Sample]):
+    rng = random.Random(args.seed)
+    started = time.monotonic()
+    first_at: Optional[float] = None
+    tasks = []
+    for sent, item in enumerate(items):
+        if (args.requests and sent >= args.requests) or time.monotonic() - started >= args.duration:
+            break
+        if args.replay_timing and item.at is not None:
+            first_at = item.at if first_at is None else first_at
+            delay = (item.at - first_at) / args.speed - (time.monotonic() - started)
+        else:
+            delay = rng.expovariate(args.rate) if sent and args.rate else 0.0
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(send(client, item, args.timeout, samples)))
+    await asyncio.gather(*tasks)
+
+
+async def scrape(client: httpx.AsyncClient) -> Dict[Tuple, float]:
+    try:
+        response = await client.get("/metrics", timeout=10.0)
+        response.raise_for_status()
+    except httpx.HTTPError as e:
+        print(f"Could not scrape /metrics: {e}", file=sys.stderr)
+        return {}
+    values = {}
+    for family in text_string_to_metric_families(response.text):
+        for sample in family.samples:
+            values[(sample.name, tuple(sorted(sample.labels.items())))] = sample.value
+    return values
+
+
+def histogram_quantile(buckets: List[Tuple[float, float]], q: float) -> Optional[float]:
+    total = buckets[-1][1] if buckets else 0
+    if not total:
+        return None
+    rank = q / 100 * total
+    previous_bound, previous_count = 0.0, 0.0
+    for bound, count in buckets:
+        if count >= rank:
+            if math.isinf(bound):
+                return previous_bound
+            fraction = (rank - previous_count) / (count - previous_count) if count > previous_count else 0.0
+            return previous_bound + (bound - previous_bound) * fraction
+        previous_bound, previous_count = bound, count
+    return previous_bound
+
+
+def stage_report(before: Dict[Tuple, float], after: Dict[Tuple, float]) -> Dict[str, dict]:
+    def delta(key):
+        return after.get(key, 0.0) - before.get(key, 0.0)
+
+    stages: Dict[str, dict] = {}
+    for metric, (prefix, label_names) in STAGE_HISTOGRAMS.items():
+        buckets: Dict[Tuple, List[Tuple[float, float]]] = {}
+        for key in after:
+            name, labels = key
+            if name != f"{metric}_bucket":
+                continue
+            labels = dict(labels)
+            stage = tuple(labels.get(label, "") for label in label_names)
+            buckets.setdefault(stage, []).append((float(labels["le"]), delta(key)))
+        for stage, stage_buckets in buckets.items():
+            labels = tuple(sorted(zip(label_names, stage)))
+            count = delta((f"{metric}_count", labels))
+            if count <= 0:
+                continue
+            stage_buckets.sort()
+            name = ".".join((prefix, *stage))
+            stages[name] = {
+                "calls": int(count),
+                "mean_ms": round(delta((f"{metric}_sum", labels)) / count * 1000, 3),
+                **{f"p{q}_ms": round(histogram_quantile(stage_buckets, q) * 1000, 3) for q in (50, 95, 99)},
+            }
+            if metric == "rag_stage_latency_seconds":
+                stages[name]["errors"] = int(delta(("rag_stage_errors_total", labels)))
+    batches = delta(("rag_embedding_batch_size_count", ()))
+    if batches > 0:
+        stages["embedding.batches"] = {"calls": int(batches), "mean_size": round(delta(("rag_embedding_batch_size_sum", ())) / batches, 2)}
+    return dict(sorted(stages.items()))
+
+
+def endpoint_report(samples: List[Sample], elapsed: float) -> Dict[str, dict]:
+    report = {}
+    for endpoint in sorted({sample.endpoint for sample in samples}):
+        selected = [sample for sample in samples if sample.endpoint == endpoint]
+        latencies = [sample.latency_ms for sample in selected if sample.error is None]
+        errors: Dict[str, int] = {}
+        for sample in selected:
+            if sample.error is not None:
+                errors[sample.error] = errors.get(sample.error, 0) + 1
+        report[endpoint] = {
+            "requests": len(selected),
+            "ok": len(latencies),
+            "errors": errors,
+            "error_rate": round(1 - len(latencies) / len(selected), 4),
+            "degraded": sum(1 for sample in selected if sample.degraded),
+            "throughput_rps": round(len(latencies) / elapsed, 2) if elapsed else None,
+        }
+        if latencies:
+            report[endpoint].update({
+                "mean_ms": round(statistics.mean(latencies), 3),
+                "p50_ms": round(percentile(latencies, 50), 3),
+                "p95_ms": round(percentile(latencies, 95), 3),
+                "p99_ms": round(percentile(latencies, 99), 3),
+                "max_ms": round(max(latencies), 3),
+            })
+    return report
+
+
+async def run(args) -> dict:
+    if args.query_log:
+        logged = log_workload(args.query_log, args.k)
+        if not logged:
+            raise SystemExit(f"No chat or search queries found in {args.query_log}")
+        if args.only:
+            logged = [item for item in logged if item.endpoint == args.only]
+        items = iter(logged) if args.replay_timing else itertools.cycle(logged)
+    else:
+        chat_ratio = {"chat": 1.0, "search": 0.0}.get(args.only, args.chat_ratio)
+        items = synthetic_workload(chat_ratio, args.k, args.seed)
+
+    limits = httpx.Limits(max_connections=args.max_connections, max_keepalive_connections=args.max_connections)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits) as client:
+        before = await scrape(client)
+        samples: List[Sample] = []
+        started = time.perf_counter()
+        if args.rate or args.replay_timing:
+            await open_loop(client, items, args, samples)
+        else:
+            await closed_loop(client, items, args, samples)
+        elapsed = time.perf_counter() - started
+        after = await scrape(client)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "label": args.label,
+            "url": args.url,
+            "load": "open" if args.rate or args.replay_timing else "closed",
+            "concurrency": None if args.rate or args.replay_timing else args.concurrency,
+            "rate": args.rate,
+            "workload": args.query_log or "synthetic",
+            "elapsed_s": round(elapsed, 3),
+            "requests": len(samples),
+        },
+        "endpoints": endpoint_report(samples, elapsed),
+        "stages": stage_report(before, after),
+    }
+
+
+def compare(report: dict, baseline: dict, max_regression: float) -> List[str]:
+    regressions = []
+    for endpoint, summary in report["endpoints"].items():
+        previous = baseline.get("endpoints", {}).get(endpoint)
+        if not previous:
+            continue
+        if previous.get("p99_ms") and summary.get("p99_ms") and summary["p99_ms"] / previous["p99_ms"] > 1 + max_regression:
+            regressions.append(f"{endpoint}: p99 {previous['p99_ms']}ms -> {summary['p99_ms']}ms")
+        if previous.get("throughput_rps") and (summary.get("throughput_rps") or 0) < previous["throughput_rps"] * (1 - max_regression):
+            regressions.append(f"{endpoint}: throughput {previous['throughput_rps']} -> {summary.get('throughput_rps')} rps")
+        if summary["error_rate"] > previous.get("error_rate", 0) + 0.01:
+            regressions.append(f"{endpoint}: error rate {previous.get('error_rate', 0)} -> {summary['error_rate']}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Load generator for /chat and /search")
+    parser.add_argument("--url", default=os.getenv("BACKEND_URL", "http://localhost:9999"))
+    parser.add_argument("--concurrency", type=int, default=8, help="Closed loop: number of concurrent users")
+    parser.add_argument("--rate", type=float, default=0.0, help="Open loop: Poisson arrival rate in requests per second")
+    parser.add_argument("--duration", type=float, default=30.0, help="Stop after this many seconds")
+    parser.add_argument("--requests", type=int, default=0, help="Stop after this many requests")
+    parser.add_argument("--chat-ratio", type=float, default=0.5, help="Share of synthetic requests sent to /chat")
+    parser.add_argument("--only", choices=["chat", "search"], help="Send only one kind of request")
+    parser.add_argument("--query-log", help="Replay a captured query log instead of synthetic queries")
+    parser.add_argument("--replay-timing", action="store_true", help="Keep the inter-arrival times of the query log")
+    parser.add_argument("--speed", type=float, default=1.0, help="Speed-up factor for --replay-timing")
+    parser.add_argument("--k", type=int, default=10, help="k sent with each request; 0 keeps the k of logged queries or the server default")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    parser.add_argument("--max-connections", type=int, default=256)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--label", default="", help="Free-form description of the server setup under test")
+    parser.add_argument("--output", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="Allowed relative p99 or throughput regression")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    print(json.dumps({"meta": report["meta"], "endpoints": report["endpoints"]}, indent=2))
+    for stage, summary in report["stages"].items():
+        if "p50_ms" not in summary:
+            print(f"{stage:40s} calls={summary['calls']:6d} mean_size={summary['mean_size']}")
+            continue
+        print(f"{stage:40s} calls={summary['calls']:6d} p50={summary['p50_ms']:9.1f}ms p95={summary['p95_ms']:9.1f}ms p99={summary['p99_ms']:9.1f}ms errors={summary.get('errors', 0)}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
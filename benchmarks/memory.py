@@ -0,0 +1,177 @@
+"""Peak-memory benchmark for a large offline crawl through the ingestion pipeline.
+
+Serves a synthetic handbook of --pages HTML pages through httpx.MockTransport and
+runs the full IngestionPipeline (crawl, chunk, dedup, embed, upsert) against
+in-memory Qdrant with the hashing embedder. Reports peak RSS and throughput.
+
+    python -m benchmarks.memory --pages 2000 --output memory.json
+    python -m benchmarks.memory --pages 2000 --output new.json --baseline memory.json
+
+Pass --archive DIR to keep the raw-page archive the crawl writes, then --replay to
+run chunk/embed/upsert from that archive with no crawling at all.
+
+    python -m benchmarks.memory --pages 2000 --archive /tmp/handbook-archive
+    python -m benchmarks.memory --archive /tmp/handbook-archive --replay --output replay.json
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+os.environ.setdefault("QDRANT_LOCATION", ":memory:")
+
+import httpx
+from app.src.config import get_settings
+from app.src.services.embedder.embedder import Embedder
+from app.src.services.ingest.crawler import Crawler
+from app.src.services.ingest.pipeline import IngestionPipeline
+from app.src.utils.logs import logger
+from benchmarks.run import git_revision
+from benchmarks.stubs import HashingEncoder
+
+BASE_URL = "https://handbook.gitlab.com/"
+WORDS = (
+    "team values handbook remote async merge request review iteration transparency results efficiency "
+    "diversity inclusion collaboration manager engineer product release security compliance expense "
+    "travel onboarding hiring interview promotion compensation benefits leave holiday planning roadmap"
+).split()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(peak / 1024 if sys.platform != "darwin" else peak / (1024 * 1024), 1)
+
+
+class SyntheticSite:
+    """Deterministic handbook-like pages: heavy nav/footer markup around a few KB of prose."""
+
+    def __init__(self, pages: int, fanout: int, html_kb: int, text_kb: int):
+        self.pages = pages
+        self.fanout = fanout
+        self.html_kb = html_kb
+        self.text_kb = text_kb
+        self.nav = "".join(f'<li><a class="nav-link" href="/nav/{i}">Section {i}</a></li>' for i in range(200))
+
+    def url(self, page: int) -> str:
+        return BASE_URL if page == 0 else f"{BASE_URL}page/{page}/"
+
+    def _prose(self, page: int) -> str:
+        rng = random.Random(page)
+        paragraphs = []
+        size = 0
+        while size < self.text_kb * 1024:
+            paragraph = " ".join(rng.choice(WORDS) for _ in range(rng.randint(40, 90))).capitalize() + "."
+            paragraphs.append(f"<p>{paragraph}</p>")
+            size += len(paragraph)
+        return "".join(paragraphs)
+
+    def render(self, page: int) -> str:
+        children = range(page * self.fanout + 1, min(self.pages, page * self.fanout + self.fanout + 1))
+        links = "".join(f'<li><a href="{self.url(child)}">Page {child}</a></li>' for child in children)
+        padding = max(0, self.html_kb * 1024 - len(self.nav) - self.text_kb * 1024)
+        return (
+            f"<html><head><title>Handbook page {page}</title>"
+            f"<style>{'.x{color:#000}' * (padding // 13)}</style></head><body>"
+            f"<nav><ul>{self.nav}</ul></nav><main><article><h1>Handbook page {page}</h1>"
+            f"{self._prose(page)}<ul>{links}</ul></article></main>"
+            f"<footer>Edit this page. View source. Licensed under CC BY-SA 4.0.</footer></body></html>"
+        )
+
+    def handler(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.strip("/")
+        page = 0 if not path else int(path.split("/")[-1]) if path.startswith("page/") else -1
+        if page < 0 or page >= self.pages:
+            return httpx.Response(404, headers={"content-type": "text/html"}, text="")
+        return httpx.Response(200, headers={"content-type": "text/html; charset=utf-8"}, text=self.render(page))
+
+
+def run(args) -> dict:
+    logger.setLevel(args.log_level)
+    logging.getLogger("httpx").setLevel(args.log_level)
+    settings = get_settings()
+    settings.qdrant_location = ":memory:"
+    settings.base_urls = [BASE_URL]
+    settings.crawl_max_pages = args.pages
+    settings.crawl_max_depth = args.max_depth
+    settings.page_archive_dir = args.archive or tempfile.mkdtemp()
+    Embedder._model = HashingEncoder(dim=args.stub_dim)
+
+    if args.replay:
+        pipeline = IngestionPipeline(source="archive")
+    else:
+        site = SyntheticSite(args.pages, args.fanout, args.html_kb, args.text_kb)
+        pipeline = IngestionPipeline()
+        pipeline.crawler = Crawler(transport=httpx.MockTransport(site.handler), archive=pipeline.archive, progress=pipeline.progress)
+    pipeline.visited_store.visited_urls = set()
+    pipeline.visited_store.visited_urls_path = os.path.join(tempfile.mkdtemp(), "visited_urls.json")
+
+    if args.tracemalloc:
+        tracemalloc.start()
+    rss_before = peak_rss_mb()
+    start = time.perf_counter()
+    result = pipeline.run_sync()
+    elapsed = time.perf_counter() - start
+    traced_peak = tracemalloc.get_traced_memory()[1] if args.tracemalloc else None
+
+    report = {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "pages_requested": args.pages,
+            "html_kb": args.html_kb,
+            "text_kb": args.text_kb,
+            "fanout": args.fanout,
+            "source": "archive" if args.replay else "crawl",
+        },
+        "result": result,
+        "elapsed_s": round(elapsed, 3),
+        "pages_per_s": round(result["pages"] / elapsed, 1) if elapsed else None,
+        "rss_before_mb": rss_before,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+    if traced_peak is not None:
+        report["tracemalloc_peak_mb"] = round(traced_peak / (1024 * 1024), 1)
+    return report
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Peak-memory benchmark for a large offline crawl")
+    parser.add_argument("--output", default="memory.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.15, help="Allowed relative growth of peak RSS")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--fanout", type=int, default=8)
+    parser.add_argument("--max-depth", type=int, default=10)
+    parser.add_argument("--html-kb", type=int, default=120, help="Approximate raw HTML size per page")
+    parser.add_argument("--text-kb", type=int, default=4, help="Approximate extracted prose per page")
+    parser.add_argument("--stub-dim", type=int, default=384)
+    parser.add_argument("--archive", help="Raw-page archive directory to write (crawl) or read (--replay)")
+    parser.add_argument("--replay", action="store_true", help="Replay --archive instead of crawling the synthetic site")
+    parser.add_argument("--tracemalloc", action="store_true", help="Also report the Python heap peak (slower)")
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({k: v for k, v in report.items() if k != "meta"}, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        previous = baseline.get("peak_rss_mb")
+        if previous and report["peak_rss_mb"] > previous * (1 + args.max_regression):
+            print(f"REGRESSION peak_rss_mb: {previous} -> {report['peak_rss_mb']}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,297 @@
+"""Offline per-stage benchmark for the ingestion and chat pipelines.
+
+Runs entirely without network: Gemini is replaced by StubGenerativeModel,
+Qdrant runs in local mode and the corpus is loaded from benchmarks/fixtures.
+
+    python -m benchmarks.run --output bench.json
+    python -m benchmarks.run --output new.json --baseline bench.json
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+os.environ.setdefault("QDRANT_LOCATION", ":memory:")
+
+from app.src.config import get_settings
+from app.src.domain.chat import ChatRequest
+from app.src.domain.raw_page import RawPage
+from app.src.services.chat.context_builder import ContextBuilder
+from app.src.services.chat.service import ChatService
+from app.src.services.embedder.embedder import Embedder
+from app.src.services.ingest.chunker import Chunker
+from app.src.services.ingest.crawler import Crawler
+from app.src.services.ingest.dedup import MinHashDeduplicator
+from app.src.services.search.service import SearchService
+from app.src.services.store.store import VectorStore
+from app.src.utils.logs import logger
+from benchmarks.stubs import HashingEncoder, StubGenerativeModel
+
+FIXTURES_DIR = os.path.join(os.path.dirname(__file__), "fixtures")
+RECALL_KS = [1, 3, 5, 10]
+
+
+def load_pages() -> list[dict]:
+    with open(os.path.join(FIXTURES_DIR, "pages.json"), "r", encoding="utf-8") as f:
+        manifest = json.load(f)
+    pages = []
+    for entry in manifest:
+        with open(os.path.join(FIXTURES_DIR, "pages", entry["file"]), "r", encoding="utf-8") as f:
+            pages.append({"url": entry["url"], "html": f.read()})
+    return pages
+
+
+def load_queries() -> list[dict]:
+    with open(os.path.join(FIXTURES_DIR, "queries.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def percentile(samples: list[float], q: float) -> float:
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, math.ceil(q / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def summarize(samples_ms: list[float], items: int = 0) -> dict:
+    total_ms = sum(samples_ms)
+    summary = {
+        "calls": len(samples_ms),
+        "total_ms": round(total_ms, 3),
+        "mean_ms": round(statistics.mean(samples_ms), 3),
+        "p50_ms": round(percentile(samples_ms, 50), 3),
+        "p95_ms": round(percentile(samples_ms, 95), 3),
+        "p99_ms": round(percentile(samples_ms, 99), 3),
+        "max_ms": round(max(samples_ms), 3),
+    }
+    if items:
+        summary["items"] = items
+        summary["items_per_s"] = round(items / (total_ms / 1000), 1) if total_ms else None
+    return summary
+
+
+def timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "HEAD"], stderr=subprocess.DEVNULL, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def run(args) -> dict:
+    logger.setLevel(args.log_level)
+    settings = get_settings()
+    settings.qdrant_location = args.qdrant_location
+    if args.embedder == "stub":
+        Embedder._model = HashingEncoder(dim=args.stub_dim)
+
+    pages = load_pages()
+    queries = load_queries()
+    stages: dict[str, dict] = {}
+
+    crawler = Crawler()
+    extracted = []
+    samples = []
+    for _ in range(args.repeat):
+        extracted = []
+        for page in pages:
+            (text, title), ms = timed(crawler.extract_text, page["html"])
+            samples.append(ms)
+            extracted.append(RawPage(page["url"], 0, text, title))
+    stages["crawler.extract_text"] = summarize(samples, items=len(pages) * args.repeat)
+
+    chunker = Chunker()
+    chunks = []
+    samples = []
+    for _ in range(args.repeat):
+        chunks = []
+        for page in extracted:
+            page_chunks, ms = timed(chunker.chunk_page, page)
+            samples.append(ms)
+            chunks.extend(page_chunks)
+    stages["chunker.chunk_page"] = summarize(samples, items=len(chunks) * args.repeat)
+
+    samples = []
+    duplicates = 0
+    for _ in range(args.repeat):
+        deduplicator = MinHashDeduplicator()
+        for page in extracted:
+            page_chunks = [chunk for chunk in chunks if chunk.url == page.url]
+            _, ms = timed(deduplicator.filter, page_chunks)
+            samples.append(ms)
+        duplicates = deduplicator.dropped
+    stages["dedup.filter"] = summarize(samples, items=len(chunks) * args.repeat)
+
+    embedder = Embedder()
+    documents = [chunk.content for chunk in chunks]
+    embedder.embed(documents[:1])
+    embeddings = []
+    samples = []
+    for _ in range(args.repeat):
+        embeddings, ms = timed(embedder.embed, documents)
+        samples.append(ms)
+    stages["embedder.embed"] = summarize(samples, items=len(documents) * args.repeat)
+
+    query_texts = [q["query"] for q in queries]
+    samples = []
+    for _ in range(args.repeat):
+        for query in query_texts:
+            _, ms = timed(embedder.embed, [query])
+            samples.append(ms)
+    stages["embedder.embed_query"] = summarize(samples, items=len(query_texts) * args.repeat)
+
+    store = VectorStore()
+    ids = [chunk.id for chunk in chunks]
+    metadatas = [
+        {"url": str(chunk.url), "title": chunk.title or "", "index": chunk.index, "total": chunk.total}
+        for chunk in chunks
+    ]
+    samples = []
+    for _ in range(args.repeat):
+        _, ms = timed(store.add, ids, documents, metadatas, embeddings)
+        samples.append(ms)
+    stages["vector_store.add"] = summarize(samples, items=len(ids) * args.repeat)
+
+    query_embeddings = embedder.embed(query_texts)
+    samples = []
+    for _ in range(args.repeat):
+        for embedding in query_embeddings:
+            _, ms = timed(store.query, embedding, args.k)
+            samples.append(ms)
+    stages["vector_store.query"] = summarize(samples, items=len(query_embeddings) * args.repeat)
+
+    urls = [page["url"] for page in pages]
+    documents_by_url = {}
+    samples = []
+    for _ in range(args.repeat):
+        for url in urls:
+            documents_by_url[url], ms = timed(store.get_all_chunks_by_url, url)
+            samples.append(ms)
+    stages["vector_store.get_all_chunks_by_url"] = summarize(samples, items=len(urls) * args.repeat)
+
+    search_service = SearchService()
+    context_builder = ContextBuilder()
+    samples = []
+    for _ in range(args.repeat):
+        for query in query_texts:
+            top_urls = []
+            for result in search_service.search(query, args.k):
+                if result.url not in top_urls:
+                    top_urls.append(result.url)
+            expanded = [chunk for url in top_urls[:2] for chunk in documents_by_url.get(url, [])]
+            _, ms = timed(context_builder.build_context, expanded)
+            samples.append(ms)
+    stages["context_builder.build_context"] = summarize(samples, items=len(query_texts) * args.repeat)
+
+    chat_service = ChatService()
+    chat_service.llm.model = StubGenerativeModel(args.llm_latency_ms, args.llm_jitter_ms, seed=1)
+    chat_service.citation_analyzer.model = StubGenerativeModel(args.llm_latency_ms, args.llm_jitter_ms, seed=2)
+    samples = []
+    for _ in range(args.chat_repeat):
+        for query in query_texts:
+            _, ms = timed(chat_service.chat, ChatRequest(query=query, k=args.k))
+            samples.append(ms)
+    stages["chat_service.chat"] = summarize(samples, items=len(query_texts) * args.chat_repeat)
+
+    return {
+        "meta": {
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "embedder": args.embedder if args.embedder == "stub" else settings.embedding_model_name,
+            "llm_latency_ms": args.llm_latency_ms,
+            "llm_jitter_ms": args.llm_jitter_ms,
+            "repeat": args.repeat,
+            "k": args.k,
+            "chunk_size": settings.chunk_size,
+            "chunk_overlap": settings.chunk_overlap,
+            "pages": len(pages),
+            "chunks": len(chunks),
+            "near_duplicate_chunks": duplicates,
+            "queries": len(queries),
+        },
+        "stages": stages,
+        "retrieval": measure_recall(search_service, queries),
+    }
+
+
+def measure_recall(search_service: SearchService, queries: list[dict]) -> dict:
+    max_k = max(RECALL_KS)
+    recalls = {k: [] for k in RECALL_KS}
+    reciprocal_ranks = []
+    for labeled in queries:
+        relevant = set(labeled["relevant_urls"])
+        ranked_urls = []
+        for result in search_service.search(labeled["query"], max_k):
+            if result.url not in ranked_urls:
+                ranked_urls.append(result.url)
+        for k in RECALL_KS:
+            recalls[k].append(len(relevant.intersection(ranked_urls[:k])) / len(relevant))
+        rank = next((i for i, url in enumerate(ranked_urls, 1) if url in relevant), None)
+        reciprocal_ranks.append(1 / rank if rank else 0.0)
+
+    retrieval = {f"recall@{k}": round(statistics.mean(values), 4) for k, values in recalls.items()}
+    retrieval["mrr"] = round(statistics.mean(reciprocal_ranks), 4)
+    return retrieval
+
+
+def compare(report: dict, baseline: dict, max_regression: float, max_recall_drop: float) -> list[str]:
+    regressions = []
+    for stage, summary in report["stages"].items():
+        previous = baseline.get("stages", {}).get(stage)
+        if not previous or not previous.get("p50_ms"):
+            continue
+        ratio = summary["p50_ms"] / previous["p50_ms"]
+        if ratio > 1 + max_regression:
+            regressions.append(f"{stage}: p50 {previous['p50_ms']}ms -> {summary['p50_ms']}ms ({ratio:.2f}x)")
+    for metric, value in report["retrieval"].items():
+        previous = baseline.get("retrieval", {}).get(metric)
+        if previous is not None and previous - value > max_recall_drop:
+            regressions.append(f"{metric}: {previous} -> {value}")
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Offline per-stage benchmark for the RAG pipeline")
+    parser.add_argument("--output", default="bench.json", help="Where to write the JSON report")
+    parser.add_argument("--baseline", help="Previous JSON report to compare against")
+    parser.add_argument("--max-regression", type=float, default=0.25, help="Allowed relative p50 slowdown per stage")
+    parser.add_argument("--max-recall-drop", type=float, default=0.02, help="Allowed absolute drop in recall metrics")
+    parser.add_argument("--embedder", choices=["stub", "model"], default="stub", help="Hashing stub or the configured SentenceTransformer")
+    parser.add_argument("--stub-dim", type=int, default=384)
+    parser.add_argument("--qdrant-location", default=os.environ["QDRANT_LOCATION"], help="':memory:' or a local Qdrant path")
+    parser.add_argument("--llm-latency-ms", type=float, default=0.0)
+    parser.add_argument("--llm-jitter-ms", type=float, default=0.0)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chat-repeat", type=int, default=1)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--log-level", default="WARNING")
+    args = parser.parse_args(argv)
+
+    report = run(args)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(json.dumps({"stages": {name: s["p50_ms"] for name, s in report["stages"].items()}, "retrieval": report["retrieval"]}, indent=2))
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.max_regression, args.max_recall_drop)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
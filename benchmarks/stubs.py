@@ -0,0 +1,39 @@
+import re
+import zlib
+import numpy as np
+from app.src.services.chat.llm_stub import StubGenerativeModel, StubResponse
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does", "for", "from", "how", "i", "in", "is",
+    "it", "my", "of", "on", "or", "should", "that", "the", "to", "what", "when", "why", "with", "you", "your",
+}
+
+
+class HashingEncoder:
+    """Deterministic bag-of-words encoder exposing the SentenceTransformer.encode interface."""
+
+    def __init__(self, dim: int = 384):
+        self.dim = dim
+
+    def _tokens(self, text: str) -> list[str]:
+        tokens = []
+        for token in TOKEN_PATTERN.findall(text.lower()):
+            if token in STOPWORDS:
+                continue
+            if len(token) > 4 and token.endswith("s"):
+                token = token[:-1]
+            tokens.append(token)
+        return tokens
+
+    def encode(self, sentences, batch_size: int = 32, normalize_embeddings: bool = True, convert_to_numpy: bool = True, **kwargs):
+        out = np.zeros((len(sentences), self.dim), dtype=np.float32)
+        for row, sentence in enumerate(sentences):
+            for token in self._tokens(sentence):
+                out[row, zlib.crc32(token.encode("utf-8")) % self.dim] += 1.0
+            np.log1p(out[row], out=out[row])
+            if normalize_embeddings:
+                norm = np.linalg.norm(out[row])
+                if norm:
+                    out[row] /= norm
+        return out
@@ -1,40 +1,40 @@
 import os
+import uuid
 import hashlib
 import hmac
 from datetime import datetime, timedelta
 
 import streamlit as st
 import requests
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 
 class GitLabChatApp:
     def __init__(self):
         self.api_base_url = os.getenv("BACKEND_URL", "http://localhost:9999")
         self.chat_endpoint = f"{self.api_base_url}/chat"
+        self.sessions_endpoint = f"{self.api_base_url}/chat/sessions"
 
     def initialize_session_state(self):
         if "chat_history" not in st.session_state:
             st.session_state.chat_history = []
         if "messages" not in st.session_state:
             st.session_state.messages = []
+        if "session_id" not in st.session_state:
+            st.session_state.session_id = uuid.uuid4().hex
 
     def add_message_to_history(self, role: str, content: str):
         message = {"role": role, "content": content}
         st.session_state.chat_history.append(message)
         st.session_state.messages.append(message)
 
-    def send_chat_request(self, query: str, k: int = 10) -> Dict[str, Any]:
+    def send_chat_request(self, query: str, k: Optional[int] = None) -> Dict[str, Any]:
         try:
-            user_messages_only = [
-                msg for msg in st.session_state.chat_history
-                if msg["role"] == "user"
-            ]
-
             payload = {
                 "query": query,
-                "k": k,
-                "chat_history": user_messages_only
+                "session_id": st.session_state.session_id
             }
+            if k:
+                payload["k"] = k
 
             response = requests.post(
                 self.chat_endpoint,
@@ -81,8 +81,13 @@ class GitLabChatApp:
                 st.write(citation['snippet'][:500] + "..." if len(citation['snippet']) > 500 else citation['snippet'])
 
     def clear_chat_history(self):
+        try:
+            requests.delete(f"{self.sessions_endpoint}/{st.session_state.session_id}")
+        except requests.exceptions.RequestException:
+            pass
         st.session_state.chat_history = []
         st.session_state.messages = []
+        st.session_state.session_id = uuid.uuid4().hex
         st.rerun()
 
     def run(self):